@@ -1,4 +1,5 @@
 from contextlib import suppress
+from functools import lru_cache
 
 import numpy as np
 from matplotlib.colors import Normalize
@@ -26,6 +27,15 @@ from glue_plotly.utils import (
 
 DEFAULT_FONT = "Arial, sans-serif"
 
+# The number of colors sampled from a colormap to build a Plotly colorscale
+COLORSCALE_SAMPLES = 256
+
+# The size of the caps of error bars drawn as lines (on either side of the
+# bars), as a fraction of the extent of the points along the caps. This is
+# close to the size of the caps of Plotly error bars in a figure of the
+# default size, although unlike those, these caps scale when zooming
+ERROR_BAR_CAP_FRACTION = 0.005
+
 
 def dimensions(viewer):
     # TODO: Add implementation for bqplot viewers
@@ -51,6 +61,28 @@ def data_count(layers):
     return len(data)
 
 
+@lru_cache
+def _trace_type(trace_class):
+    return trace_class().plotly_name
+
+
+def new_trace(trace_class, plain=False, **properties):
+    """
+    Create a trace of the given graph object class (e.g. ``go.Scatter``).
+
+    If ``plain`` is True, the trace is instead returned as the equivalent plain
+    dictionary. This skips Plotly's validation and copying of the property
+    values, which is slow for large arrays, so is meant for traces that are
+    serialized directly (e.g. when exporting) rather than added to a figure.
+    As for graph objects, properties set to None are left out.
+    """
+    if plain:
+        return dict(type=_trace_type(trace_class),
+                    **{key: value for key, value in properties.items()
+                       if value is not None})
+    return trace_class(**properties)
+
+
 def base_layout_config(viewer, include_dimensions=True, **kwargs):
     """Creates the base layout configuration for a Plotly representation of a viewer"""
     # set the aspect ratio of the axes, the tick label size, the axis label
@@ -134,6 +166,104 @@ def sanitize(*arrays):
     return mask, tuple(a[mask].ravel() for a in arrays)
 
 
+def nan_separated(*coords):
+    """
+    Interleave the given equal-length coordinate arrays point by point, following
+    each group with a NaN. Plotly breaks a line at NaN values, so this allows
+    many disjoint pieces to be drawn by a single trace.
+    """
+    count = len(coords[0])
+    stacked = np.column_stack([*coords, np.full(count, np.nan)])
+    return stacked.ravel()
+
+
+def color_groups(colors):
+    """
+    Group the indices of an array of colors by color value.
+
+    Returns a list of ``(color, indices)`` pairs, in order of first appearance.
+    """
+    colors = np.asarray(colors)
+    unique, first, inverse = np.unique(colors, return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    indices = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+    return [(unique[i], indices[i]) for i in np.argsort(first)]
+
+
+def error_bar_coordinates(coords, axis, errors, cap_axis=None, cap_size=0):
+    """
+    Compute NaN-separated line coordinates for a set of symmetric error bars.
+
+    ``coords`` maps each axis name to the coordinates of the points along that
+    axis, and the bars extend by ``errors`` on either side of each point along
+    ``axis``. If ``cap_axis`` is given, each bar also gets a cap at both ends,
+    which extends by ``cap_size`` on either side of the bar along that axis.
+    The result maps each axis name to the coordinates of the bars.
+    """
+    errors = np.absolute(errors)
+    result = {}
+    for ax, c in coords.items():
+        if ax == axis:
+            starts, ends = [c - errors], [c + errors]
+        else:
+            starts, ends = [c], [c]
+        if cap_axis is not None:
+            if ax == axis:
+                starts += [c - errors, c + errors]
+                ends += [c - errors, c + errors]
+            elif ax == cap_axis:
+                starts += [c - cap_size] * 2
+                ends += [c + cap_size] * 2
+            else:
+                starts += [c, c]
+                ends += [c, c]
+        # The bar of each point is followed by its caps
+        result[ax] = nan_separated(np.column_stack(starts).ravel(),
+                                   np.column_stack(ends).ravel())
+    return result
+
+
+def error_bar_cap_size(values):
+    """
+    Return the size of the caps of error bars drawn as lines, on either side
+    of the bars, given the coordinates of the points along the caps.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0
+    return ERROR_BAR_CAP_FRACTION * (finite.max() - finite.min())
+
+
+def hover_info(layer_state, mask, hover_data):
+    """
+    Create the hover-related properties for a trace representing a layer.
+
+    ``hover_data`` maps component labels to whether that component should be
+    shown on hover. The values of the selected components are stacked into a
+    ``customdata`` matrix, with one column per component, and displayed by a
+    single ``hovertemplate`` for the trace, so that the labels aren't repeated
+    for every point.
+    """
+    labels = [component.label for component in layer_state.layer.components
+              if hover_data and hover_data.get(component.label, False)]
+    if not labels:
+        return dict(hoverinfo="skip")
+
+    columns = [np.asarray(layer_state.layer[label]) for label in labels]
+    if mask is not None:
+        columns = [c[mask] for c in columns]
+    columns = [c.ravel() for c in columns]
+    numeric = all(np.issubdtype(c.dtype, np.number) for c in columns)
+    customdata = np.column_stack(columns) if numeric \
+        else np.column_stack([c.astype(object) for c in columns])
+
+    # The <extra></extra> removes 'trace <#>' from tooltip
+    template = "<br>".join(f"{label}: %{{customdata[{index}]}}"
+                           for index, label in enumerate(labels))
+    return dict(customdata=customdata, hovertemplate=f"{template}<extra></extra>")
+
+
 def fixed_color(layer_state):
     layer_color = layer_state.color
     if layer_color == "0.35" or layer_color == "0.75":
@@ -143,24 +273,71 @@ def fixed_color(layer_state):
     return layer_color
 
 
-def rgb_colors(layer_state, mask, cmap_att):
+def rgba_strings(rgba):
+    """
+    Convert an array of RGBA values in the range [0, 1], one row per point, to a
+    list of Plotly ``rgba(...)`` strings.
+
+    Colormapped values can only take as many distinct colors as there are entries
+    in the colormap lookup table, so each distinct color is formatted once and the
+    resulting strings are broadcast back to the points.
+    """
+    rgba = np.asarray(rgba, dtype=float).reshape(-1, 4)
+    rgb = (256 * rgba[:, :3]).astype(np.int64)
+    alphas, alpha_index = np.unique(rgba[:, 3], return_inverse=True)
+    alpha_index = alpha_index.ravel()
+
+    # Pack each color into a single integer so that we only need a 1D unique
+    r, g, b = rgb.T
+    keys = (alpha_index << 27) | (r << 18) | (g << 9) | b
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    strings = np.array([f"rgba({r},{g},{b},{opacity_value_string(alphas[a])})"
+                        for (r, g, b), a in zip(rgb[first], alpha_index[first],
+                                                strict=True)],
+                       dtype=object)
+    return strings[inverse.ravel()].tolist()
+
+
+def cmap_and_limits(layer_state):
     if layer_state.cmap_vmin > layer_state.cmap_vmax:
-        cmap = layer_state.cmap.reversed()
-        norm = Normalize(
-            vmin=layer_state.cmap_vmax, vmax=layer_state.cmap_vmin)
-    else:
-        cmap = layer_state.cmap
-        norm = Normalize(
-            vmin=layer_state.cmap_vmin, vmax=layer_state.cmap_vmax)
+        return layer_state.cmap.reversed(), layer_state.cmap_vmax, layer_state.cmap_vmin
+    return layer_state.cmap, layer_state.cmap_vmin, layer_state.cmap_vmax
 
-    color_values = layer_state.layer[getattr(layer_state, cmap_att)].copy()
+
+def _color_values(layer_state, mask, cmap_att):
+    color_values = np.ravel(layer_state.layer[getattr(layer_state, cmap_att)])
     if mask is not None:
-        color_values = color_values[mask]
-    rgba_list = np.array([
-        cmap(norm(point)) for point in color_values])
-    rgba_list = [[int(256 * t) for t in rgba[:3]] + [rgba[3]] for rgba in rgba_list]
-    return [f"rgba({r},{g},{b},{opacity_value_string(a)})"
-            for r, g, b, a in rgba_list]
+        color_values = color_values[np.ravel(mask)]
+    return color_values
+
+
+def rgb_colors(layer_state, mask, cmap_att):
+    cmap, vmin, vmax = cmap_and_limits(layer_state)
+    norm = Normalize(vmin=vmin, vmax=vmax)
+    return rgba_strings(cmap(norm(_color_values(layer_state, mask, cmap_att))))
+
+
+def colorscale(cmap, samples=COLORSCALE_SAMPLES):
+    """
+    Sample a Matplotlib colormap into a Plotly colorscale, i.e. a list of
+    ``[position, color]`` pairs with positions running from 0 to 1.
+    """
+    positions = np.linspace(0, 1, samples)
+    colors = rgba_strings(cmap(positions))
+    return [[position, color]
+            for position, color in zip(positions.tolist(), colors, strict=True)]
+
+
+def numeric_colors(layer_state, mask, cmap_att):
+    """
+    Return the marker properties that color the points of a colormapped layer by
+    passing the raw attribute values to Plotly, along with the color limits and a
+    colorscale sampled from the layer colormap, so that the browser does the
+    mapping rather than receiving one color string per point.
+    """
+    cmap, vmin, vmax = cmap_and_limits(layer_state)
+    return dict(color=_color_values(layer_state, mask, cmap_att),
+                cmin=vmin, cmax=vmax, colorscale=colorscale(cmap))
 
 
 def color_info(layer_state,
@@ -170,3 +347,20 @@ def color_info(layer_state,
     if getattr(layer_state, mode_att, "Fixed") == "Fixed":
         return fixed_color(layer_state)
     return rgb_colors(layer_state, mask, cmap_att)
+
+
+def marker_color_info(layer_state,
+                      mask=None,
+                      mode_att="cmap_mode",
+                      cmap_att="cmap_att",
+                      numeric=False):
+    """
+    Return the color properties for a marker (or marker line) as a dictionary.
+
+    If ``numeric`` is `True`, colormapped layers are colored using the numeric
+    attribute values and a colorscale (see `numeric_colors`) rather than a list
+    of ``rgba(...)`` strings.
+    """
+    if numeric and getattr(layer_state, mode_att, "Fixed") != "Fixed":
+        return numeric_colors(layer_state, mask, cmap_att)
+    return dict(color=color_info(layer_state, mask, mode_att, cmap_att))
@@ -1,9 +1,15 @@
 from uuid import uuid4
 
+import numpy as np
 from plotly.graph_objs import Bar
 
 from glue.core import BaseData
-from glue_plotly.common import base_layout_config, base_rectilinear_axis, fixed_color
+from glue_plotly.common import (
+    base_layout_config,
+    base_rectilinear_axis,
+    fixed_color,
+    new_trace,
+)
 from glue_plotly.utils import mpl_ticks_values
 
 
@@ -36,14 +42,12 @@ def layout_config_from_mpl(viewer, **kwargs):
     return config
 
 
-def traces_for_layer(viewer_state, layer_state, add_data_label=True):
-    traces = []
-    legend_group = uuid4().hex
+def traces_for_layer(viewer_state, layer_state, add_data_label=True, *, plain=False):
     bars_id = uuid4().hex
 
     # The x values should be at the midpoints between successive pairs of edge values
     edges, y = layer_state.histogram
-    x = [0.5 * (edges[i] + edges[i + 1]) for i in range(len(edges) - 1)]
+    x = 0.5 * (edges[:-1] + edges[1:])
 
     # set the opacity and remove bar borders
     # set all bars to be the same color
@@ -55,24 +59,12 @@ def traces_for_layer(viewer_state, layer_state, add_data_label=True):
     if add_data_label and not isinstance(layer_state.layer, BaseData):
         name += f" ({layer_state.layer.data.label})"
 
-    hist_info = dict(hoverinfo="skip", marker=marker, name=name)
+    hist_info = dict(hoverinfo="skip", marker=marker, name=name,
+                     x=x, y=y, meta=bars_id)
+
+    # With a log x axis the bins don't all have the same width, which Plotly
+    # can't work out from the bar positions, so each bar gets its own width
     if viewer_state.x_log:
-        for i in range(len(x)):
-            hist_info.update(
-                legendgroup=legend_group,
-                showlegend=i == 0,
-                x=[x[i]],
-                y=[y[i]],
-                width=edges[i + 1] - edges[i],
-                meta=bars_id
-            )
-            traces.append(Bar(**hist_info))
-    else:
-        hist_info.update(
-            x=x,
-            y=y,
-            meta=bars_id
-        )
-        traces.append(Bar(**hist_info))
-
-    return traces
+        hist_info.update(width=np.diff(edges))
+
+    return [new_trace(Bar, plain=plain, **hist_info)]
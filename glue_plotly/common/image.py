@@ -22,7 +22,9 @@ from glue_plotly.common import (
     base_layout_config,
     color_info,
     fixed_color,
+    hover_info,
     layers_to_export,
+    new_trace,
     sanitize,
 )
 from glue_plotly.common.scatter2d import size_info as scatter_size_info
@@ -231,7 +233,7 @@ def full_view_transpose(viewer_state):
     return full_view, transpose
 
 
-def empty_secondary_layer(viewer_state, secondary_x, secondary_y):
+def empty_secondary_layer(viewer_state, secondary_x, secondary_y, *, plain=False):
     bg = np.ones(shape(viewer_state))
     secondary_info = dict(z=bg,
                           colorscale=[[0, "rgb(0,0,0)"], [1, "rgb(0,0,0)"]],
@@ -240,10 +242,10 @@ def empty_secondary_layer(viewer_state, secondary_x, secondary_y):
                           showscale=False,
                           xaxis="x2" if secondary_x else "x",
                           yaxis="y2" if secondary_y else "y")
-    return Heatmap(**secondary_info)
+    return new_trace(Heatmap, plain=plain, **secondary_info)
 
 
-def background_heatmap_layer(viewer_state):
+def background_heatmap_layer(viewer_state, *, plain=False):
     """
     This function creates an all-white heatmap which we can use as the bottom layer
     when the viewer is using colormap, to match what we see in glue
@@ -253,10 +255,10 @@ def background_heatmap_layer(viewer_state):
     bottom_colorstring = f"rgb{bottom_color}"
     bottom_info = dict(z=bg, hoverinfo="skip", opacity=1, showscale=False,
                        colorscale=[[0, bottom_colorstring], [1, bottom_colorstring]])
-    return Heatmap(**bottom_info)
+    return new_trace(Heatmap, plain=plain, **bottom_info)
 
 
-def traces_for_pixel_subset_layer(viewer_state, layer_state):
+def traces_for_pixel_subset_layer(viewer_state, layer_state, *, plain=False):
     subset_state = layer_state.layer.subset_state
 
     try:
@@ -281,12 +283,14 @@ def traces_for_pixel_subset_layer(viewer_state, layer_state):
                        "x": [viewer_state.x_min, viewer_state.x_max],
                        "y": [y, y],
                        "showlegend": False}
-        return [Scatter(**x_line_data), Scatter(**y_line_data)]
+        return [new_trace(Scatter, plain=plain, **x_line_data),
+                new_trace(Scatter, plain=plain, **y_line_data)]
     except IncompatibleAttribute:
         return []
 
 
-def traces_for_nonpixel_subset_layer(viewer_state, layer_state, full_view, transpose):
+def traces_for_nonpixel_subset_layer(viewer_state, layer_state, full_view, transpose,
+                                     *, plain=False):
     subset_state = layer_state.layer.subset_state
     ref_data = viewer_state.reference_data
     color = fixed_color(layer_state)
@@ -316,11 +320,11 @@ def traces_for_nonpixel_subset_layer(viewer_state, layer_state, full_view, trans
         showlegend=True
     )
 
-    return [Heatmap(**image_info)]
+    return [new_trace(Heatmap, plain=plain, **image_info)]
 
 
 def traces_for_scatter_layer(viewer_state, layer_state,
-                             hover_data=None, add_data_label=True):
+                             hover_data=None, add_data_label=True, *, plain=False):
     x = layer_state.layer[viewer_state.x_att].copy()
     y = layer_state.layer[viewer_state.y_att].copy()
     arrs = [x, y]
@@ -340,20 +344,6 @@ def traces_for_scatter_layer(viewer_state, layer_state,
                   size=scatter_size_info(layer_state, mask),
                   sizemin=1)
 
-    if hover_data is None or np.sum(hover_data) == 0:
-        hoverinfo = "skip"
-        hovertext = None
-    else:
-        hoverinfo = "text"
-        hovertext = ["" for _ in range(layer_state.layer.shape[0])]
-        for component in layer_state.layer.components:
-            label = component.label
-            if hover_data.get(label, False):
-                hover_values = layer_state.layer[label][mask]
-                for k in range(len(hover_values)):
-                    hovertext[k] = (hovertext[k] + f"{label}: {hover_values[k]} <br>"
-                                    )
-
     name = layer_state.layer.label
     if add_data_label and not isinstance(layer_state.layer, BaseData):
         name += f" ({layer_state.layer.data.label})"
@@ -363,14 +353,13 @@ def traces_for_scatter_layer(viewer_state, layer_state,
                         y=y,
                         xaxis="x",
                         yaxis="y",
-                        hoverinfo=hoverinfo,
-                        hovertext=hovertext,
-                        name=name)
+                        name=name,
+                        **hover_info(layer_state, mask, hover_data))
 
-    return [Scatter(**scatter_info)]
+    return [new_trace(Scatter, plain=plain, **scatter_info)]
 
 
-def traces_for_image_layer(layer):
+def traces_for_image_layer(layer, *, plain=False):
     layer_state = layer.state
 
     interval = ManualInterval(layer_state.v_min, layer_state.v_max)
@@ -402,21 +391,21 @@ def traces_for_image_layer(layer):
                       showscale=False,
                       showlegend=True,
                       opacity=layer_state.alpha)
-    return [Heatmap(**image_info)]
+    return [new_trace(Heatmap, plain=plain, **image_info)]
 
 
-def single_color_trace(viewer):
+def single_color_trace(viewer, *, plain=False):
     img = composite_array(viewer)()
     img[:, :, :3] *= 256
     image_info = dict(z=img,
                       opacity=1,
                       hoverinfo="skip")
 
-    return Image(**image_info)
+    return new_trace(Image, plain=plain, **image_info)
 
 
 def traces(viewer, secondary_x=False, secondary_y=False,
-           hover_selections=None, add_data_label=True):
+           hover_selections=None, add_data_label=True, *, plain=False):
     traces = []
     layers = layers_by_type(viewer)
     using_colormaps = viewer.state.color_mode == "Colormaps"
@@ -427,19 +416,21 @@ def traces(viewer, secondary_x=False, secondary_y=False,
         full_view, transpose = full_view_transpose(viewer.state)
 
     if using_colormaps:
-        traces.append(background_heatmap_layer(viewer.state))
+        traces.append(background_heatmap_layer(viewer.state, plain=plain))
         for layer in layers["image"]:
-            traces += traces_for_image_layer(layer)
+            traces += traces_for_image_layer(layer, plain=plain)
     else:
-        traces.append(single_color_trace(viewer))
+        traces.append(single_color_trace(viewer, plain=plain))
 
     for layer in layers["image_subset"]:
         subset_state = layer.layer.subset_state
         if isinstance(subset_state, PixelSubsetState):
-            traces += traces_for_pixel_subset_layer(viewer.state, layer.state)
+            traces += traces_for_pixel_subset_layer(viewer.state, layer.state,
+                                                    plain=plain)
         else:
             traces += traces_for_nonpixel_subset_layer(viewer.state, layer.state,
-                                                       full_view, transpose)
+                                                       full_view, transpose,
+                                                       plain=plain)
 
     for layer in layers["scatter"]:
         hover_data = hover_selections[layer.state.layer.label] \
@@ -447,9 +438,11 @@ def traces(viewer, secondary_x=False, secondary_y=False,
                      else None
         traces += traces_for_scatter_layer(viewer.state, layer.state,
                                            hover_data=hover_data,
-                                           add_data_label=add_data_label)
+                                           add_data_label=add_data_label,
+                                           plain=plain)
 
     if secondary_x or secondary_y:
-        traces.append(empty_secondary_layer(viewer.state, secondary_x, secondary_y))
+        traces.append(empty_secondary_layer(viewer.state, secondary_x, secondary_y,
+                                            plain=plain))
 
     return traces
@@ -1,21 +1,31 @@
 from uuid import uuid4
 
 import numpy as np
-import plotly.figure_factory as ff
 import plotly.graph_objs as go
+from matplotlib.colors import to_rgb
 
 from glue.config import settings
 from glue.core import BaseData
 from glue.core.util import ThetaRadianFormatter
 from glue.utils import ensure_numerical
-from glue.viewers.scatter.layer_artist import ColoredLineCollection
 
 from .common import (
     DEFAULT_FONT,
     base_layout_config,
     base_rectilinear_axis,
+    cmap_and_limits,
+    color_groups,
     color_info,
+    colorscale,
     dimensions,
+    error_bar_cap_size,
+    error_bar_coordinates,
+    fixed_color,
+    hover_info,
+    marker_color_info,
+    nan_separated,
+    new_trace,
+    rgba_strings,
     sanitize,
 )
 
@@ -26,6 +36,46 @@ LINESTYLES = {
     "dashdot": "dashdot"
 }
 
+# Layers with more points than this are drawn with WebGL (Scattergl and
+# Scatterpolargl) rather than SVG traces, which don't stay interactive
+# for very large numbers of points
+WEBGL_THRESHOLD = "PLOTLY_WEBGL_THRESHOLD"
+settings.add(WEBGL_THRESHOLD, 100_000, validator=int)
+
+# If set, colormapped markers are colored by passing the numeric attribute
+# values, the color limits and a colorscale to Plotly, which then does the
+# color mapping, rather than one ``rgba(...)`` string per point. This is
+# disabled by default
+NUMERIC_COLORS = "PLOTLY_NUMERIC_COLORS"
+settings.add(NUMERIC_COLORS, False, validator=bool)
+
+
+def _optional_int(value):
+    return None if value is None else int(value)
+
+
+# Layers with more points than this are exported as density maps, even if
+# they aren't shown as density maps in the viewer. This is disabled by default
+DENSITY_THRESHOLD = "PLOTLY_DENSITY_THRESHOLD"
+settings.add(DENSITY_THRESHOLD, None, validator=_optional_int)
+
+# Matplotlib's default figure resolution. The number of density map bins is
+# the viewer size in inches times the layer dpi, as in the glue Matplotlib
+# scatter viewer
+FIGURE_DPI = 100
+
+
+def use_webgl(npoints, threshold=None):
+    if threshold is None:
+        threshold = settings.PLOTLY_WEBGL_THRESHOLD
+    return npoints > threshold
+
+
+def scatter_trace_class(polar=False, webgl=False):
+    if polar:
+        return go.Scatterpolargl if webgl else go.Scatterpolar
+    return go.Scattergl if webgl else go.Scatter
+
 
 def projection_type(viewer_state):
     proj = viewer_state.plot_mode
@@ -210,38 +260,49 @@ def scatter_mode(layer_state):
     return "markers"
 
 
-def rectilinear_lines(layer_state, marker, x, y, legend_group=None):
+def rectilinear_lines(layer_state, marker, x, y, legend_group=None, *, plain=False):
     line = dict(dash=LINESTYLES[layer_state.linestyle], width=layer_state.linewidth)
 
     if layer_state.cmap_mode == "Fixed":
         line["color"] = color_info(layer_state)
 
-    if layer_state.cmap_mode == "Linear":
+    if layer_state.cmap_mode == "Linear" and len(x) > 1:
         line_id = uuid4().hex
         # set mode to markers and plot the colored line over it
         rgba_strs = marker["color"] if layer_state.fill else marker["line"]["color"]
-        lc = ColoredLineCollection(x, y)
-        segments = lc.get_segments()
-        # generate list of indices to parse colors over
-        indices = np.repeat(range(len(x)), 2)
-        indices = indices[1:len(x) * 2 - 1]
+
+        # Each point colors the piece of the line running from the midpoint with
+        # its predecessor to the midpoint with its successor. Rather than making
+        # a trace for each piece, we draw all of the pieces of a given color
+        # as a single trace, using NaNs to break the line between pieces.
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        mid_x = 0.5 * (x[1:] + x[:-1])
+        mid_y = 0.5 * (y[1:] + y[:-1])
+        start_x = np.concatenate([x[:1], mid_x])
+        start_y = np.concatenate([y[:1], mid_y])
+        end_x = np.concatenate([mid_x, x[-1:]])
+        end_y = np.concatenate([mid_y, y[-1:]])
 
         traces = [
-            go.Scatter(
-                x=[segments[i][0][0], segments[i][1][0]],
-                y=[segments[i][0][1], segments[i][1][1]],
+            new_trace(
+                go.Scatter,
+                plain=plain,
+                x=nan_separated(start_x[indices], x[indices], end_x[indices]),
+                y=nan_separated(start_y[indices], y[indices], end_y[indices]),
                 mode="lines",
                 legendgroup=legend_group,
                 line=dict(
                     dash=LINESTYLES[layer_state.linestyle],
                     width=layer_state.linewidth,
-                    color=rgba_strs[indices[i]]),
+                    color=color),
+                connectgaps=False,
                 showlegend=False,
                 visible=layer_state.line_visible,
                 hoverinfo="skip",
                 meta=line_id
             )
-            for i in range(len(segments))
+            for color, indices in color_groups(rgba_strs)
         ]
     else:
         traces = []
@@ -249,7 +310,8 @@ def rectilinear_lines(layer_state, marker, x, y, legend_group=None):
     return line, traces
 
 
-def rectilinear_error_bars(layer_state, marker, mask, x, y, axis, legend_group=None):
+def rectilinear_error_bars(layer_state, marker, mask, x, y, axis, legend_group=None,
+                           *, plain=False):
     err = {}
     traces = []
     err_att = getattr(layer_state, f"{axis}err_att")
@@ -257,25 +319,32 @@ def rectilinear_error_bars(layer_state, marker, mask, x, y, axis, legend_group=N
     err["array"] = ensure_numerical(layer_state.layer[err_att][mask].ravel())
     err["visible"] = True
 
-    # add points with error bars here if color mode is linear
+    # Plotly error bars can't follow a colorscale, so if the color mode is linear
+    # we draw the bars ourselves, with one trace for all of the bars of each color
     if layer_state.cmap_mode == "Linear":
         error_bar_id = uuid4().hex
-        for i, bar in enumerate(err["array"]):
-            scatter_info = dict(
-                x=[x[i]],
-                y=[y[i]],
-                mode="markers",
-                marker=dict(color=marker["color"][i]),
+        color = marker["color"] if layer_state.fill else marker["line"]["color"]
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        cap_axis = "y" if axis == "x" else "x"
+        cap_size = error_bar_cap_size(y if cap_axis == "y" else x)
+        for c, indices in color_groups(color):
+            coords = error_bar_coordinates(dict(x=x[indices], y=y[indices]),
+                                           axis, err["array"][indices],
+                                           cap_axis=cap_axis, cap_size=cap_size)
+            traces.append(new_trace(
+                go.Scatter,
+                plain=plain,
+                **coords,
+                mode="lines",
+                line=dict(color=c, width=2),
+                connectgaps=False,
                 showlegend=False,
                 legendgroup=legend_group,
                 hoverinfo="skip",
                 hovertext=None,
                 meta=error_bar_id
-            )
-            scatter_info[f"error_{axis}"] = dict(
-                type="data", color=marker["color"][i],
-                array=[bar], visible=True)
-            traces.append(go.Scatter(**scatter_info))
+            ))
 
     return err, traces
 
@@ -291,7 +360,43 @@ def _adjusted_vector_points(origin, scale, x, y, vx, vy):
     return x - vx, y - vy
 
 
-def rectilinear_2d_vectors(viewer, layer_state, marker, mask, x, y, legend_group=None):
+def quiver_arrows(x, y, u, v, *, scale, arrow_scale, angle):
+    """
+    Compute the geometry of a set of quiver arrows in a single vectorized pass.
+    The arrows are the same as those produced by
+    ``plotly.figure_factory.create_quiver``.
+
+    Returns two arrays holding the x and y coordinates of the arrows, with one
+    row per arrow. Each row contains the shaft of the arrow followed by its
+    arrowhead, each terminated by a NaN, so that any selection of rows can be
+    flattened and drawn as a single trace. If ``angle`` is zero the (degenerate)
+    arrowheads are omitted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    end_x = x + scale * np.asarray(u, dtype=float)
+    end_y = y + scale * np.asarray(v, dtype=float)
+    gap = np.full(x.shape, np.nan)
+    columns_x = [x, end_x, gap]
+    columns_y = [y, end_y, gap]
+
+    if angle:
+        dx = end_x - x
+        dy = end_y - y
+        arrow_len = arrow_scale * np.hypot(dx, dy)
+        barb_angle = np.arctan2(dy, dx)
+        point1_x = end_x - arrow_len * np.cos(barb_angle + angle)
+        point1_y = end_y - arrow_len * np.sin(barb_angle + angle)
+        point2_x = end_x - arrow_len * np.cos(barb_angle - angle)
+        point2_y = end_y - arrow_len * np.sin(barb_angle - angle)
+        columns_x += [point1_x, end_x, point2_x, gap]
+        columns_y += [point1_y, end_y, point2_y, gap]
+
+    return np.column_stack(columns_x), np.column_stack(columns_y)
+
+
+def rectilinear_2d_vectors(viewer, layer_state, marker, mask, x, y, legend_group=None,
+                           *, plain=False):
     width, _ = dimensions(viewer)
     vx = layer_state.layer[layer_state.vx_att][mask]
     vy = layer_state.layer[layer_state.vy_att][mask]
@@ -311,32 +416,31 @@ def rectilinear_2d_vectors(viewer, layer_state, marker, mask, x, y, legend_group
     minfrac = min(xrange / diag, yrange / diag)
     arrow_scale = 0.2
     angle = np.pi * minfrac / 3 if layer_state.vector_arrowhead else 0
-    vector_info = dict(scale=scale,
-                       angle=angle,
+    vector_info = dict(mode="lines",
                        name="quiver",
-                       arrow_scale=arrow_scale,
-                       line=dict(width=5),
                        legendgroup=legend_group,
                        showlegend=False,
                        hoverinfo="skip",
                        meta=uuid4().hex)
     x_vec, y_vec = _adjusted_vector_points(layer_state.vector_origin, scale,
                                            x, y, vx, vy)
+    arrows_x, arrows_y = quiver_arrows(x_vec, y_vec, vx, vy, scale=scale,
+                                       arrow_scale=arrow_scale, angle=angle)
+
+    color = marker["color"] if layer_state.fill else marker["line"]["color"]
     if layer_state.cmap_mode == "Fixed":
-        fig = ff.create_quiver(x_vec, y_vec, vx, vy, **vector_info)
-        fig.update_traces(marker=dict(color=marker["color"]))
+        groups = [(color, slice(None))]
     else:
-        # start with the first quiver to add the rest
-        color = marker["color"] if layer_state.fill else marker["line"]["color"]
-        fig = ff.create_quiver([x[0]], [y[0]], [vx[0]], [vy[0]],
-                               **vector_info, line_color=color[0])
-        for i in range(1, len(color)):
-            fig1 = ff.create_quiver([x[i]], [y[i]], [vx[i]], [vy[i]],
-                                    **vector_info,
-                                    line_color=color[i])
-            fig.add_traces(data=fig1.data)
+        # Draw all of the arrows of a given color as a single trace
+        groups = color_groups(color)
 
-    return list(fig.data)
+    return [new_trace(go.Scatter,
+                      plain=plain,
+                      x=arrows_x[indices].ravel(),
+                      y=arrows_y[indices].ravel(),
+                      line=dict(width=5, color=c),
+                      **vector_info)
+            for c, indices in groups]
 
 
 def size_info(layer_state, mask=None):
@@ -346,10 +450,10 @@ def size_info(layer_state, mask=None):
         return layer_state.size_scaling * layer_state.size
 
     # scale size of points by set size scaling
-    data = layer_state.layer[layer_state.size_att]
+    data = np.ravel(layer_state.layer[layer_state.size_att])
     if mask is not None:
-        data = data[mask]
-    s = ensure_numerical(data.ravel())
+        data = data[np.ravel(mask)]
+    s = ensure_numerical(data)
     s = ((s - layer_state.size_vmin) /
          (layer_state.size_vmax - layer_state.size_vmin))
     # The following ensures that the sizes are in the
@@ -362,26 +466,125 @@ def size_info(layer_state, mask=None):
     return s
 
 
-def base_marker(layer_state, mask=None):
-    color = color_info(layer_state, mask)
+def base_marker(layer_state, mask=None, numeric_color=False):
+    color = marker_color_info(layer_state, mask, numeric=numeric_color)
     marker = dict(size=size_info(layer_state, mask),
-                  color=color,
                   opacity=layer_state.alpha)
 
     if layer_state.fill:
+        marker.update(color)
         marker["line"] = dict(width=0)
     else:
         marker["color"] = "rgba(0,0,0,0)"
-        marker["line"] = dict(width=1, color=color)
+        marker["line"] = dict(width=1, **color)
 
     return marker
 
 
-def trace_data_for_layer(viewer, layer_state, hover_data=None, add_data_label=True):
-    traces = {}
+def use_density_map(viewer_state, layer_state, threshold=None):
+    if not (getattr(viewer_state, "using_rectilinear", True) and
+            layer_state.markers_visible):
+        return False
+    if layer_state.density_map:
+        return True
+    if threshold is None:
+        threshold = settings.PLOTLY_DENSITY_THRESHOLD
+    layer = layer_state.layer
+    # The size of a subset is that of its data, so only compute its mask if
+    # the data is above the threshold
+    if threshold is None or layer.size <= threshold:
+        return False
+    if isinstance(layer, BaseData):
+        return True
+    return np.count_nonzero(layer.to_mask()) > threshold
+
+
+def density_bins(viewer):
+    width, height = dimensions(viewer)
+    dpi = viewer.state.dpi
+    return (max(int(height * dpi / FIGURE_DPI), 1),
+            max(int(width * dpi / FIGURE_DPI), 1))
+
+
+def _bin_centers(limits, bins, log=False):
+    lower, upper = sorted(limits)
+    if log:
+        edges = np.logspace(np.log10(lower), np.log10(upper), bins + 1)
+        return np.sqrt(edges[:-1] * edges[1:])
+    edges = np.linspace(lower, upper, bins + 1)
+    return 0.5 * (edges[:-1] + edges[1:])
+
+
+def _compute_density_map(viewer_state, layer_state, bins, range):
+    # This follows ScatterLayerState.compute_density_map, but also works for
+    # layers which aren't shown as density maps
+    if isinstance(layer_state.layer, BaseData):
+        data = layer_state.layer
+        subset_state = None
+    else:
+        data = layer_state.layer.data
+        subset_state = layer_state.layer.subset_state
+
+    cids = [viewer_state.y_att, viewer_state.x_att]
+    kwargs = dict(subset_state=subset_state, bins=bins, range=range,
+                  log=(viewer_state.y_log, viewer_state.x_log))
+    count = data.compute_histogram(cids, **kwargs)
+    if layer_state.cmap_mode == "Fixed":
+        return count
+
+    total = data.compute_histogram(cids, weights=layer_state.cmap_att, **kwargs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / count
+
 
-    x = layer_state.layer[viewer.state.x_att].copy()
-    y = layer_state.layer[viewer.state.y_att].copy()
+def density_map_info(viewer_state, layer_state, bins):
+    """
+    Bin a layer over the current viewer limits and return the properties of a
+    Plotly ``Heatmap`` showing its density map.
+
+    With a fixed color, the counts are scaled to the density contrast, passed
+    through the layer stretch, and shown with a colorscale that goes from
+    transparent to the layer color. With a colormap, each bin shows the mean of
+    the colormapped attribute. Empty bins are transparent in both cases.
+    """
+    x_limits = (viewer_state.x_min, viewer_state.x_max)
+    y_limits = (viewer_state.y_min, viewer_state.y_max)
+    density = _compute_density_map(viewer_state, layer_state, bins,
+                                   range=[y_limits, x_limits])
+    density = np.asarray(density, dtype=float)
+
+    if layer_state.cmap_mode == "Fixed":
+        peak = np.nanmax(density) if density.size else 0
+        if peak > 0:
+            vmax = 10 ** (np.log10(peak) * layer_state.density_contrast)
+            z = layer_state.stretch_object(np.clip(density / vmax, 0, 1))
+        else:
+            z = np.zeros_like(density)
+        z[density == 0] = np.nan
+        r, g, b = to_rgb(fixed_color(layer_state))
+        colors = rgba_strings([[r, g, b, 0], [r, g, b, 1]])
+        z_info = dict(z=z, zmin=0, zmax=1,
+                      colorscale=[[0, colors[0]], [1, colors[1]]])
+    else:
+        cmap, vmin, vmax = cmap_and_limits(layer_state)
+        z_info = dict(z=density, zmin=vmin, zmax=vmax,
+                      colorscale=colorscale(cmap))
+
+    return dict(x=_bin_centers(x_limits, bins[1], viewer_state.x_log),
+                y=_bin_centers(y_limits, bins[0], viewer_state.y_log),
+                opacity=layer_state.alpha,
+                showscale=False,
+                hoverinfo="skip",
+                **z_info)
+
+
+def sanitized_arrays(viewer_state, layer_state):
+    """
+    Return the mask of the points of a layer that are drawn (those without NaN
+    coordinates, color or size values) and the values of the drawn points.
+    """
+    x = layer_state.layer[viewer_state.x_att].copy()
+    y = layer_state.layer[viewer_state.y_att].copy()
     arrs = [x, y]
     if layer_state.cmap_mode == "Linear":
         cvals = layer_state.layer[layer_state.cmap_att].copy()
@@ -390,25 +593,54 @@ def trace_data_for_layer(viewer, layer_state, hover_data=None, add_data_label=Tr
         svals = layer_state.layer[layer_state.size_att].copy()
         arrs.append(svals)
 
-    mask, sanitized = sanitize(*arrs)
+    return sanitize(*arrs)
+
+
+def trace_data_for_layer(viewer, layer_state, hover_data=None, add_data_label=True,
+                         *, numeric_color=False, webgl_threshold=None,
+                         density_threshold=None, plain=False):
+    traces = {}
+
+    name = layer_state.layer.label
+    if add_data_label and not isinstance(layer_state.layer, BaseData):
+        name += f" ({layer_state.layer.data.label})"
+
+    if use_density_map(viewer.state, layer_state, density_threshold):
+        info = density_map_info(viewer.state, layer_state, density_bins(viewer))
+        traces["density"] = [new_trace(go.Heatmap, plain=plain,
+                                       name=name, showlegend=True, **info)]
+        return traces
+
+    mask, sanitized = sanitized_arrays(viewer.state, layer_state)
     x, y = sanitized[:2]
 
     legend_group = uuid4().hex
 
     rectilinear = getattr(viewer.state, "using_rectilinear", True)
 
-    marker = base_marker(layer_state, mask)
+    marker = base_marker(layer_state, mask, numeric_color=numeric_color)
+
+    # The line, error bar and vector traces are grouped by color, so they
+    # need the colors of the individual points as strings
+    segments_visible = layer_state.line_visible or \
+        (rectilinear and (layer_state.vector_visible or
+                          layer_state.xerr_visible or layer_state.yerr_visible))
+    if numeric_color and layer_state.cmap_mode == "Linear" and segments_visible:
+        segment_marker = base_marker(layer_state, mask)
+    else:
+        segment_marker = marker
 
     # add vectors
     if rectilinear and layer_state.vector_visible and layer_state.vector_scaling > 0.1:
-        vec_traces = rectilinear_2d_vectors(viewer, layer_state, marker, mask,
-                                            x, y, legend_group)
+        vec_traces = rectilinear_2d_vectors(viewer, layer_state, segment_marker, mask,
+                                            x, y, legend_group, plain=plain)
         traces["vector"] = vec_traces
 
     # add line properties
     mode = scatter_mode(layer_state)
     if layer_state.line_visible:
-        line, line_traces = rectilinear_lines(layer_state, marker, x, y, legend_group)
+        line, line_traces = rectilinear_lines(layer_state, segment_marker,
+                                              x, y, legend_group, plain=plain)
         if line_traces:
             traces["line"] = line_traces
     else:
@@ -416,52 +648,36 @@ def trace_data_for_layer(viewer, layer_state, hover_data=None, add_data_label=Tr
 
     if rectilinear:
         if layer_state.xerr_visible:
-            xerr, xerr_traces = rectilinear_error_bars(layer_state, marker, mask,
-                                                       x, y, "x", legend_group)
+            xerr, xerr_traces = rectilinear_error_bars(layer_state, segment_marker,
+                                                       mask, x, y, "x",
+                                                       legend_group, plain=plain)
             if xerr_traces:
                 traces["xerr"] = xerr_traces
         if layer_state.yerr_visible:
-            yerr, yerr_traces = rectilinear_error_bars(layer_state, marker, mask,
-                                                       x, y, "y", legend_group)
+            yerr, yerr_traces = rectilinear_error_bars(layer_state, segment_marker,
+                                                       mask, x, y, "y",
+                                                       legend_group, plain=plain)
             if yerr_traces:
                 traces["yerr"] = yerr_traces
 
-    if hover_data is None or np.sum(hover_data) == 0:
-        hoverinfo = "skip"
-        hovertext = None
-    else:
-        hoverinfo = "text"
-        hovertext = ["" for _ in range(mask.size)]
-        for component in layer_state.layer.components:
-            label = component.label
-            if hover_data.get(label, False):
-                hover_values = layer_state.layer[label][mask]
-                for k in range(len(hover_values)):
-                    hovertext[k] = (hovertext[k] + f"{label}: {hover_values[k]} <br>"
-                                    )
-
-    name = layer_state.layer.label
-    if add_data_label and not isinstance(layer_state.layer, BaseData):
-        name += f" ({layer_state.layer.data.label})"
-
-    # The <extra></extra> removes 'trace <#>' from tooltip
     scatter_info = dict(
         mode=mode,
         marker=marker,
         line=line,
-        hoverinfo=hoverinfo,
-        hovertext=hovertext,
         name=name,
-        legendgroup=legend_group
+        legendgroup=legend_group,
+        **hover_info(layer_state, mask, hover_data)
     )
 
     polar = getattr(viewer.state, "using_polar", False)
     degrees = viewer.state.using_degrees
+    webgl = use_webgl(x.size, webgl_threshold)
     if polar:
         scatter_info.update(theta=x,
                             r=y,
                             thetaunit="degrees" if degrees else "radians")
-        traces["scatter"] = [go.Scatterpolar(**scatter_info)]
+        trace_cls = scatter_trace_class(polar=True, webgl=webgl)
+        traces["scatter"] = [new_trace(trace_cls, plain=plain, **scatter_info)]
     elif rectilinear:
         scatter_info.update(x=x, y=y)
         if layer_state.cmap_mode == "Fixed":
@@ -470,14 +686,15 @@ def trace_data_for_layer(viewer, layer_state, hover_data=None, add_data_label=Tr
                 scatter_info.update(error_x=xerr)
             if layer_state.yerr_visible:
                 scatter_info.update(error_y=yerr)
-        traces["scatter"] = [go.Scatter(**scatter_info)]
+        trace_cls = scatter_trace_class(webgl=webgl)
+        traces["scatter"] = [new_trace(trace_cls, plain=plain, **scatter_info)]
     else:
         if not degrees:
             x = np.rad2deg(x)
             y = np.rad2deg(y)
 
         scatter_info.update(lon=x, lat=y)
-        traces["scatter"] = [go.Scattergeo(**scatter_info)]
+        traces["scatter"] = [new_trace(go.Scattergeo, plain=plain, **scatter_info)]
 
     return traces
 
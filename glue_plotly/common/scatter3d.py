@@ -7,7 +7,15 @@ from plotly.graph_objs import Cone, Scatter3d
 
 from glue.core import BaseData
 from glue.utils import ensure_numerical
-from glue_plotly.common import color_info, sanitize
+from glue_plotly.common import (
+    color_groups,
+    color_info,
+    error_bar_cap_size,
+    error_bar_coordinates,
+    hover_info,
+    new_trace,
+    sanitize,
+)
 from glue_plotly.common.base_3d import bbox_mask
 
 
@@ -31,7 +39,13 @@ def size_info(layer_state, mask, size_att="size_attribute"):
     return s
 
 
-def vector_cones(layer_state, mask, marker, x, y, z, hovertext, hoverinfo):
+def _cone_hover_info(hover, index):
+    if "customdata" not in hover:
+        return hover
+    return {**hover, "customdata": hover["customdata"][index:index + 1]}
+
+
+def vector_cones(layer_state, mask, marker, x, y, z, hover, *, plain=False):
     legend_group = uuid4().hex
     vx = layer_state.layer[layer_state.vx_attribute][mask]
     vy = layer_state.layer[layer_state.vy_attribute][mask]
@@ -52,23 +66,23 @@ def vector_cones(layer_state, mask, marker, x, y, z, hovertext, hoverinfo):
         colorscale = [[0, c], [1, c]]
 
         for i in range(len(x)):
-            ht = None if hovertext is None else [hovertext[i]]
-            cone = Cone(x=[x[i]], y=[y[i]], z=[z[i]],
-                        u=[vx_v[i]], v=[vy_v[i]], w=[vz_v[i]],
-                        name=name, anchor=anchor, colorscale=colorscale,
-                        hoverinfo=hoverinfo, hovertext=ht,
-                        showscale=False, legendgroup=legend_group,
-                        sizemode="absolute", showlegend=not i, sizeref=1)
+            cone = new_trace(Cone, plain=plain,
+                             x=[x[i]], y=[y[i]], z=[z[i]],
+                             u=[vx_v[i]], v=[vy_v[i]], w=[vz_v[i]],
+                             name=name, anchor=anchor, colorscale=colorscale,
+                             **_cone_hover_info(hover, i),
+                             showscale=False, legendgroup=legend_group,
+                             sizemode="absolute", showlegend=not i, sizeref=1)
             cones.append(cone)
     else:
         for i, c in enumerate(marker["color"]):
-            ht = None if hovertext is None else [hovertext[i]]
-            cone = Cone(x=[x[i]], y=[y[i]], z=[z[i]],
-                        u=[vx_v[i]], v=[vy_v[i]], w=[vz_v[i]],
-                        name=name, anchor=anchor, colorscale=[[0, c], [1, c]],
-                        hoverinfo=hoverinfo, hovertext=ht,
-                        showscale=False, legendgroup=legend_group,
-                        sizemode="scaled", showlegend=not i, sizeref=1)
+            cone = new_trace(Cone, plain=plain,
+                             x=[x[i]], y=[y[i]], z=[z[i]],
+                             u=[vx_v[i]], v=[vy_v[i]], w=[vz_v[i]],
+                             name=name, anchor=anchor, colorscale=[[0, c], [1, c]],
+                             **_cone_hover_info(hover, i),
+                             showscale=False, legendgroup=legend_group,
+                             sizemode="scaled", showlegend=not i, sizeref=1)
             cones.append(cone)
 
     return cones
@@ -78,24 +92,53 @@ def error_bar_info(layer_state, mask):
     errs = {}
     for ax in ["x", "y", "z"]:
         err = {}
-        if getattr(layer_state, f"{ax}err_visible", False):
+        # Plotly error bars can't follow a colorscale, so in that case
+        # the bars are drawn as separate traces by `error_bar_traces`
+        if getattr(layer_state, f"{ax}err_visible", False) and \
+                layer_state.color_mode == "Fixed":
             err["type"] = "data"
             err_att = getattr(layer_state, f"{ax}err_attribute")
             err["array"] = np.absolute(ensure_numerical(
                 layer_state.layer[err_att][mask].ravel()))
             err["visible"] = True
-
-            # AFAICT, it seems that we can't have error bars follow the colorscale
-            # (if we don't set this and aren't in fixed color mode,
-            # they just don't appear).
-            # So for now, let's just make them black.
-            if layer_state.color_mode != "Fixed":
-                err["color"] = "#000000"
         errs[ax] = err
 
     return errs
 
 
+def error_bar_traces(layer_state, mask, marker, coords, legend_group=None,
+                     *, plain=False):
+    axes = [ax for ax in ["x", "y", "z"]
+            if getattr(layer_state, f"{ax}err_visible", False)]
+    if not axes or layer_state.color_mode == "Fixed":
+        return []
+
+    traces = []
+    coords = {ax: np.asarray(c, dtype=float) for ax, c in coords.items()}
+    groups = color_groups(marker["color"])
+    for ax in axes:
+        err_att = getattr(layer_state, f"{ax}err_attribute")
+        errors = ensure_numerical(layer_state.layer[err_att][mask].ravel())
+        cap_axis = "y" if ax == "x" else "x"
+        cap_size = error_bar_cap_size(coords[cap_axis])
+        for color, indices in groups:
+            group_coords = {k: v[indices] for k, v in coords.items()}
+            traces.append(new_trace(
+                Scatter3d,
+                plain=plain,
+                **error_bar_coordinates(group_coords, ax, errors[indices],
+                                        cap_axis=cap_axis, cap_size=cap_size),
+                mode="lines",
+                line=dict(color=color, width=2),
+                connectgaps=False,
+                showlegend=False,
+                legendgroup=legend_group,
+                hoverinfo="skip"
+            ))
+
+    return traces
+
+
 _IPYVOLUME_GEOMETRY_SYMBOLS = {
     "sphere": "circle",
     "box": "square",
@@ -112,7 +155,8 @@ def symbol_for_geometry(geometry: str) -> str:
     raise ValueError(msg)
 
 
-def traces_for_layer(viewer_state, layer_state, hover_data=None, add_data_label=True):
+def traces_for_layer(viewer_state, layer_state, hover_data=None, add_data_label=True,
+                     *, plain=False):
 
     x = layer_state.layer[viewer_state.x_att]
     y = layer_state.layer[viewer_state.y_att]
@@ -151,38 +195,30 @@ def traces_for_layer(viewer_state, layer_state, hover_data=None, add_data_label=
         symbol = symbol_for_geometry(layer_state.geo)
         marker["symbol"] = symbol
 
-    if hover_data is None or np.sum(hover_data) == 0:
-        hoverinfo = "skip"
-        hovertext = None
-    else:
-        hoverinfo = "text"
-        hovertext = ["" for _ in range(mask.size)]
-        for component in layer_state.layer.components:
-            label = component.label
-            if hover_data.get(label, False):
-                hover_values = layer_state.layer[label][mask]
-                for k in range(len(hover_values)):
-                    hovertext[k] = (hovertext[k] + f"{label}: {hover_values[k]} <br>"
-                                    )
+    hover = hover_info(layer_state, mask, hover_data)
 
     cones = []
     if layer_state.vector_visible:
-        cones = vector_cones(layer_state, mask, marker, x, y, z, hovertext, hoverinfo)
+        cones = vector_cones(layer_state, mask, marker, x, y, z, hover, plain=plain)
 
+    legend_group = uuid4().hex
     err = error_bar_info(layer_state, mask)
+    err_traces = error_bar_traces(layer_state, mask, marker,
+                                  dict(x=x, y=y, z=z), legend_group, plain=plain)
 
     name = layer_state.layer.label
     if add_data_label and not isinstance(layer_state.layer, BaseData):
         name += f" ({layer_state.layer.data.label})"
 
-    scatter = Scatter3d(x=x, y=y, z=z,
+    scatter = new_trace(Scatter3d, plain=plain,
+                        x=x, y=y, z=z,
                         error_x=err["x"],
                         error_y=err["y"],
                         error_z=err["z"],
                         mode="markers",
                         marker=marker,
-                        hoverinfo=hoverinfo,
-                        hovertext=hovertext,
+                        legendgroup=legend_group,
+                        **hover,
                         name=layer_state.layer.label)
 
-    return [scatter] + cones
+    return [scatter] + err_traces + cones
@@ -2,6 +2,7 @@ from itertools import product
 
 import pytest
 from numpy import log10
+from numpy.testing import assert_allclose
 from plotly.graph_objs import Bar
 
 from glue.config import settings
@@ -118,11 +119,10 @@ class TestHistogram:
     def test_log_trace(self):
         self.viewer.state.x_log = True
         self.viewer.state.hist_n_bin = 3
-        edges, _ = self.layer.state.histogram
+        edges, counts = self.layer.state.histogram
         traces = traces_for_layer(self.viewer.state, self.layer.state)
-        assert len(traces) == len(edges) - 1
-        legend_group = traces[0]["legendgroup"]
-        for index, trace in enumerate(traces):
-            assert trace["legendgroup"] == legend_group
-            assert trace["showlegend"] == (index == 0)
-            assert trace["width"] == edges[index + 1] - edges[index]
+        assert len(traces) == 1
+        trace = traces[0]
+        assert_allclose(trace["x"], 0.5 * (edges[:-1] + edges[1:]))
+        assert_allclose(trace["y"], counts)
+        assert_allclose(trace["width"], edges[1:] - edges[:-1])
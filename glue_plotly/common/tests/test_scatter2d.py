@@ -1,9 +1,15 @@
+import json
 from itertools import product
+from unittest.mock import patch
+from uuid import UUID
 
 import pytest
-from numpy import log10, rad2deg
-from numpy.testing import assert_equal
-from plotly.graph_objs import Scatter, Scattergeo
+from numpy import array, log10, nan, nansum, pi, rad2deg
+from numpy.testing import assert_allclose, assert_equal
+from plotly.figure_factory import create_quiver
+from plotly.graph_objs import Figure, Heatmap, Scatter, Scattergeo, Scattergl
+from plotly.io import to_json
+from plotly.io.json import to_json_plotly
 
 from glue.config import settings
 from glue.core import Data
@@ -18,17 +24,20 @@ from glue_plotly.common import (
 from glue_plotly.common.scatter2d import (
     angle_ticks_text,
     base_marker,
+    density_map_info,
     geo_annotations,
     geo_layout_config,
     geo_ticks,
     projection_type,
+    quiver_arrows,
     rectilinear_2d_vectors,
     rectilinear_error_bars,
     rectilinear_lines,
     scatter_mode,
     trace_data_for_layer,
+    traces_for_layer,
 )
-from glue_plotly.utils import PLOTLY_MAJOR_VERSION
+from glue_plotly.utils import PLOTLY_MAJOR_VERSION, opacity_value_string
 
 pytest.importorskip("glue_qt")
 
@@ -178,6 +187,42 @@ class TestScatter2DRectilinear(TestScatter2D):
             assert marker["color"] == "rgba(0,0,0,0)"
             assert marker["line"] == dict(width=1, color="#ff0000")
 
+    @pytest.mark.parametrize("fill", [True, False])
+    def test_base_marker_numeric_color(self, fill):
+        layer_state = self.layer.state
+        layer_state.fill = fill
+        layer_state.cmap_mode = "Linear"
+        layer_state.cmap_att = self.data.id["z"]
+        layer_state.cmap_vmin = 9
+        layer_state.cmap_vmax = 7
+        marker = base_marker(layer_state, self.mask, numeric_color=True)
+        color = marker["color"] if fill else marker["line"]["color"]
+        assert_equal(color, [7, 8, 9])
+
+        color_props = marker if fill else marker["line"]
+        assert color_props["cmin"] == 7
+        assert color_props["cmax"] == 9
+        expected = color_info(layer_state, self.mask)
+        colorscale = color_props["colorscale"]
+        assert [position for position, _ in colorscale[::255]] == [0, 1]
+        assert [c for _, c in colorscale[::255]] == [expected[0], expected[-1]]
+
+    def test_color_info_cmap(self):
+        layer_state = self.layer.state
+        layer_state.cmap_mode = "Linear"
+        layer_state.cmap_att = self.data.id["z"]
+        layer_state.cmap_vmin = 9
+        layer_state.cmap_vmax = 7
+        colors = color_info(layer_state, self.mask)
+
+        cmap = layer_state.cmap.reversed()
+        expected = []
+        for value in self.data["z"]:
+            r, g, b, a = cmap((value - 7) / 2)
+            expected.append(f"rgba({int(256 * r)},{int(256 * g)},{int(256 * b)},"
+                            f"{opacity_value_string(a)})")
+        assert colors == expected
+
     def test_rectilinear_error_bars_cmap(self):
         layer_state = self.layer.state
         layer_state.cmap_mode = "Linear"
@@ -194,15 +239,29 @@ class TestScatter2DRectilinear(TestScatter2D):
         assert len(yerr["array"]) == mask_size
 
         color = color_info(layer_state, self.mask)
-        for traces in [xerr_traces, yerr_traces]:
+        nan = float("nan")
+        x_cap = 0.005 * (max(self.x) - min(self.x))
+        y_cap = 0.005 * (max(self.y) - min(self.y))
+        for axis, traces in (("x", xerr_traces), ("y", yerr_traces)):
+            assert len(traces) == len(set(color))
             for i, bar in enumerate(traces):
                 assert isinstance(bar, Scatter)
-                assert bar["x"] == self.x[i]
-                assert bar["y"] == self.y[i]
-                assert bar["mode"] == "markers"
+                x, y = self.x[i], self.y[i]
+                # Each bar is followed by a cap at both of its ends
+                if axis == "x":
+                    assert_allclose(bar["x"], (0, 2 * x, nan, 0, 0, nan,
+                                               2 * x, 2 * x, nan))
+                    assert_allclose(bar["y"], (y, y, nan, y - y_cap, y + y_cap, nan,
+                                               y - y_cap, y + y_cap, nan))
+                else:
+                    assert_allclose(bar["x"], (x, x, nan, x - x_cap, x + x_cap, nan,
+                                               x - x_cap, x + x_cap, nan))
+                    assert_allclose(bar["y"], (0, 2 * y, nan, 0, 0, nan,
+                                               2 * y, 2 * y, nan))
+                assert bar["mode"] == "lines"
                 assert bar["hoverinfo"] == "skip"
                 assert bar["hovertext"] is None
-                assert bar["marker"]["color"] == color[i]
+                assert bar["line"]["color"] == color[i]
 
     def test_rectilinear_error_bars_fixed_color(self):
         layer_state = self.layer.state
@@ -256,6 +315,26 @@ class TestScatter2DRectilinear(TestScatter2D):
             assert trace["line"]["dash"] == "dot"
             assert trace["line"]["width"] == 6
 
+    def test_rectilinear_lines_cmap_grouped(self):
+        layer_state = self.layer.state
+        layer_state.cmap_mode = "Linear"
+        layer_state.line_visible = True
+        marker = base_marker(layer_state, self.mask)
+        marker["color"] = ["#ff0000", "#00ff00", "#ff0000"]
+        _, traces = rectilinear_lines(layer_state, marker, self.x, self.y)
+
+        assert len(traces) == 2
+        assert len({trace["meta"] for trace in traces}) == 1
+        red, green = traces
+        assert red["line"]["color"] == "#ff0000"
+        assert green["line"]["color"] == "#00ff00"
+
+        nan = float("nan")
+        assert_equal(red["x"], (1, 1, 1.5, nan, 2.5, 3, 3, nan))
+        assert_equal(red["y"], (4, 4, 4.5, nan, 5.5, 6, 6, nan))
+        assert_equal(green["x"], (1.5, 2, 2.5, nan))
+        assert_equal(green["y"], (4.5, 5, 5.5, nan))
+
     @pytest.mark.parametrize("cmap_mode", ["Fixed", "Linear"])
     def test_rectilinear_vectors(self, cmap_mode):
         layer_state = self.layer.state
@@ -271,12 +350,30 @@ class TestScatter2DRectilinear(TestScatter2D):
         if cmap_mode == "Fixed":
             assert len(traces) == 1
             trace = traces[0]
-            assert trace["marker"]["color"] == color
+            assert trace["line"]["color"] == color
         elif cmap_mode == "Linear":
             assert len(traces) == sum(self.mask)
             for i, trace in enumerate(traces):
                 assert trace["line_color"] == color[i]
 
+    @pytest.mark.parametrize("angle", [0, pi / 9])
+    def test_quiver_arrows(self, angle):
+        x, y = [0, 1, 2], [4, -1, 3]
+        u, v = [1, -2, 0.5], [3, 1, -1]
+        arrows_x, arrows_y = quiver_arrows(x, y, u, v, scale=0.5,
+                                           arrow_scale=0.2, angle=angle)
+        assert arrows_x.shape == arrows_y.shape == (3, 7 if angle else 3)
+
+        # The geometry should match what the Plotly figure factory produces
+        quiver = create_quiver(x, y, u, v, scale=0.5, arrow_scale=0.2, angle=angle)
+        expected_x = array(quiver.data[0].x, dtype=float)
+        expected_y = array(quiver.data[0].y, dtype=float)
+        assert_allclose(arrows_x[:, :3], expected_x[:9].reshape(3, 3))
+        assert_allclose(arrows_y[:, :3], expected_y[:9].reshape(3, 3))
+        if angle:
+            assert_allclose(arrows_x[:, 3:], expected_x[9:].reshape(3, 4))
+            assert_allclose(arrows_y[:, 3:], expected_y[9:].reshape(3, 4))
+
     def test_rectilinear_traces(self):
         self.layer.state.vector_visible = True
         self.layer.state.xerr_visible = True
@@ -290,8 +387,107 @@ class TestScatter2DRectilinear(TestScatter2D):
                                       add_data_label=True)
         assert set(traces.keys()) == {"scatter", "vector"}
         scatter = traces["scatter"][0]
-        assert scatter["hoverinfo"] == "text"
-        assert len(scatter["hovertext"]) == len(self.layer.layer.main_components)
+        assert scatter["hovertext"] is None
+        assert scatter["hovertemplate"] == \
+            "x: %{customdata[0]}<br>z: %{customdata[1]}<extra></extra>"
+        assert_equal(scatter["customdata"], [[1, 7], [2, 8], [3, 9]])
+
+    def test_rectilinear_traces_no_hover(self):
+        hover_data = {cid.label: False for cid in self.layer.layer.components}
+        traces = trace_data_for_layer(self.viewer, self.layer.state,
+                                      hover_data=hover_data)
+        scatter = traces["scatter"][0]
+        assert scatter["hoverinfo"] == "skip"
+        assert scatter["customdata"] is None
+        assert scatter["hovertemplate"] is None
+
+    def test_density_map_info_cmap(self):
+        layer_state = self.layer.state
+        layer_state.points_mode = "density"
+        layer_state.cmap_mode = "Linear"
+        layer_state.cmap_att = self.data.id["z"]
+        layer_state.cmap_vmin = 7
+        layer_state.cmap_vmax = 9
+
+        info = density_map_info(self.viewer.state, layer_state, (2, 2))
+        assert_allclose(info["x"], [3.25, 7.75])
+        assert_allclose(info["y"], [2, 6])
+        assert_equal(info["z"], [[7, nan], [8.5, nan]])
+        assert info["zmin"] == 7
+        assert info["zmax"] == 9
+        assert info["colorscale"][0][1] == color_info(layer_state, self.mask)[0]
+        assert info["opacity"] == 0.64
+
+    @pytest.mark.parametrize("threshold", [2, 3])
+    def test_rectilinear_traces_density_threshold(self, threshold):
+        traces = trace_data_for_layer(self.viewer, self.layer.state,
+                                      density_threshold=threshold)
+        if threshold < 3:
+            assert set(traces.keys()) == {"density"}
+            density_map = traces["density"][0]
+            assert isinstance(density_map, Heatmap)
+            assert density_map.name == "d1"
+            assert nansum(density_map.z > 0) == 3
+        else:
+            assert "density" not in traces
+            assert "scatter" in traces
+
+    def test_rectilinear_traces_density_threshold_subset(self):
+        # The subset only has two points, although its data has three
+        subset_group = self.app.data_collection.new_subset_group(
+            subset_state=self.data.id["x"] > 1, label="s1")
+        subset_layer = next(layer for layer in self.viewer.layers
+                            if layer.layer is subset_group.subsets[0])
+        traces = trace_data_for_layer(self.viewer, subset_layer.state,
+                                      density_threshold=2)
+        assert "density" not in traces
+        assert_equal(traces["scatter"][0].x, [2, 3])
+
+        traces = trace_data_for_layer(self.viewer, subset_layer.state,
+                                      density_threshold=1)
+        assert set(traces.keys()) == {"density"}
+
+    @pytest.mark.parametrize("threshold", [2, 3])
+    def test_rectilinear_traces_webgl(self, threshold):
+        self.layer.state.xerr_visible = True
+        traces = trace_data_for_layer(self.viewer, self.layer.state,
+                                      webgl_threshold=threshold)
+        scatter = traces["scatter"][0]
+        assert isinstance(scatter, Scattergl if threshold < 3 else Scatter)
+        assert scatter.marker.color == "#ff0000"
+        assert scatter.marker.opacity == 0.64
+        assert_equal(scatter.error_x.array, [1, 2, 3])
+        assert_equal(scatter.x, [1, 2, 3])
+        assert_equal(scatter.y, [4, 5, 6])
+
+    @pytest.mark.parametrize(("cmap_mode", "density_threshold"),
+                             [("Fixed", None), ("Linear", None), ("Linear", 2)])
+    def test_rectilinear_traces_plain(self, cmap_mode, density_threshold):
+        layer_state = self.layer.state
+        layer_state.cmap_mode = cmap_mode
+        layer_state.cmap_att = self.data.id["z"]
+        layer_state.vector_visible = True
+        layer_state.xerr_visible = True
+        layer_state.yerr_visible = True
+        hover_data = {cid.label: True for cid in layer_state.layer.components}
+
+        def traces(plain):
+            with patch("glue_plotly.common.scatter2d.uuid4", return_value=UUID(int=0)):
+                return traces_for_layer(self.viewer, layer_state,
+                                        hover_data=hover_data, numeric_color=True,
+                                        density_threshold=density_threshold,
+                                        plain=plain)
+
+        plain_traces = traces(plain=True)
+        assert all(type(trace) is dict for trace in plain_traces)
+
+        # The plain traces are valid, and are the same as the graph objects
+        # once serialized
+        figure = Figure(plain_traces)
+        assert to_json(figure) == to_json(Figure(traces(plain=False)))
+        serialized = [trace.to_plotly_json() for trace in figure.data]
+        assert json.loads(to_json_plotly(plain_traces)) == \
+            json.loads(to_json_plotly(serialized))
 
 
 class TestScatter2DFullSphere(TestScatter2D):
@@ -429,8 +625,9 @@ class TestScatter2DFullSphere(TestScatter2D):
 
         scatter = traces["scatter"][0]
         assert isinstance(scatter, Scattergeo)
-        assert scatter["hoverinfo"] == "text"
-        assert len(scatter["hovertext"]) == len(self.layer.layer.main_components)
+        assert scatter["hovertemplate"] == \
+            "x: %{customdata[0]}<br>z: %{customdata[1]}<extra></extra>"
+        assert scatter["customdata"].shape == (len(self.data["x"]), 2)
 
         if angle_unit == "degrees":
             assert_equal(scatter["lon"], self.data["x"])
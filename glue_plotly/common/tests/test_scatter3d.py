@@ -0,0 +1,118 @@
+from unittest.mock import patch
+from uuid import UUID
+
+import pytest
+from numpy.testing import assert_allclose, assert_equal
+from plotly.graph_objs import Figure, Scatter3d
+from plotly.io import to_json
+
+from glue.core import Data
+from glue_plotly.common import color_info, sanitize
+from glue_plotly.common.scatter3d import error_bar_info, traces_for_layer
+
+pytest.importorskip("glue_qt")
+pytest.importorskip("glue_vispy_viewers")
+
+from glue_qt.app import GlueApplication  # noqa: E402
+from glue_vispy_viewers.scatter.qt.scatter_viewer import (  # noqa: E402
+    VispyScatterViewer,
+)
+
+
+class TestScatter3D:
+
+    def setup_method(self, method):
+        self.data = Data(x=[1, 2, 3], y=[4, 5, 6], z=[7, 8, 9], label="d1")
+        self.app = GlueApplication()
+        self.app.session.data_collection.append(self.data)
+        self.viewer = self.app.new_data_viewer(VispyScatterViewer)
+        self.viewer.add_data(self.data)
+
+        viewer_state = self.viewer.state
+        for ax in ("x", "y", "z"):
+            setattr(viewer_state, f"{ax}_min", 0)
+            setattr(viewer_state, f"{ax}_max", 10)
+
+        self.layer = self.viewer.layers[0]
+        self.layer.state.color = "#ff0000"
+        self.layer.state.xerr_att = self.data.id["x"]
+        self.layer.state.zerr_att = self.data.id["z"]
+        self.mask, _ = sanitize(self.data["x"], self.data["y"], self.data["z"])
+
+    def teardown_method(self, method):
+        self.viewer.close(warn=False)
+        self.viewer = None
+        self.app.close()
+        self.app = None
+
+    def test_error_bars_fixed_color(self):
+        layer_state = self.layer.state
+        layer_state.color_mode = "Fixed"
+        layer_state.xerr_visible = True
+
+        errs = error_bar_info(layer_state, self.mask)
+        assert_equal(errs["x"]["array"], [1, 2, 3])
+        assert errs["y"] == {}
+        assert errs["z"] == {}
+
+        traces = traces_for_layer(self.viewer.state, layer_state)
+        assert len(traces) == 1
+
+    def test_error_bars_cmap(self):
+        layer_state = self.layer.state
+        layer_state.color_mode = "Linear"
+        layer_state.cmap_att = self.data.id["y"]
+        layer_state.xerr_visible = True
+        layer_state.zerr_visible = True
+
+        errs = error_bar_info(layer_state, self.mask)
+        assert all(err == {} for err in errs.values())
+
+        traces = traces_for_layer(self.viewer.state, layer_state)
+        scatter, *bars = traces
+        colors = color_info(layer_state, self.mask,
+                            mode_att="color_mode", cmap_att="cmap_attribute")
+        assert len(bars) == 2 * len(set(colors))
+
+        nan = float("nan")
+        for bar in bars:
+            assert isinstance(bar, Scatter3d)
+            assert bar.mode == "lines"
+            assert bar.hoverinfo == "skip"
+            assert bar.showlegend is False
+            assert bar.legendgroup == scatter.legendgroup
+
+        x_bar, z_bar = bars[0], bars[len(set(colors))]
+        assert x_bar.line.color == z_bar.line.color == colors[0]
+        # Each bar is followed by a cap at both of its ends, across the bar
+        x_cap = 0.005 * (3 - 1)
+        y_cap = 0.005 * (6 - 4)
+        assert_allclose(x_bar.x, (0, 2, nan, 0, 0, nan, 2, 2, nan))
+        assert_allclose(x_bar.y, (4, 4, nan, 4 - y_cap, 4 + y_cap, nan,
+                                  4 - y_cap, 4 + y_cap, nan))
+        assert_equal(x_bar.z, (7, 7, nan) * 3)
+        assert_allclose(z_bar.x, (1, 1, nan, 1 - x_cap, 1 + x_cap, nan,
+                                  1 - x_cap, 1 + x_cap, nan))
+        assert_equal(z_bar.z, (0, 14, nan, 0, 0, nan, 14, 14, nan))
+
+    def test_hover(self):
+        hover_data = {cid.label: cid is self.data.id["y"]
+                      for cid in self.data.components}
+        scatter = traces_for_layer(self.viewer.state, self.layer.state,
+                                   hover_data=hover_data)[0]
+        assert scatter.hovertemplate == "y: %{customdata[0]}<extra></extra>"
+        assert_equal(scatter.customdata, [[4], [5], [6]])
+
+    def test_plain(self):
+        layer_state = self.layer.state
+        layer_state.color_mode = "Linear"
+        layer_state.cmap_attribute = self.data.id["y"]
+        layer_state.xerr_visible = True
+
+        def traces(plain):
+            with patch("glue_plotly.common.scatter3d.uuid4", return_value=UUID(int=0)):
+                return traces_for_layer(self.viewer.state, layer_state, plain=plain)
+
+        plain_traces = traces(plain=True)
+        assert all(type(trace) is dict for trace in plain_traces)
+        assert to_json(Figure(plain_traces)) == to_json(Figure(traces(plain=False)))
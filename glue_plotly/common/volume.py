@@ -4,7 +4,7 @@ from numpy import linspace, meshgrid, nan_to_num, nanmin
 from glue.core import BaseData
 from glue.core.state_objects import State
 from glue.core.subset_group import GroupedSubset
-from glue_plotly.common import color_info
+from glue_plotly.common import color_info, new_trace
 from glue_plotly.common.base_3d import bbox_mask
 from glue_plotly.utils import frb_for_layer, rgba_components
 
@@ -75,7 +75,7 @@ def isomax_for_layer(viewer_or_state, layer):
 
 
 def traces_for_layer(viewer_state, layer_state, bounds,
-                     isosurface_count=5, add_data_label=True):
+                     isosurface_count=5, add_data_label=True, *, plain=False):
 
     xyz = positions(bounds)
     mask = bbox_mask(viewer_state, *xyz)
@@ -85,7 +85,9 @@ def traces_for_layer(viewer_state, layer_state, bounds,
     if add_data_label and not isinstance(layer_state.layer, BaseData):
         name += f" ({layer_state.layer.data.label})"
 
-    return [go.Volume(
+    return [new_trace(
+       go.Volume,
+       plain=plain,
        name=name,
        hoverinfo="skip",
        hovertext=None,
@@ -98,6 +100,6 @@ def traces_for_layer(viewer_state, layer_state, bounds,
        isomin=isomin_for_layer(viewer_state, layer_state),
        isomax=isomax_for_layer(viewer_state, layer_state),
        opacity=layer_state.alpha,
-       surface_count=isosurface_count,
+       surface=dict(count=isosurface_count),
        showscale=False
     )]
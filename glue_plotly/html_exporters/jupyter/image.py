@@ -1,6 +1,5 @@
 import plotly.graph_objs as go
 from IPython.display import display
-from plotly.offline import plot
 from plotly.subplots import make_subplots
 
 from glue.config import viewer_tool
@@ -13,6 +12,7 @@ from glue_plotly.common.image import (
 )
 from glue_plotly.html_exporters.hover_utils import hover_data_collection_for_viewer
 from glue_plotly.html_exporters.jupyter.save_hover import JupyterSaveHoverDialog
+from glue_plotly.html_exporters.writer import FigureWriter
 from glue_plotly.jupyter_base_export_tool import JupyterBaseExportTool
 
 
@@ -51,7 +51,7 @@ class PlotlyImageBqplotExport(JupyterBaseExportTool):
     def save_figure(self, filepath):
 
         if not filepath:
-            return
+            return None
 
         layers = layers_to_export(self.viewer)
         add_data_label = data_count(layers) > 1
@@ -80,7 +80,11 @@ class PlotlyImageBqplotExport(JupyterBaseExportTool):
                                secondary_x=secondary_x,
                                secondary_y=secondary_y,
                                hover_selections=checked_dictionary,
-                               add_data_label=add_data_label)
-        fig.add_traces(traces_to_add)
-
-        plot(fig, include_mathjax="cdn", filename=filepath, auto_open=False)
+                               add_data_label=add_data_label,
+                               plain=True)
+
+        # The traces are plain dictionaries, which are written out as they are
+        # rather than added to (and validated by) the figure
+        with FigureWriter(filepath, fig.layout, include_mathjax="cdn") as writer:
+            writer.add_traces(traces_to_add)
+        return writer.saved
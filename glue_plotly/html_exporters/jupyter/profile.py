@@ -1,9 +1,9 @@
 import plotly.graph_objs as go
-from plotly.offline import plot
 
 from glue.config import viewer_tool
 from glue_plotly.common import data_count, layers_to_export
 from glue_plotly.common.profile import layout_config, traces_for_layer
+from glue_plotly.html_exporters.writer import write_figure
 from glue_plotly.jupyter_base_export_tool import JupyterBaseExportTool
 
 
@@ -13,7 +13,7 @@ class PlotlyProfileBqplotExport(JupyterBaseExportTool):
 
     def save_figure(self, filepath):
         if not filepath:
-            return
+            return None
 
         config = layout_config(self.viewer)
         layout = go.Layout(**config)
@@ -27,4 +27,4 @@ class PlotlyProfileBqplotExport(JupyterBaseExportTool):
                                       add_data_label=add_data_label)
             fig.add_traces(traces)
 
-        plot(fig, include_mathjax="cdn", filename=filepath, auto_open=False)
+        return write_figure(fig, filepath, include_mathjax="cdn")
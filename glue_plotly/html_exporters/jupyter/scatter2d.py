@@ -1,8 +1,7 @@
 import plotly.graph_objs as go
 from IPython.display import display
-from plotly.offline import plot
 
-from glue.config import viewer_tool
+from glue.config import settings, viewer_tool
 from glue_plotly.common.common import data_count, layers_to_export
 from glue_plotly.common.scatter2d import (
     geo_annotations,
@@ -14,6 +13,11 @@ from glue_plotly.common.scatter2d import (
 )
 from glue_plotly.html_exporters.hover_utils import hover_data_collection_for_viewer
 from glue_plotly.html_exporters.jupyter.save_hover import JupyterSaveHoverDialog
+from glue_plotly.html_exporters.subset_indices import (
+    subset_references,
+    subset_script,
+)
+from glue_plotly.html_exporters.writer import FigureWriter
 from glue_plotly.jupyter_base_export_tool import JupyterBaseExportTool
 
 
@@ -41,7 +45,7 @@ class PlotlyScatter2DBqplotExport(JupyterBaseExportTool):
     def save_figure(self, filepath):
 
         if not filepath:
-            return
+            return None
 
         rectilinear = getattr(self.viewer.state, "using_rectilinear", True)
         polar = getattr(self.viewer.state, "using_polar", False)
@@ -54,27 +58,43 @@ class PlotlyScatter2DBqplotExport(JupyterBaseExportTool):
             layout_config = geo_layout_config(self.viewer)
 
         layout = go.Layout(**layout_config)
-        fig = go.Figure(layout=layout)
-
         if not (rectilinear or polar):
-            for tick in geo_ticks(self.viewer.state):
-                fig.add_trace(tick)
-            for ann in geo_annotations(self.viewer.state):
-                fig.add_annotation(ann)
+            layout.update(annotations=geo_annotations(self.viewer.state))
 
+        # The traces of each layer are written as soon as they are created.
+        # The exception is when subsets are written as indices into the
+        # traces of their parent data, which needs the traces of all layers
+        subsets_as_indices = settings.PLOTLY_EXPORT_SUBSETS_AS_INDICES
         layers = layers_to_export(self.viewer)
         add_data_label = data_count(layers) > 1
         checked_dictionary = self.save_hover_dialog.checked_dictionary \
                              if hasattr(self, "save_hover_dialog") \
                              else None
-        for layer in layers:
-            hover_data = checked_dictionary[layer.layer.label] \
-                         if checked_dictionary is not None \
-                         else None
-            traces = traces_for_layer(self.viewer,
-                                      layer.state,
-                                      hover_data=hover_data,
-                                      add_data_label=add_data_label)
-            fig.add_traces(traces)
+        layer_traces = []
+
+        with FigureWriter(filepath, layout) as writer:
+            if not (rectilinear or polar):
+                writer.add_traces(geo_ticks(self.viewer.state))
+            for layer in layers:
+                hover_data = checked_dictionary[layer.layer.label] \
+                             if checked_dictionary is not None \
+                             else None
+                traces = traces_for_layer(self.viewer,
+                                          layer.state,
+                                          hover_data=hover_data,
+                                          add_data_label=add_data_label,
+                                          numeric_color=settings.PLOTLY_NUMERIC_COLORS,
+                                          plain=True)
+                if subsets_as_indices:
+                    layer_traces.append((layer.state, traces))
+                else:
+                    writer.add_traces(traces)
 
-        plot(fig, filename=filepath, auto_open=False)
+            if layer_traces:
+                references = subset_references(self.viewer.state, layer_traces,
+                                               offset=writer.trace_count)
+                for _, traces in layer_traces:
+                    writer.add_traces(traces)
+                if references:
+                    writer.post_scripts.append(subset_script(references))
+        return writer.saved
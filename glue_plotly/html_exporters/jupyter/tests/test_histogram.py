@@ -1,7 +1,9 @@
 import os
+from unittest.mock import patch
 
 import pytest
 
+from glue.config import settings
 from glue.core import Data
 
 pytest.importorskip("glue_jupyter")
@@ -24,3 +26,17 @@ class TestHistogram(BaseTestJupyterExporter):
     def test_default(self, tmpdir):
         output_path = self.export_figure(tmpdir, "test_default.html")
         assert os.path.exists(output_path)
+
+    def test_report_savings(self, tmpdir):
+        with patch("glue_plotly.jupyter_base_export_tool.display") as display:
+            self.tool.maybe_save_figure(tmpdir.join("test_default.html").strpath)
+            display.assert_not_called()
+
+            settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+            try:
+                self.tool.maybe_save_figure(tmpdir.join("test_compact.html").strpath)
+            finally:
+                settings.reset_defaults()
+            display.assert_called_once()
+            alert = display.call_args.args[0]
+            assert "bytes" in alert.children[0]
@@ -2,7 +2,10 @@ import os
 
 import pytest
 
+from glue.config import settings
 from glue.core import Data
+from glue_plotly.common.scatter2d import traces_for_layer
+from glue_plotly.html_exporters.subset_indices import subset_references
 
 pytest.importorskip("glue_jupyter")
 
@@ -19,6 +22,68 @@ class TestScatter2D(BaseTestJupyterExporter):
     def make_data(self):
         return Data(x=[1, 2, 3], y=[4, 5, 6], z=[7, 8, 9], label="d1")
 
+    def test_subset_references(self):
+        self.app.data_collection.new_subset_group(subset_state=self.data.id["x"] > 1,
+                                                  label="subset")
+        data_layer, subset_layer = self.viewer.layers
+        subset_layer.state.cmap_mode = data_layer.state.cmap_mode = "Linear"
+        subset_layer.state.cmap_att = data_layer.state.cmap_att = self.data.id["z"]
+        subset_layer.state.cmap_vmin = data_layer.state.cmap_vmin = 7
+        subset_layer.state.cmap_vmax = data_layer.state.cmap_vmax = 9
+        layer_traces = [(layer.state, traces_for_layer(self.viewer, layer.state,
+                                                       numeric_color=True))
+                        for layer in self.viewer.layers]
+        subset_scatter = layer_traces[1][1][-1]
+
+        references = subset_references(self.viewer.state, layer_traces, offset=1)
+        assert references == [dict(trace=2, parent=1, indices=[1, 2],
+                                   paths=[["x"], ["y"], ["marker", "color"]])]
+        assert subset_scatter.x is None
+        assert subset_scatter.y is None
+        assert subset_scatter.marker.color is None
+
+        # The colors of the points don't match those of the data here
+        subset_layer.state.cmap_vmax = 8
+        layer_traces = [(layer.state, traces_for_layer(self.viewer, layer.state))
+                        for layer in self.viewer.layers]
+        references = subset_references(self.viewer.state, layer_traces)
+        assert references[0]["paths"] == [["x"], ["y"]]
+        assert layer_traces[1][1][-1].marker.color is not None
+
+        # The plain traces of the export fast path are handled the same way
+        layer_traces = [(layer.state, traces_for_layer(self.viewer, layer.state,
+                                                       plain=True))
+                        for layer in self.viewer.layers]
+        references = subset_references(self.viewer.state, layer_traces)
+        assert references[0]["paths"] == [["x"], ["y"]]
+        subset_scatter = layer_traces[1][1][-1]
+        assert "x" not in subset_scatter
+        assert "y" not in subset_scatter
+        assert "color" in subset_scatter["marker"]
+
+    def test_subsets_as_indices(self, tmpdir):
+        self.app.data_collection.new_subset_group(subset_state=self.data.id["x"] > 1,
+                                                  label="subset")
+        settings.PLOTLY_EXPORT_SUBSETS_AS_INDICES = True
+        try:
+            output_path = self.export_figure(tmpdir, "test_subsets_as_indices.html")
+        finally:
+            settings.reset_defaults()
+        with open(output_path) as f:
+            html = f.read()
+        assert '"indices": [1, 2]' in html
+        assert "Plotly.react" in html
+
     def test_default(self, tmpdir):
         output_path = self.export_figure(tmpdir, "test_default.html")
         assert os.path.exists(output_path)
+
+    def test_density_threshold(self, tmpdir):
+        settings.PLOTLY_DENSITY_THRESHOLD = 2
+        try:
+            output_path = self.export_figure(tmpdir, "test_density_threshold.html")
+        finally:
+            settings.reset_defaults()
+        assert os.path.exists(output_path)
+        with open(output_path) as f:
+            assert '"type":"heatmap"' in f.read()
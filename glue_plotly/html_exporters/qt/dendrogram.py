@@ -1,13 +1,14 @@
 import plotly.graph_objs as go
 from glue_qt.utils import messagebox_on_error
 from glue_qt.viewers.common.tool import Tool
-from plotly.offline import plot
 from qtpy import compat
 
 from glue.config import viewer_tool
 from glue_plotly import PLOTLY_ERROR_MESSAGE, PLOTLY_LOGO
 from glue_plotly.common import data_count, layers_to_export
 from glue_plotly.common.dendrogram import layout_config_from_mpl, trace_for_layer
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import write_figure
 
 
 @viewer_tool
@@ -36,4 +37,4 @@ class PlotlyDendrogramStaticExport(Tool):
             trace = trace_for_layer(layer.state, data, add_data_label=add_data_label)
             fig.add_trace(trace)
 
-        plot(fig, filename=filename, auto_open=False)
+        report_savings(write_figure(fig, filename))
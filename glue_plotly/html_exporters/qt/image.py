@@ -3,7 +3,6 @@ import plotly.graph_objects as go
 from glue_qt.utils import messagebox_on_error
 from glue_qt.utils.threading import Worker
 from glue_qt.viewers.common.tool import Tool
-from plotly.offline import plot
 from plotly.subplots import make_subplots
 from qtpy import compat
 from qtpy.QtWidgets import QDialog
@@ -19,6 +18,8 @@ from glue_plotly.common.image import (
 )
 from glue_plotly.html_exporters.hover_utils import hover_data_collection_for_viewer
 from glue_plotly.html_exporters.qt.save_hover import SaveHoverDialog
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import FigureWriter
 
 DEFAULT_FONT = "Arial, sans-serif"
 
@@ -52,11 +53,14 @@ class PlotlyImage2DExport(Tool):
                                secondary_x=secondary_x,
                                secondary_y=secondary_y,
                                hover_selections=checked_dictionary,
-                               add_data_label=add_data_label)
-        for trace in traces_to_add:
-            fig.add_trace(trace)
+                               add_data_label=add_data_label,
+                               plain=True)
 
-        plot(fig, include_mathjax="cdn", filename=filename, auto_open=False)
+        # The traces are plain dictionaries, which are written out as they are
+        # rather than added to (and validated by) the figure
+        with FigureWriter(filename, fig.layout, include_mathjax="cdn") as writer:
+            writer.add_traces(traces_to_add)
+        return writer.saved
 
     def activate(self):
 
@@ -96,5 +100,6 @@ class PlotlyImage2DExport(Tool):
         exp_dialog = export_dialog.ExportDialog(parent=self.viewer)
         worker.result.connect(exp_dialog.close)
         worker.error.connect(exp_dialog.close)
+        worker.result.connect(report_savings)
         worker.start()
         exp_dialog.exec_()
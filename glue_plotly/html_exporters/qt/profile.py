@@ -1,13 +1,14 @@
 
 import plotly.graph_objs as go
 from glue_qt.viewers.common.tool import Tool
-from plotly.offline import plot
 from qtpy import compat
 
 from glue.config import viewer_tool
 from glue_plotly import PLOTLY_LOGO
 from glue_plotly.common import data_count, layers_to_export
 from glue_plotly.common.profile import layout_config_from_mpl, traces_for_layer
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import write_figure
 
 DEFAULT_FONT = "Arial, sans-serif"
 
@@ -37,4 +38,4 @@ class PlotlyProfile1DExport(Tool):
             for trace in traces:
                 fig.add_trace(trace)
 
-        plot(fig, include_mathjax="cdn", filename=filename, auto_open=False)
+        report_savings(write_figure(fig, filename, include_mathjax="cdn"))
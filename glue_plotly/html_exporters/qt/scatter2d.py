@@ -2,7 +2,6 @@
 import plotly.graph_objs as go
 from glue_qt.core.dialogs import warn
 from glue_qt.utils import messagebox_on_error
-from plotly.offline import plot
 from qtpy import compat
 from qtpy.QtWidgets import QDialog
 
@@ -20,6 +19,12 @@ from glue_plotly.common.scatter2d import (
 )
 from glue_plotly.html_exporters.hover_utils import hover_data_collection_for_viewer
 from glue_plotly.html_exporters.qt.save_hover import SaveHoverDialog
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.subset_indices import (
+    subset_references,
+    subset_script,
+)
+from glue_plotly.html_exporters.writer import FigureWriter
 
 DEFAULT_FONT = "Arial, sans-serif"
 
@@ -87,22 +92,38 @@ class PlotlyScatter2DStaticExport(Tool):
                     return
 
         layout = go.Layout(**layout_config)
-        fig = go.Figure(layout=layout)
-
         if not (rectilinear or polar):
-            for tick in geo_ticks(self.viewer.state):
-                fig.add_trace(tick)
-            for ann in geo_annotations(self.viewer.state):
-                fig.add_annotation(ann)
+            layout.update(annotations=geo_annotations(self.viewer.state))
 
+        # The traces of each layer are written as soon as they are created.
+        # The exception is when subsets are written as indices into the
+        # traces of their parent data, which needs the traces of all layers
+        subsets_as_indices = settings.PLOTLY_EXPORT_SUBSETS_AS_INDICES
         layers = layers_to_export(self.viewer)
         add_data_label = data_count(layers) > 1
-        for layer in layers:
-            hover_data = checked_dictionary[layer.state.layer.label]
-            traces = traces_for_layer(self.viewer,
-                                      layer.state,
-                                      hover_data=hover_data,
-                                      add_data_label=add_data_label)
-            fig.add_traces(traces)
-
-        plot(fig, filename=filename, auto_open=False)
+        layer_traces = []
+
+        with FigureWriter(filename, layout) as writer:
+            if not (rectilinear or polar):
+                writer.add_traces(geo_ticks(self.viewer.state))
+            for layer in layers:
+                hover_data = checked_dictionary[layer.state.layer.label]
+                traces = traces_for_layer(self.viewer,
+                                          layer.state,
+                                          hover_data=hover_data,
+                                          add_data_label=add_data_label,
+                                          numeric_color=settings.PLOTLY_NUMERIC_COLORS,
+                                          plain=True)
+                if subsets_as_indices:
+                    layer_traces.append((layer.state, traces))
+                else:
+                    writer.add_traces(traces)
+
+            if layer_traces:
+                references = subset_references(self.viewer.state, layer_traces,
+                                               offset=writer.trace_count)
+                for _, traces in layer_traces:
+                    writer.add_traces(traces)
+                if references:
+                    writer.post_scripts.append(subset_script(references))
+        report_savings(writer.saved)
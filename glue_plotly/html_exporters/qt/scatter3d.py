@@ -3,7 +3,6 @@ import plotly.graph_objs as go
 from glue_qt.core.dialogs import warn
 from glue_qt.utils import messagebox_on_error
 from glue_qt.utils.threading import Worker
-from plotly.offline import plot
 from qtpy import compat
 from qtpy.QtWidgets import QDialog
 
@@ -16,6 +15,8 @@ from glue_plotly.common.scatter3d import traces_for_layer
 from glue_plotly.export_dialog import ExportDialog
 from glue_plotly.html_exporters.hover_utils import hover_data_collection_for_viewer
 from glue_plotly.html_exporters.qt.save_hover import SaveHoverDialog
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import FigureWriter
 
 DEFAULT_FONT = "Arial, sans-serif"
 settings.add("SHOW_WARN_PLOTLY_3D_GRAPHICS_DIFFERENT", True)
@@ -33,19 +34,18 @@ class PlotlyScatter3DStaticExport(Tool):
 
         config = layout_config(self.viewer.state)
         layout = go.Layout(**config)
-        fig = go.Figure(layout=layout)
 
         layers = layers_to_export(self.viewer)
         add_data_label = data_count(layers) > 1
-        for layer in layers:
-            hover_data = checked_dictionary[layer.state.layer.label]
-            traces = traces_for_layer(self.viewer.state, layer.state,
-                                      hover_data=hover_data,
-                                      add_data_label=add_data_label)
-            for trace in traces:
-                fig.add_trace(trace)
-
-        plot(fig, filename=filename, auto_open=False)
+        with FigureWriter(filename, layout) as writer:
+            for layer in layers:
+                hover_data = checked_dictionary[layer.state.layer.label]
+                traces = traces_for_layer(self.viewer.state, layer.state,
+                                          hover_data=hover_data,
+                                          add_data_label=add_data_label,
+                                          plain=True)
+                writer.add_traces(traces)
+        return writer.saved
 
     def activate(self):
 
@@ -88,5 +88,6 @@ class PlotlyScatter3DStaticExport(Tool):
         exp_dialog = ExportDialog(parent=self.viewer)
         worker.result.connect(exp_dialog.close)
         worker.error.connect(exp_dialog.close)
+        worker.result.connect(report_savings)
         worker.start()
         exp_dialog.exec_()
@@ -3,7 +3,6 @@ from math import floor
 import plotly.graph_objs as go
 from glue_qt.viewers.common.tool import Tool
 from pandas import DataFrame
-from plotly.offline import plot
 from qtpy import compat
 from qtpy.QtCore import Qt
 from qtpy.QtWidgets import QDialog
@@ -11,6 +10,8 @@ from qtpy.QtWidgets import QDialog
 from glue.config import viewer_tool
 from glue.core import BaseData
 from glue_plotly import PLOTLY_LOGO
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import write_figure
 from glue_plotly.sort_components import SortComponentsDialog
 
 try:
@@ -136,4 +137,4 @@ class PlotlyTableExport(Tool):
                     )
                 ])
 
-        plot(fig, filename=filename, auto_open=False)
+        report_savings(write_figure(fig, filename))
@@ -1,7 +1,9 @@
 import os
+from unittest.mock import patch
 
 import pytest
 
+from glue.config import settings
 from glue.core import Data
 
 pytest.importorskip("glue_qt")
@@ -26,3 +28,28 @@ class TestHistogram(TestQtExporter):
         self.viewer.state.hist_n_bin = 6
         output_path = self.export_figure(tmpdir, "test_default.html")
         assert os.path.exists(output_path)
+
+    def test_report_savings(self, tmpdir):
+        self.viewer.state.x_att = self.data.id["x"]
+        with patch("glue_plotly.html_exporters.qt.utils.info") as info:
+            self.export_figure(tmpdir, "test_default.html")
+            info.assert_not_called()
+
+            settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+            try:
+                self.export_figure(tmpdir, "test_compact.html")
+            finally:
+                settings.reset_defaults()
+            info.assert_called_once()
+            assert "bytes" in info.call_args.args[1]
+
+    @patch("glue_plotly.html_exporters.writer.PLOTLY_MAJOR_VERSION", 5)
+    def test_plotly5(self, tmpdir):
+        self.viewer.state.x_att = self.data.id["x"]
+        settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+        try:
+            output_path = self.export_figure(tmpdir, "test_plotly5.html")
+        finally:
+            settings.reset_defaults()
+        with open(output_path) as f:
+            assert '"bdata":' not in f.read()
@@ -35,3 +35,11 @@ class TestScatter2D(TestQtExporter):
         self.viewer.state.angle_unit = "degrees"
         output_path = self.export_figure(tmpdir, "test_polar_degrees.html")
         assert os.path.exists(output_path)
+
+    def test_density_map(self, tmpdir):
+        self.viewer.state.plot_mode = "rectilinear"
+        self.viewer.layers[0].state.points_mode = "density"
+        output_path = self.export_figure(tmpdir, "test_density_map.html")
+        assert os.path.exists(output_path)
+        with open(output_path) as f:
+            assert '"type":"heatmap"' in f.read()
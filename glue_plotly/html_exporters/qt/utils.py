@@ -1,8 +1,14 @@
 from echo.qt import connect_checkable_button, connect_float_text
+from glue_qt.core.dialogs import info
 from qtpy.QtGui import QDoubleValidator, QIntValidator
 from qtpy.QtWidgets import QCheckBox, QHBoxLayout, QLabel, QLineEdit
 
+from glue.config import settings
 from glue.core import Subset
+from glue_plotly.html_exporters.writer import savings_message
+
+SHOW_PLOTLY_EXPORT_SAVINGS = "SHOW_PLOTLY_EXPORT_SAVINGS"
+settings.add(SHOW_PLOTLY_EXPORT_SAVINGS, True)
 
 
 def display_name(prop_name):
@@ -74,3 +80,13 @@ def update_layout_for_state(layout, state):
         layout.addRow(row)
 
     return connections
+
+
+def report_savings(saved):
+    """
+    Tell users how many bytes were saved by compacting the arrays of an
+    exported figure, if they were compacted.
+    """
+    if saved is not None:
+        info("Plotly export", savings_message(saved),
+             setting=SHOW_PLOTLY_EXPORT_SAVINGS)
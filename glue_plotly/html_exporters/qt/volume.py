@@ -3,7 +3,6 @@ from glue_qt.utils import messagebox_on_error
 from glue_qt.utils.threading import Worker
 from glue_qt.viewers.common.tool import Tool
 from glue_vispy_viewers.scatter.layer_artist import ScatterLayerArtist
-from plotly.offline import plot
 from qtpy import compat
 from qtpy.QtWidgets import QDialog
 
@@ -13,6 +12,8 @@ from glue_plotly.common import data_count, layers_to_export
 from glue_plotly.common.base_3d import layout_config
 from glue_plotly.common.scatter3d import traces_for_layer as scatter3d_traces_for_layer
 from glue_plotly.common.volume import traces_for_layer as volume_traces_for_layer
+from glue_plotly.html_exporters.qt.utils import report_savings
+from glue_plotly.html_exporters.writer import FigureWriter
 
 
 @viewer_tool
@@ -27,26 +28,25 @@ class PlotlyVolumeStaticExport(Tool):
 
         config = layout_config(self.viewer.state)
         layout = go.Layout(**config)
-        fig = go.Figure(layout=layout)
 
         layers = layers_to_export(self.viewer)
         add_data_label = data_count(layers) > 1
         bounds = self.viewer._vispy_widget._multivol._data_bounds
-        for layer in layers:
-            if isinstance(layer, ScatterLayerArtist):
-                traces = scatter3d_traces_for_layer(self.viewer.state, layer.state,
-                                                    add_data_label=add_data_label)
-            else:
-                options = state_dictionary[layer.layer.label]
-                count = int(options.isosurface_count)
-                traces = volume_traces_for_layer(self.viewer.state, layer.state, bounds,
-                                                 isosurface_count=count,
-                                                 add_data_label=add_data_label)
-
-            for trace in traces:
-                fig.add_trace(trace)
-
-        plot(fig, filename=filename, auto_open=False)
+        with FigureWriter(filename, layout) as writer:
+            for layer in layers:
+                if isinstance(layer, ScatterLayerArtist):
+                    traces = scatter3d_traces_for_layer(self.viewer.state, layer.state,
+                                                        add_data_label=add_data_label,
+                                                        plain=True)
+                else:
+                    options = state_dictionary[layer.layer.label]
+                    count = int(options.isosurface_count)
+                    traces = volume_traces_for_layer(self.viewer.state, layer.state,
+                                                     bounds, isosurface_count=count,
+                                                     add_data_label=add_data_label,
+                                                     plain=True)
+                writer.add_traces(traces)
+        return writer.saved
 
     def activate(self):
 
@@ -64,5 +64,6 @@ class PlotlyVolumeStaticExport(Tool):
         exp_dialog = export_dialog.ExportDialog(parent=self.viewer)
         worker.result.connect(exp_dialog.close)
         worker.error.connect(exp_dialog.close)
+        worker.result.connect(report_savings)
         worker.start()
         exp_dialog.exec_()
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+
+from glue.config import settings
+from glue.core import Subset
+from glue_plotly.common.scatter2d import sanitized_arrays
+
+__all__ = ["subset_references", "subset_script"]
+
+# If set, the scatter traces of exported subsets don't contain the per-point
+# values (coordinates, colors, etc.) that are also in the trace of their
+# parent data. Instead, the indices of the subset points are written out, and
+# a small script rebuilds the subset traces when the page is loaded
+SUBSETS_AS_INDICES = "PLOTLY_EXPORT_SUBSETS_AS_INDICES"
+settings.add(SUBSETS_AS_INDICES, False, validator=bool)
+
+# The trace properties that can hold one value per point
+POINT_PROPERTIES = (
+    "x", "y", "r", "theta", "lon", "lat",
+    "customdata", "text", "hovertext",
+    "marker.color", "marker.size", "marker.line.color",
+)
+
+SCRIPT = """
+(function() {
+    var gd = document.getElementById("{plot_id}");
+    var references = %s;
+    var arrayTypes = {
+        f8: Float64Array, f4: Float32Array, i4: Int32Array, u4: Uint32Array,
+        i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array
+    };
+
+    // Arrays can be base64-encoded by Plotly, in which case we need to decode them
+    function decode(values) {
+        if (!values || values.bdata === undefined) {
+            return values;
+        }
+        var bytes = Uint8Array.from(atob(values.bdata),
+                                    function(c) { return c.charCodeAt(0); });
+        var array = new arrayTypes[values.dtype](bytes.buffer);
+        var shape = String(values.shape || array.length).split(",").map(Number);
+        if (shape.length < 2) {
+            return array;
+        }
+        var rows = [];
+        for (var i = 0; i < shape[0]; i++) {
+            rows.push(Array.from(array.subarray(i * shape[1], (i + 1) * shape[1])));
+        }
+        return rows;
+    }
+
+    function lookup(obj, path) {
+        return path.reduce(function(o, key) { return o && o[key]; }, obj);
+    }
+
+    function assign(obj, path, value) {
+        var last = path.length - 1;
+        for (var i = 0; i < last; i++) {
+            obj = obj[path[i]] = obj[path[i]] || {};
+        }
+        obj[path[last]] = value;
+    }
+
+    references.forEach(function(ref) {
+        var parent = gd.data[ref.parent];
+        var trace = gd.data[ref.trace];
+        ref.paths.forEach(function(path) {
+            var values = decode(lookup(parent, path));
+            assign(trace, path, ref.indices.map(function(i) { return values[i]; }));
+        });
+    });
+    return Plotly.react(gd, gd.data, gd.layout);
+})();
+"""
+
+
+def _values_equal(a, b):
+    if a.shape != b.shape:
+        return False
+    try:
+        return np.array_equal(a, b, equal_nan=True)
+    except TypeError:  # non-numeric dtype
+        return np.array_equal(a, b)
+
+
+def _lookup(trace, path):
+    # Traces are either graph objects, which accept dotted paths, or the
+    # plain dictionaries of the export fast path
+    if not isinstance(trace, dict):
+        if path not in trace:
+            return None
+        return trace[path]
+    for key in path.split("."):
+        if not isinstance(trace, dict):
+            return None
+        trace = trace.get(key)
+    return trace
+
+
+def _remove(trace, path):
+    if not isinstance(trace, dict):
+        trace[path] = None
+        return
+    *parents, key = path.split(".")
+    for parent in parents:
+        trace = trace[parent]
+    del trace[key]
+
+
+def _subset_indices(viewer_state, layer_state, parent_state):
+    """
+    Find the indices of the points of a subset layer in the scatter trace of
+    its parent data, or None if some of them are not drawn in the parent trace.
+    """
+    parent_mask, _ = sanitized_arrays(viewer_state, parent_state)
+    mask, _ = sanitized_arrays(viewer_state, layer_state)
+    parent_mask = parent_mask.ravel()
+    members = np.flatnonzero(layer_state.layer.to_mask())[mask.ravel()]
+    if not parent_mask[members].all():
+        return None
+    return (np.cumsum(parent_mask) - 1)[members]
+
+
+def subset_references(viewer_state, layer_traces, offset=0):
+    """
+    Remove the per-point values of the scatter traces of subset layers that can
+    be looked up in the scatter trace of their parent data.
+
+    Parameters
+    ----------
+    viewer_state : `glue.viewers.scatter.state.ScatterViewerState`
+        The state of the exported viewer.
+    layer_traces : list
+        The ``(layer_state, traces)`` pairs of the exported layers, in the
+        order in which their traces are added to the figure.
+    offset : int, optional
+        The number of traces that are in the figure before the layer traces.
+
+    Returns
+    -------
+    list
+        For each of the modified subset traces, a dictionary with the indices
+        of the subset trace and of the parent trace in the figure, the indices
+        of the subset points in the parent trace and the paths of the removed
+        properties. This is what `subset_script` needs to rebuild the traces.
+    """
+
+    # The scatter trace is the last trace of each layer
+    scatters = {}
+    index = offset
+    for layer_state, traces in layer_traces:
+        index += len(traces)
+        if traces and _lookup(traces[-1], "type").startswith("scatter"):
+            scatters[layer_state.layer] = (layer_state, traces[-1], index - 1)
+
+    references = []
+    for layer_state, trace, trace_index in scatters.values():
+        if not isinstance(layer_state.layer, Subset) or \
+                layer_state.layer.data not in scatters:
+            continue
+
+        parent_state, parent, parent_index = scatters[layer_state.layer.data]
+        indices = _subset_indices(viewer_state, layer_state, parent_state)
+        if indices is None:
+            continue
+
+        paths = []
+        for path in POINT_PROPERTIES:
+            values, parent_values = _lookup(trace, path), _lookup(parent, path)
+            if values is None or parent_values is None:
+                continue
+            values, parent_values = np.asarray(values), np.asarray(parent_values)
+            if values.ndim == 0 or parent_values.ndim == 0 or \
+                    len(indices) != len(values) or \
+                    (indices.size > 0 and indices[-1] >= len(parent_values)) or \
+                    not _values_equal(parent_values[indices], values):
+                continue
+            _remove(trace, path)
+            paths.append(path.split("."))
+
+        if paths:
+            references.append(dict(trace=trace_index, parent=parent_index,
+                                   indices=indices.tolist(), paths=paths))
+
+    return references
+
+
+def subset_script(references):
+    """
+    Return the script that rebuilds the subset traces from their references
+    (see `subset_references`) once the figure has been created.
+    """
+    return SCRIPT % json.dumps(references)
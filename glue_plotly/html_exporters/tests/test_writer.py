@@ -0,0 +1,208 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import plotly.graph_objs as go
+from numpy.testing import assert_array_equal
+
+from glue.config import settings
+from glue_plotly.html_exporters.writer import (
+    FigureWriter,
+    _decode,
+    compact_array,
+    compact_arrays,
+    write_figure,
+)
+
+
+def test_compact_array():
+    assert compact_array([1.0, 2.0, 3.0]).dtype == np.uint8
+    assert compact_array([-1, 200]).dtype == np.int16
+    assert compact_array(np.array([0.5, np.nan, np.inf])).dtype == np.float32
+    assert compact_array([0.1, 0.2]).dtype == np.float64
+    assert compact_array(["a", "b"]) is None
+    assert compact_array([]) is None
+
+
+def test_compact_arrays():
+    traces = [dict(type="scatter",
+                   x=np.arange(100) + 0.5,
+                   y=list(range(100)),
+                   text=["a", "b"],
+                   marker=dict(size=np.full(100, 10.0),
+                               colorscale=[[0, "red"], [1, "blue"]]),
+                   customdata=[[1, "a"], [2, "b"]],
+                   selectedpoints=list(range(100)))]
+    assert compact_arrays(traces) > 0
+    trace = traces[0]
+    assert trace["x"]["dtype"] == "f4"
+    assert_array_equal(_decode(trace["x"]), np.arange(100) + 0.5)
+    assert trace["y"]["dtype"] == "u1"
+    assert trace["marker"]["size"]["dtype"] == "u1"
+    assert_array_equal(_decode(trace["marker"]["size"]), np.full(100, 10))
+    assert trace["text"] == ["a", "b"]
+    assert trace["marker"]["colorscale"] == [[0, "red"], [1, "blue"]]
+    assert trace["customdata"] == [[1, "a"], [2, "b"]]
+    assert trace["selectedpoints"] == list(range(100))
+
+    # Short arrays take less space as JSON
+    traces = [dict(type="scatter", x=[1, 2])]
+    assert compact_arrays(traces) == 0
+    assert traces[0]["x"] == [1, 2]
+
+    # Arrays that were already encoded by Plotly can be narrowed too
+    heatmap = go.Heatmap(z=np.arange(6, dtype=float).reshape(2, 3)).to_plotly_json()
+    heatmap = json.loads(json.dumps(go.Figure(heatmap).to_dict()["data"][0]))
+    assert heatmap["z"]["dtype"] == "f8"
+    compact_arrays(heatmap)
+    assert heatmap["z"]["dtype"] == "u1"
+    assert heatmap["z"]["shape"] == "2, 3"
+    assert_array_equal(_decode(heatmap["z"]), [[0, 1, 2], [3, 4, 5]])
+
+
+def test_write_figure(tmp_path):
+    figure = go.Figure(go.Scatter(x=np.arange(100, dtype=float),
+                                  y=np.linspace(0, 1, 100)))
+    default_path = tmp_path / "default.html"
+    assert write_figure(figure, default_path) is None
+
+    compact_path = tmp_path / "compact.html"
+    settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+    try:
+        saved = write_figure(figure, compact_path)
+    finally:
+        settings.reset_defaults()
+
+    html = compact_path.read_text()
+    assert '"dtype":"u1"' in html
+    assert saved > 0
+    assert len(html) < len(default_path.read_text())
+
+
+def test_figure_writer(tmp_path):
+    path = tmp_path / "streamed.html"
+    with FigureWriter(path, go.Layout(title="Streamed")) as writer:
+        writer.add_traces([go.Scatter(x=[1, 2], y=[3, 4], name="first")])
+        writer.add_traces([dict(type="bar", x=[5], y=[6], name="second"),
+                           go.Scatter(x=[7], y=[8], name="third")])
+        assert writer.trace_count == 3
+        writer.post_scripts.append("console.log('done');")
+    assert writer._file.closed
+
+    html = path.read_text()
+    start = html.rindex("Plotly.newPlot(")
+    data = json.JSONDecoder().raw_decode(html, html.index("[", start))[0]
+    assert [trace["name"] for trace in data] == ["first", "second", "third"]
+    assert data[1]["type"] == "bar"
+    assert "Streamed" in html
+    assert "console.log('done');" in html
+
+    # The same figure written in one go has the same traces
+    figure = go.Figure(data, layout=go.Layout(title="Streamed"))
+    write_figure(figure, tmp_path / "figure.html")
+    html = (tmp_path / "figure.html").read_text()
+    start = html.rindex("Plotly.newPlot(")
+    assert json.JSONDecoder().raw_decode(html, html.index("[", start))[0] == data
+
+
+def test_compact_array_precision():
+    values = 1e6 + np.linspace(0, 1, 11)
+    assert compact_array(values).dtype == np.float64
+    assert compact_array(values, rtol=1e-3).dtype == np.float64
+    assert compact_array(values, rtol=0.1).dtype == np.float32
+    assert compact_array(np.linspace(0, 1, 11), rtol=1e-6).dtype == np.float32
+
+
+def test_compact_arrays_precision():
+    figure = go.Figure(go.Scatter(x=np.linspace(0, 1, 100),
+                                  customdata=np.linspace(0, 1, 100)))
+    traces = figure.to_dict()["data"]
+    saved = compact_arrays(traces, rtol=1e-4)
+    assert traces[0]["x"]["dtype"] == "f4"
+    assert traces[0]["customdata"]["dtype"] == "f8"
+    assert saved > 0
+
+
+def test_write_figure_precision(tmp_path):
+    figure = go.Figure(go.Scatter(x=np.linspace(0, 1, 1000),
+                                  y=np.linspace(0, 1, 1000) ** 2))
+    settings.PLOTLY_EXPORT_PRECISION = 1e-4
+    try:
+        saved = write_figure(figure, tmp_path / "precision.html")
+    finally:
+        settings.reset_defaults()
+    assert saved >= 2 * 1000 * 4
+    assert '"dtype":"f4"' in (tmp_path / "precision.html").read_text()
+    assert write_figure(figure, tmp_path / "default.html") is None
+
+
+def test_write_figure_sidecar_files(tmp_path):
+    x = np.linspace(0, 1, 100)
+    z = np.arange(6, dtype=float).reshape(2, 3)
+    figure = go.Figure([go.Scatter(x=x, y=x), go.Heatmap(z=z)])
+    settings.PLOTLY_EXPORT_SIDECAR_FILES = True
+    try:
+        write_figure(figure, tmp_path / "sidecar.html")
+    finally:
+        settings.reset_defaults()
+
+    # The x and y arrays are the same, so are only written once
+    files = sorted((tmp_path / "sidecar_data").iterdir())
+    assert len(files) == 2
+    contents = [np.frombuffer(path.read_bytes(), dtype=float) for path in files]
+    assert any(np.array_equal(values, x) for values in contents)
+    assert any(np.array_equal(values, z.ravel()) for values in contents)
+
+    html = (tmp_path / "sidecar.html").read_text()
+    assert '"bdata":"' not in html
+    assert '"x":null' in html
+    assert '"src": "sidecar_data/' in html
+    assert '"shape": [2, 3]' in html
+    assert ".catch(showError)" in html
+
+
+def test_write_figure_data_directory(tmp_path):
+    x = np.linspace(0, 1, 100)
+    (tmp_path / "pages").mkdir()
+    settings.PLOTLY_EXPORT_DATA_DIRECTORY = "../shared"
+    try:
+        write_figure(go.Figure(go.Scatter(x=x, y=x)), tmp_path / "pages" / "first.html")
+    finally:
+        settings.reset_defaults()
+    write_figure(go.Figure(go.Scatter(x=x, y=2 * x)), tmp_path / "second.html",
+                 data_directory="shared")
+
+    # The pages share the file of their common array
+    assert len(list((tmp_path / "shared").iterdir())) == 2
+    assert not (tmp_path / "pages" / "first_data").exists()
+    assert '"src": "../shared/' in (tmp_path / "pages" / "first.html").read_text()
+    assert '"src": "shared/' in (tmp_path / "second.html").read_text()
+
+
+@patch("glue_plotly.html_exporters.writer.PLOTLY_MAJOR_VERSION", 5)
+def test_write_figure_plotly5(tmp_path):
+    # The plotly.js of Plotly 5 can't read base64-encoded typed arrays
+    x = np.linspace(0, 1, 100)
+    z = np.arange(600, dtype=float).reshape(20, 30)
+    figure = go.Figure([go.Scatter(x=x, y=x), go.Heatmap(z=z)])
+    settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+    try:
+        saved = write_figure(figure, tmp_path / "plotly5.html")
+    finally:
+        settings.reset_defaults()
+    assert saved is None
+    html = (tmp_path / "plotly5.html").read_text()
+    assert '"bdata":' not in html
+    assert '"z":[[0.0,1.0,2.0,' in html
+
+    # Sidecar files are read by the loader, so can still be compacted
+    settings.PLOTLY_EXPORT_COMPACT_ARRAYS = True
+    settings.PLOTLY_EXPORT_SIDECAR_FILES = True
+    try:
+        saved = write_figure(figure, tmp_path / "sidecar.html")
+    finally:
+        settings.reset_defaults()
+    assert saved > 0
+    html = (tmp_path / "sidecar.html").read_text()
+    assert '"bdata":' not in html
+    assert '"dtype": "u2"' in html
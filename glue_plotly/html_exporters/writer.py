@@ -0,0 +1,503 @@
+import base64
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+import plotly.graph_objs as go
+from plotly.io import to_html
+from plotly.io.json import to_json_plotly
+
+from glue.config import settings
+from glue.logger import logger
+from glue_plotly.utils import PLOTLY_MAJOR_VERSION
+
+__all__ = ["FigureWriter", "compact_array", "compact_arrays", "encode_arrays",
+           "externalize_arrays", "inline_typed_arrays", "savings_message",
+           "write_figure"]
+
+# If set, the numeric arrays of exported traces are written with the
+# smallest dtype that holds their values exactly (e.g. float32 or uint8)
+# as base64-encoded typed arrays, rather than as float64 arrays or JSON lists.
+# The plotly.js bundled with Plotly 5 can't read these typed arrays, so with
+# Plotly 5 the arrays are only compacted if they are written to SIDECAR_FILES
+COMPACT_ARRAYS = "PLOTLY_EXPORT_COMPACT_ARRAYS"
+settings.add(COMPACT_ARRAYS, False, validator=bool)
+
+# If set, the coordinates, sizes and values of exported traces can lose
+# precision when compacting them, as long as the error is at most this
+# fraction of the range of the values. For instance, 1e-4 is well below
+# the size of a pixel for any figure size. This implies COMPACT_ARRAYS
+PRECISION = "PLOTLY_EXPORT_PRECISION"
+settings.add(PRECISION, None,
+             validator=lambda value: None if value is None else float(value))
+
+# If set, the typed arrays of exported traces are written to separate binary
+# files in a ``<name>_data`` directory next to the HTML file, which are
+# loaded once the page (with the layout of the figure) has been drawn.
+# Note that browsers only allow this when the page is served over HTTP, and
+# the page shows a message instead of the data if it is opened from disk
+SIDECAR_FILES = "PLOTLY_EXPORT_SIDECAR_FILES"
+settings.add(SIDECAR_FILES, False, validator=bool)
+
+# If set, the binary files of exported traces are written to this directory
+# (relative to the directory of the HTML file if the path is relative) rather
+# than to ``<name>_data``. Since the files are named by their contents, the
+# pages exported to the same directory share the files of any common arrays.
+# This implies SIDECAR_FILES
+DATA_DIRECTORY = "PLOTLY_EXPORT_DATA_DIRECTORY"
+settings.add(DATA_DIRECTORY, None,
+             validator=lambda value: None if value is None else str(value))
+
+LOADER_SCRIPT = """
+var gd = document.getElementById("{plot_id}");
+var arrays = %s;
+var arrayTypes = {
+    f8: Float64Array, f4: Float32Array, i4: Int32Array, u4: Uint32Array,
+    i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array
+};
+
+function reshape(values, shape) {
+    if (shape.length < 2) {
+        return values;
+    }
+    var size = shape.slice(1).reduce(function(a, b) { return a * b; });
+    var rows = [];
+    for (var i = 0; i < shape[0]; i++) {
+        rows.push(reshape(values.subarray(i * size, (i + 1) * size), shape.slice(1)));
+    }
+    return rows;
+}
+
+function showError(error) {
+    var message = document.createElement("p");
+    message.style.color = "#b00020";
+    message.textContent = "The data of this figure could not be loaded (" +
+        error + ").";
+    if (location.protocol === "file:") {
+        message.textContent += " Browsers only load the data files of a page " +
+            "that is served over HTTP, e.g. by running 'python -m http.server' " +
+            "in its directory and opening the page from there.";
+    }
+    gd.parentNode.insertBefore(message, gd);
+}
+
+function assign(obj, path, value) {
+    var last = path.length - 1;
+    for (var i = 0; i < last; i++) {
+        obj = obj[path[i]] = obj[path[i]] || {};
+    }
+    obj[path[last]] = value;
+}
+
+return Promise.all(arrays.map(function(array) {
+    return fetch(array.src)
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error(array.src + ": " + response.status + " " +
+                                response.statusText);
+            }
+            return response.arrayBuffer();
+        })
+        .then(function(buffer) {
+            var values = new arrayTypes[array.dtype](buffer);
+            assign(gd.data[array.trace], array.path, reshape(values, array.shape));
+        });
+})).then(function() {
+    return Plotly.react(gd, gd.data, gd.layout);
+}).catch(showError);
+"""
+
+# The plotly.js names of the dtypes that can be used for typed arrays
+TYPED_ARRAY_DTYPES = {
+    "int8": "i1", "uint8": "u1",
+    "int16": "i2", "uint16": "u2",
+    "int32": "i4", "uint32": "u4",
+    "float32": "f4", "float64": "f8",
+}
+INTEGER_DTYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32)
+
+# Trace properties that aren't data arrays, even if they hold numbers
+SKIPPED_KEYS = {"range", "selectedpoints", "colorscale", "geojson", "layer", "layers"}
+
+# Trace properties whose values are only drawn, and so can be stored with a
+# limited precision (unlike e.g. custom data, which is shown on hover as is)
+QUANTIZED_KEYS = {"x", "y", "z", "r", "theta", "lat", "lon",
+                  "u", "v", "w", "size", "value", "width"}
+
+
+def _is_typed_array(value):
+    return isinstance(value, dict) and "bdata" in value and "dtype" in value
+
+
+def _decode(spec):
+    dtype = next(name for name, short in TYPED_ARRAY_DTYPES.items()
+                 if short == spec["dtype"])
+    array = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=dtype)
+    if "shape" in spec:
+        array = array.reshape([int(n) for n in spec["shape"].split(",")])
+    return array
+
+
+def _encode(array):
+    array = np.ascontiguousarray(array)
+    spec = dict(dtype=TYPED_ARRAY_DTYPES[array.dtype.name],
+                bdata=base64.b64encode(array).decode("ascii"))
+    if array.ndim > 1:
+        spec["shape"] = ", ".join(str(n) for n in array.shape)
+    return spec
+
+
+def compact_array(values, rtol=None):
+    """
+    Return the values of a numeric array with the smallest dtype that holds
+    them exactly, or None if the values aren't a numeric array.
+
+    If ``rtol`` is given, float values are also stored as float32 if the
+    error that this introduces is at most ``rtol`` times their range.
+    """
+    try:
+        array = np.asarray(values)
+    except ValueError:  # ragged nested sequences
+        return None
+    if array.ndim == 0 or array.size == 0 or array.dtype.kind not in "iuf":
+        return None
+
+    if array.dtype.kind == "f":
+        finite = np.isfinite(array)
+        if finite.all() and np.array_equal(array, np.round(array)):
+            array_int = _smallest_integer_array(array)
+            if array_int is not None:
+                return array_int
+        with np.errstate(over="ignore"):
+            array32 = array.astype(np.float32)
+        # Only the finite values need to be compared, since NaN and infinite
+        # values are preserved by the conversion
+        if np.array_equal(array32[finite], array[finite]):
+            return array32
+        if rtol is not None and finite.any():
+            values = array[finite]
+            error = np.abs(array32[finite].astype(np.float64) - values).max()
+            if error <= rtol * (values.max() - values.min()):
+                return array32
+        return array.astype(np.float64)
+
+    array_int = _smallest_integer_array(array)
+    return array if array_int is None else array_int
+
+
+def _smallest_integer_array(array):
+    vmin, vmax = array.min(), array.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= vmin and vmax <= info.max:
+            return array.astype(dtype)
+    return None
+
+
+def inline_typed_arrays():
+    """
+    Whether the HTML pages of figures can hold base64-encoded typed arrays,
+    i.e. whether their plotly.js can read them, as is the case from Plotly 6.
+    """
+    return PLOTLY_MAJOR_VERSION >= 6
+
+
+def encode_arrays(obj):
+    """
+    Replace the numeric NumPy arrays in (a list of) trace dictionaries with
+    base64-encoded typed arrays, in place, as Plotly 6 does for figures.
+    """
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in SKIPPED_KEYS:
+                continue
+            if isinstance(value, np.ndarray) and value.size > 0:
+                # Plotly.js doesn't support 64-bit integer typed arrays
+                if value.dtype.kind in "iu" and value.itemsize == 8:
+                    narrowed = _smallest_integer_array(value)
+                    value = value if narrowed is None else narrowed
+                if value.dtype.name in TYPED_ARRAY_DTYPES:
+                    obj[key] = _encode(value)
+            else:
+                encode_arrays(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            if isinstance(value, dict):
+                encode_arrays(value)
+
+
+def _list_arrays(obj):
+    # Plotly 6 encodes NumPy arrays as typed arrays when serializing them,
+    # so they need to be lists for pages without typed array support
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, np.ndarray):
+                obj[key] = value.tolist()
+            else:
+                _list_arrays(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            if isinstance(value, dict):
+                _list_arrays(value)
+
+
+def _encoded_size(value):
+    if not isinstance(value, dict):
+        value = np.asarray(value).tolist()
+    return len(json.dumps(value))
+
+
+def compact_arrays(obj, rtol=None):
+    """
+    Replace the numeric arrays in (a list of) trace dictionaries with
+    base64-encoded typed arrays with the smallest possible dtype, in place.
+
+    If ``rtol`` is given, the arrays of drawn values (coordinates, sizes,
+    etc.) can lose precision as described in `compact_array`.
+
+    Returns the number of bytes saved in the JSON representation of the
+    traces.
+    """
+    saved = 0
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in SKIPPED_KEYS:
+                continue
+            encoded = value
+            if _is_typed_array(value):
+                value = _decode(value)
+            if isinstance(value, (np.ndarray, list, tuple)):
+                array = compact_array(value,
+                                      rtol=rtol if key in QUANTIZED_KEYS else None)
+                if array is not None and array.dtype.name in TYPED_ARRAY_DTYPES:
+                    # Short arrays can take less space as JSON numbers
+                    compacted = _encode(array)
+                    change = _encoded_size(encoded) - _encoded_size(compacted)
+                    if change > 0:
+                        obj[key] = compacted
+                        saved += change
+                    continue
+            saved += compact_arrays(value, rtol=rtol)
+    elif isinstance(obj, (list, tuple)):
+        # Only look into lists of objects (e.g. of traces), since other lists
+        # (e.g. of rows of custom data) need to be encoded as a whole
+        for value in obj:
+            if isinstance(value, dict):
+                saved += compact_arrays(value, rtol=rtol)
+    return saved
+
+
+def _externalize(obj, path, directory, url, written):
+    arrays = []
+    if isinstance(obj, (list, tuple)):
+        for index, value in enumerate(obj):
+            if isinstance(value, dict):
+                arrays.extend(_externalize(value, [*path, index], directory, url,
+                                           written))
+        return arrays
+    for key, value in obj.items():
+        if _is_typed_array(value):
+            array = _decode(value)
+            data = array.astype(array.dtype.newbyteorder("<")).tobytes()
+            # Name the files by their contents, so that arrays which are in
+            # several traces are only written once
+            name = f"{hashlib.sha256(data).hexdigest()[:32]}.bin"
+            if name not in written:
+                (directory / name).write_bytes(data)
+                written.add(name)
+            obj[key] = None
+            arrays.append(dict(path=[*path, key], src=f"{url}/{name}",
+                               dtype=value["dtype"], shape=list(array.shape)))
+        elif isinstance(value, (dict, list, tuple)):
+            arrays.extend(_externalize(value, [*path, key], directory, url, written))
+    return arrays
+
+
+def externalize_arrays(traces, directory):
+    """
+    Write the typed arrays in a list of trace dictionaries to binary files
+    in ``directory``, and remove them from the traces.
+
+    Returns the list of the arrays to load in the page, with the index of
+    their trace, their path in the trace, the path of their file relative
+    to the parent of ``directory``, and their dtype and shape.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = set()
+    arrays = []
+    for index, trace in enumerate(traces):
+        arrays.extend(dict(trace=index, **array)
+                      for array in _externalize(trace, [], directory, directory.name,
+                                                written))
+    return arrays
+
+
+def _copy_dicts(obj):
+    if isinstance(obj, dict):
+        return {key: _copy_dicts(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)) and any(isinstance(v, dict) for v in obj):
+        return [_copy_dicts(value) for value in obj]
+    return obj
+
+
+def savings_message(saved):
+    """
+    Return the message that tells users how many bytes were saved by
+    compacting the arrays of an exported figure.
+    """
+    return f"Compacting the arrays of the exported figure saved {saved:,} bytes."
+
+
+class FigureWriter:
+    """
+    Write a figure to an HTML file, one trace at a time.
+
+    The start of the page, with the layout of the figure, is written when the
+    writer is created, and each trace is serialized and written as soon as it
+    is added. This way, only the traces being added need to be kept in memory,
+    rather than the whole figure and its HTML. The export settings (e.g.
+    `COMPACT_ARRAYS`) are applied to each trace. Use the writer as a context
+    manager, or call `close` once all of the traces have been added.
+
+    Parameters
+    ----------
+    filename : str or `pathlib.Path`
+        The path of the HTML file.
+    layout : `plotly.graph_objs.Layout` or dict, optional
+        The layout of the figure.
+    include_mathjax : bool or str, optional
+        Whether (and how) to include MathJax, as for `plotly.io.write_html`.
+    data_directory : str or `pathlib.Path`, optional
+        The directory to write the binary files of the traces to, overriding
+        `DATA_DIRECTORY`. If the path is relative, it is relative to the
+        directory of the HTML file.
+    """
+
+    def __init__(self, filename, layout=None, *, include_mathjax=False,
+                 data_directory=None):
+        self.filename = Path(filename)
+        self.layout = layout
+        self.include_mathjax = include_mathjax
+
+        # Scripts to run once the figure has been drawn
+        self.post_scripts = []
+
+        if data_directory is None:
+            data_directory = settings.PLOTLY_EXPORT_DATA_DIRECTORY
+        if data_directory is None and settings.PLOTLY_EXPORT_SIDECAR_FILES:
+            data_directory = f"{self.filename.stem}_data"
+        if data_directory is not None:
+            self._directory = self.filename.parent / data_directory
+            self._directory.mkdir(parents=True, exist_ok=True)
+            # The files are loaded relative to the page
+            self._url = Path(os.path.relpath(self._directory.resolve(),
+                                             self.filename.parent.resolve())).as_posix()
+        else:
+            self._directory = None
+        self._written = set()
+
+        # Typed arrays can always be written to sidecar files, since these
+        # are read by our loader rather than by plotly.js
+        self._typed_arrays = inline_typed_arrays() or self._directory is not None
+        self._rtol = settings.PLOTLY_EXPORT_PRECISION
+        self._compact = settings.PLOTLY_EXPORT_COMPACT_ARRAYS or self._rtol is not None
+        if self._compact and not self._typed_arrays:
+            logger.warning("The arrays of exported figures are only compacted with "
+                           "Plotly 6 or when they are written to sidecar files")
+            self._compact = False
+
+        # The number of bytes saved by compacting the arrays of the traces,
+        # or None if they aren't compacted
+        self.saved = 0 if self._compact else None
+        self._arrays = []
+
+        # The number of traces written so far
+        self.trace_count = 0
+
+        self._div_id = uuid4().hex
+        # The file stays open until close is called
+        self._file = open(self.filename, "w", encoding="utf-8")  # noqa: SIM115
+        self._file.write(self._html_parts()[0])
+
+    def _html_parts(self, post_script=None):
+        # Split the page of an empty figure where the list of traces goes
+        html = to_html(go.Figure(layout=self.layout),
+                       include_mathjax=self.include_mathjax,
+                       post_script=post_script,
+                       div_id=self._div_id)
+        match = re.search(rf'Plotly\.newPlot\(\s*"{self._div_id}",\s*\[', html)
+        return html[:match.end()], html[match.end() + 1:]
+
+    def add_traces(self, traces):
+        """
+        Serialize the given traces (graph objects or dictionaries) and write
+        them to the file.
+        """
+        for trace in traces:
+            # Copy the (nested) dictionaries of the trace, but not its arrays,
+            # since the arrays are replaced in place below
+            trace = _copy_dicts(trace) if isinstance(trace, dict) \
+                else trace.to_plotly_json()
+            if self._compact:
+                self.saved += compact_arrays(trace, rtol=self._rtol)
+            if self._typed_arrays:
+                encode_arrays(trace)
+            else:
+                _list_arrays(trace)
+            if self._directory is not None:
+                arrays = _externalize(trace, [], self._directory, self._url,
+                                      self._written)
+                self._arrays.extend(dict(trace=self.trace_count, **array)
+                                    for array in arrays)
+
+            if self.trace_count > 0:
+                self._file.write(",")
+            self._file.write(to_json_plotly(trace))
+            self.trace_count += 1
+
+    def close(self):
+        """
+        Write the end of the page and close the file.
+        """
+        if self._file.closed:
+            return
+        post_scripts = list(self.post_scripts)
+        if self._arrays:
+            # The arrays need to be loaded before any other script runs
+            post_scripts.insert(0, LOADER_SCRIPT % json.dumps(self._arrays))
+        self._file.write("]" + self._html_parts(post_scripts)[1])
+        self._file.close()
+        if self._compact:
+            logger.info(f"{self.filename}: {savings_message(self.saved)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+def write_figure(figure, filename, *, include_mathjax=False, post_script=None,
+                 data_directory=None):
+    """
+    Write a figure to an HTML file, using the export settings. See
+    `FigureWriter` for ``data_directory``.
+
+    Returns the number of bytes saved by compacting the arrays of the traces,
+    or None if they aren't compacted.
+    """
+    with FigureWriter(filename, figure.layout, include_mathjax=include_mathjax,
+                      data_directory=data_directory) as writer:
+        writer.add_traces(figure.data)
+        if post_script is not None:
+            scripts = [post_script] if isinstance(post_script, str) else post_script
+            writer.post_scripts.extend(scripts)
+    return writer.saved
@@ -8,6 +8,7 @@ from ipywidgets import HBox, Layout  # noqa
 
 from glue.viewers.common.tool import Tool
 from glue_plotly import PLOTLY_LOGO
+from glue_plotly.html_exporters.writer import savings_message
 
 __all__ = ["JupyterBaseExportTool"]
 
@@ -72,9 +73,10 @@ class JupyterBaseExportTool(Tool):
             )
 
             def on_yes_click(button, event, data):
-                self.save_figure(filepath)
+                saved = self.save_figure(filepath)
                 check_dialog.v_model = False
                 self.viewer.output_widget.clear_output()
+                self.report_savings(saved)
 
             def on_no_click(button, event, data):
                 check_dialog.v_model = False
@@ -85,12 +87,23 @@ class JupyterBaseExportTool(Tool):
                 check_dialog.v_model = True
                 display(check_dialog)
         else:
-            self.save_figure(filepath)
+            saved = self.save_figure(filepath)
             self.viewer.output_widget.clear_output()
+            self.report_savings(saved)
 
+    # Subclasses should return the number of bytes saved by compacting the
+    # arrays of the figure (as returned by `write_figure`), if any
     def save_figure(self, filepath):
         raise NotImplementedError
 
+    def report_savings(self, saved):
+        if saved is None:
+            return
+        alert = v.Alert(type="info", dismissible=True, text=True,
+                        children=[savings_message(saved)])
+        with self.viewer.output_widget:
+            display(alert)
+
     # Subclasses should override this if they have another dialog
     # to display before the file chooser dialog
     def activate(self):
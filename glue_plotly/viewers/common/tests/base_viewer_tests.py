@@ -1,6 +1,8 @@
+from unittest.mock import patch
 from uuid import UUID
 
 import pytest
+from plotly.graph_objects import Scatter
 
 pytest.importorskip("glue_jupyter")
 
@@ -60,3 +62,89 @@ class BasePlotlyViewTests:
         self.viewer.state.y_min = 10
         self.viewer.state.y_max = 1000
         assert self.viewer.axis_y["range"] == (1.0, 3.0)
+
+    def test_traces_with_meta(self):
+        figure = self.viewer.figure
+        assert self.viewer.selection_layer is figure.data[0]
+
+        for layer in self.viewer.layers:
+            for trace in layer.traces():
+                assert trace in self.viewer._traces_with_meta(trace.meta)
+
+        added = self.viewer._add_traces([Scatter(meta="test", x=[1], y=[1]),
+                                         Scatter(meta="test", x=[2], y=[2])])
+        assert self.viewer._traces_with_meta("test") == added
+        assert all(trace.figure is figure for trace in added)
+
+        # Removed traces are dropped from the registry right away
+        self.viewer._remove_traces(added[:1])
+        assert self.viewer._traces_by_meta["test"] == added[1:]
+        assert self.viewer._traces_with_meta("test") == added[1:]
+
+        self.viewer._clear_traces()
+        assert self.viewer._traces_with_meta("test") == []
+        assert "test" not in self.viewer._traces_by_meta
+        assert self.viewer.selection_layer is figure.data[0]
+
+    def test_update_trace_order(self):
+        figure = self.viewer.figure
+        extra = self.viewer._add_trace(Scatter(meta="test", x=[1], y=[1]))
+        self.viewer._update_trace_order()
+
+        # Nothing should be sent to the frontend if the order doesn't change
+        data = figure._data_objs
+        self.viewer._update_trace_order()
+        assert figure._data_objs is data
+
+        traces = list(figure.data)
+        assert traces[0] is self.viewer.selection_layer
+        assert traces[-1] is extra
+
+        self.viewer._remove_traces([extra])
+        assert all(trace is not extra for trace in figure.data)
+        assert len(figure.data) == len(traces) - 1
+
+    def test_set_traces(self):
+        figure = self.viewer.figure
+        added = self.viewer._add_traces([Scatter(meta="test", x=[i], y=[i])
+                                         for i in range(20)])
+        current = list(figure.data)
+        removed = added[::3]
+        traces = [trace for trace in reversed(current)
+                  if all(trace is not r for r in removed)]
+
+        with patch.object(figure, "_send_deleteTraces_msg") as delete, \
+             patch.object(figure, "_send_moveTraces_msg") as move:
+            self.viewer._set_traces(traces)
+        delete.assert_called_once_with([current.index(trace) for trace in removed])
+        move.assert_called_once()
+
+        assert len(figure.data) == len(traces)
+        for index, trace in enumerate(traces):
+            assert figure.data[index] is trace
+            assert trace._trace_ind == index
+            assert trace._props is figure._data[index]
+        for i, trace in zip(range(0, 20, 3), removed, strict=True):
+            assert trace.figure is None
+            assert trace.x == (i,)
+        assert [trace.x for trace in figure.data if trace.meta == "test"] == \
+            [(i,) for i in reversed(range(20)) if i % 3 != 0]
+
+    def test_batch_update_with_removed_traces(self):
+        figure = self.viewer.figure
+        added = self.viewer._add_traces([Scatter(meta="test", x=[i], y=[i])
+                                         for i in range(3)])
+
+        # The edits apply to the traces that they were made on, even though
+        # the removal changes the indices of the other traces
+        with patch.object(type(figure), "_send_update_msg") as send_update, \
+             self.viewer._batch_update():
+            added[2].name = "last"
+            with self.viewer._batch_update():
+                self.viewer._remove_traces(added[:1])
+            added[1].name = "middle"
+            assert added[1].name is None
+        assert send_update.call_count == 2
+        assert self.viewer._batch is None
+        assert [trace.name for trace in added[1:]] == ["middle", "last"]
+        assert added[0].name is None
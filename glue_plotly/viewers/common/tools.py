@@ -10,6 +10,7 @@ from ipywidgets import HBox, Layout  # noqa
 from glue.config import viewer_tool
 from glue.core.subset import PolygonalROI, RectangularROI, XRangeROI, YRangeROI
 from glue.viewers.common.tool import CheckableTool, Tool
+from glue_plotly.html_exporters.writer import write_figure
 from glue_plotly.jupyter_base_export_tool import JupyterBaseExportTool
 
 
@@ -43,11 +44,11 @@ class PlotlySelectionMode(PlotlyDragMode):
     def deactivate(self):
         self.viewer.set_selection_callback(None)
         self.viewer.set_selection_active(False)
-        self.viewer.figure.plotly_relayout({"selections": [], "dragmode": False})
+        self.viewer.clear_selection()
         super().deactivate()
 
     def _clear_selection(self):
-        self.viewer.figure.plotly_relayout({"selections": [], "dragmode": False})
+        self.viewer.clear_selection()
 
     def on_selection(self, trace, points, selector):
         self._on_selection(trace, points, selector)
@@ -74,7 +75,7 @@ class PlotlyZoomMode(PlotlySelectionMode):
         xmin, xmax = selector.xrange
         ymin, ymax = selector.yrange
         viewer_state = self.viewer.state
-        with self.viewer.figure.batch_update(), \
+        with self.viewer._batch_update(), \
              delay_callback(viewer_state, "x_min", "x_max", "y_min", "y_max"):
             viewer_state.x_min = xmin
             viewer_state.x_max = xmax
@@ -100,7 +101,7 @@ class PlotlyHZoomMode(PlotlySelectionMode):
     def _on_selection(self, _trace, _points, selector):
         xmin, xmax = selector.xrange
         viewer_state = self.viewer.state
-        with self.viewer.figure.batch_update(), \
+        with self.viewer._batch_update(), \
              delay_callback(viewer_state, "x_min", "x_max"):
             viewer_state.x_min = xmin
             viewer_state.x_max = xmax
@@ -124,7 +125,7 @@ class PlotlyVZoomMode(PlotlySelectionMode):
     def _on_selection(self, _trace, _points, selector):
         ymin, ymax = selector.yrange
         viewer_state = self.viewer.state
-        with self.viewer.figure.batch_update(), \
+        with self.viewer._batch_update(), \
              delay_callback(viewer_state, "y_min", "y_max"):
             viewer_state.y_min = ymin
             viewer_state.y_max = ymax
@@ -245,7 +246,7 @@ class PlotlyHomeTool(Tool):
     tool_tip = "Reset original zoom"
 
     def activate(self):
-        with self.viewer.figure.batch_update():
+        with self.viewer._batch_update():
             self.viewer.state.reset_limits()
 
 
@@ -274,7 +275,7 @@ class PlotlySaveTool(JupyterBaseExportTool):
 
     def save_figure(self, filepath):
         if not filepath:
-            return
+            return None
 
         # We restrict things like modebar and axis functionality in
         # the viewer so that we can enable/disable them via tools.
@@ -287,4 +288,4 @@ class PlotlySaveTool(JupyterBaseExportTool):
             attr = f"{ax}axis"
             if hasattr(figure.layout, attr):
                 getattr(figure.layout, attr).update(fixedrange=False)
-        figure.write_html(filepath)
+        return write_figure(figure, filepath)
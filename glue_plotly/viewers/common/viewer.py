@@ -1,4 +1,6 @@
-from contextlib import nullcontext
+import asyncio
+from contextlib import ExitStack, contextmanager, nullcontext
+from copy import deepcopy
 from uuid import uuid4
 
 import plotly.graph_objects as go
@@ -43,6 +45,23 @@ class PlotlyBaseView(IPyWidgetView):
         self.figure = go.FigureWidget(layout=layout, data=selection_layer)
         self.figure._config = {**self.figure._config, "displayModeBar": False}
 
+        # The traces in the figure, keyed by their meta ID. Layer artists tag
+        # their traces with a UUID in the meta entry, and looking them up here
+        # avoids scanning all of the traces in the figure on each access.
+        # Traces are registered when added through ``_add_traces``, and dropped
+        # when removed through ``_remove_traces`` or ``_clear_traces``. Traces
+        # removed from the figure some other way are dropped the next time
+        # their ID is looked up.
+        self._traces_by_meta = {self.selection_layer_id: [self.figure.data[0]]}
+
+        # The layer artist updates waiting to be run (see ``_schedule_update``)
+        self._pending_updates = {}
+        self._flush_handle = None
+
+        # The batch update of the figure currently in progress, if any (see
+        # ``_batch_update``)
+        self._batch = None
+
         self._unique_class = f"glue-plotly-{uuid4().hex}"
         self.figure.add_class(self._unique_class)
 
@@ -71,24 +90,216 @@ class PlotlyBaseView(IPyWidgetView):
 
     @property
     def selection_layer(self):
-        return next(self.figure.select_traces(dict(meta=self.selection_layer_id)))
+        return self._traces_with_meta(self.selection_layer_id)[0]
 
     def _create_layout_config(self):
         return base_layout_config(self, **self.LAYOUT_SETTINGS, width=1200, height=800)
 
-    def _remove_trace_index(self, trace):
-        # TODO: It feels like there has to be a better way to do this
-        try:
-            index = self.figure.data.index(trace)
-            self.figure.data = self.figure.data[:index] + self.figure.data[index + 1:]
-        except ValueError:
-            pass
+    def _add_traces(self, traces):
+        """
+        Add the given traces to the figure and register them by their meta ID.
+
+        Returns the traces as they live in the figure, which are not the same
+        instances as the ones passed in.
+        """
+        traces = list(traces)
+        if not traces:
+            return []
+        self._apply_batch_edits()
+        self.figure.add_traces(traces)
+        added = list(self.figure.data[-len(traces):])
+        for trace in added:
+            self._traces_by_meta.setdefault(trace.meta, []).append(trace)
+        return added
+
+    def _add_trace(self, trace):
+        return self._add_traces([trace])[0]
+
+    def _traces_with_meta(self, meta):
+        """
+        Return the list of traces in the figure with the given meta ID.
+        """
+        traces = self._traces_by_meta.get(meta)
+        if not traces:
+            return []
+        current = [trace for trace in traces if trace.figure is self.figure]
+        if len(current) < len(traces):
+            if current:
+                self._traces_by_meta[meta] = current
+            else:
+                del self._traces_by_meta[meta]
+        return current
 
     def _remove_traces(self, traces):
-        self.figure.data = [t for t in self.figure.data if t not in traces]
+        traces = list(traces)
+        # Traces don't define a hash, and their equality compares contents,
+        # so we match them by identity instead
+        remove = {id(trace) for trace in traces}
+        if not remove:
+            return
+        current = self.figure.data
+        kept = [trace for trace in current if id(trace) not in remove]
+        if len(kept) < len(current):
+            self._apply_batch_edits()
+            self._set_traces(kept)
+        for meta in {trace.meta for trace in traces}:
+            registered = [trace for trace in self._traces_by_meta.get(meta, [])
+                          if id(trace) not in remove]
+            if registered:
+                self._traces_by_meta[meta] = registered
+            else:
+                self._traces_by_meta.pop(meta, None)
+
+    def _update_trace_order(self):
+        """
+        Order the traces in the figure so that the selection layer comes
+        first, followed by the traces of each layer in the order of the layers
+        and then by any other traces (e.g. those added by tools).
+
+        The traces are only moved if the order has changed.
+        """
+        current = self.figure.data
+        traces = [self.selection_layer]
+        for layer in self.layers:
+            traces.extend(layer.traces())
+        ordered = {id(trace) for trace in traces}
+        traces.extend(trace for trace in current if id(trace) not in ordered)
+        if len(traces) != len(current) or \
+                any(a is not b for a, b in zip(traces, current, strict=True)):
+            self._apply_batch_edits()
+            self._set_traces(traces)
+
+    def _set_traces(self, traces):
+        """
+        Set the traces in the figure to the given traces, which need to be a
+        permutation of a subset of the traces already in the figure.
+
+        Assigning the figure data does the same, but looks up the new index of
+        each remaining trace with ``list.index``, which takes quadratic time in
+        the number of traces. Here, the traces are removed and reordered as
+        Plotly does, but with a dictionary of the new indices, sending the
+        frontend (at most) a single deleteTraces and a single moveTraces
+        message. The figure data is assigned instead if the figure doesn't keep
+        its traces as expected (e.g. in another version of Plotly).
+        """
+        figure = self.figure
+        if not all(hasattr(figure, name) for name in ("_data", "_data_defaults",
+                                                      "_data_objs",
+                                                      "_send_deleteTraces_msg",
+                                                      "_send_moveTraces_msg")):
+            figure.data = traces
+            return
+
+        traces = list(traces)
+        new_index = {id(trace): index for index, trace in enumerate(traces)}
+
+        # The trace properties are changed in place, so that the widget
+        # doesn't send all of them to the frontend again
+        current = figure.data
+        delete_inds = [index for index, trace in enumerate(current)
+                       if id(trace) not in new_index]
+        if delete_inds:
+            for index in delete_inds:
+                trace = current[index]
+                trace._orphan_props.update(deepcopy(trace._props))
+                trace._parent = None
+                trace._trace_ind = None
+            kept = [index for index, trace in enumerate(current)
+                    if id(trace) in new_index]
+            figure._data[:] = [figure._data[index] for index in kept]
+            figure._data_defaults = [figure._data_defaults[index] for index in kept]
+            current = [current[index] for index in kept]
+            figure._send_deleteTraces_msg(delete_inds)
+
+        new_inds = [new_index[id(trace)] for trace in current]
+        if any(new != index for index, new in enumerate(new_inds)):
+            current_inds = [0] * len(new_inds)
+            for index, new in enumerate(new_inds):
+                current_inds[new] = index
+            figure._data[:] = [figure._data[index] for index in current_inds]
+            figure._data_defaults = [figure._data_defaults[index]
+                                     for index in current_inds]
+            figure._send_moveTraces_msg(list(range(len(new_inds))), new_inds)
+
+        figure._data_objs = traces
+        for index, trace in enumerate(traces):
+            trace._trace_ind = index
 
     def _clear_traces(self):
-        self.figure.data = [self.selection_layer]
+        self._apply_batch_edits()
+        selection_layer = self.selection_layer
+        self._set_traces([selection_layer])
+        self._traces_by_meta = {self.selection_layer_id: [selection_layer]}
+
+    @contextmanager
+    def _batch_update(self):
+        """
+        Batch the edits made to the figure within this context, as
+        ``figure.batch_update()`` does, such that the edits made so far can be
+        sent early (see ``_apply_batch_edits``). Nested calls are part of the
+        outermost batch.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = ExitStack()
+        try:
+            with self._batch:
+                self._batch.enter_context(self.figure.batch_update())
+                yield
+        finally:
+            self._batch = None
+
+    def _apply_batch_edits(self):
+        """
+        Send the edits made so far in the current batch update, if any.
+
+        Within a batch update, Plotly keeps the trace edits by trace index and
+        applies them once the batch is done. They need to be sent before
+        traces are added, removed or reordered, so that they apply to the
+        traces that they were made on. The batch is then continued in a new
+        ``figure.batch_update()``.
+        """
+        if self._batch is None:
+            return
+        self._batch.close()
+        self._batch.enter_context(self.figure.batch_update())
+
+    def _schedule_update(self, callback, force=False, **kwargs):
+        """
+        Schedule a call to a layer artist update method.
+
+        If an event loop is running (as in a Jupyter kernel), the update is
+        run once the current iteration of the loop is done, and all of the
+        updates requested for the same method until then are merged into a
+        single call. The layer artists keep track of the properties changed
+        since their last update, so that call handles all of them at once.
+        Otherwise, the update is run right away.
+        """
+        pending_force, pending_kwargs = self._pending_updates.get(callback,
+                                                                  (False, {}))
+        self._pending_updates[callback] = (force or pending_force,
+                                           {**pending_kwargs, **kwargs})
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._flush_updates()
+        else:
+            if self._flush_handle is None:
+                self._flush_handle = loop.call_soon(self._flush_updates)
+
+    def _flush_updates(self):
+        self._flush_handle = None
+        updates, self._pending_updates = self._pending_updates, {}
+        artists = self._layer_artist_container.artists
+
+        # All of the updates are sent to the frontend as a single message
+        # (apart from adding or removing traces, see ``_apply_batch_edits``)
+        with self._batch_update():
+            for callback, (force, kwargs) in updates.items():
+                # Skip the updates of layers that were removed in the meantime
+                if callback.__self__ in artists:
+                    callback(force=force, **kwargs)
 
     @property
     def axis_x(self):
@@ -126,6 +337,32 @@ class PlotlyBaseView(IPyWidgetView):
     def set_selection_callback(self, on_selection):
         self.selection_layer.on_selection(on_selection)
 
+    def clear_selection(self):
+        """
+        Clear the selection drawn in the figure.
+
+        Plotly.js sets the selected points of every trace when a selection
+        is drawn, and resets them when the selection is cleared, without the
+        Python side of the figure knowing about it. Traces that only show
+        some of their points through ``selectedpoints`` (e.g. scatter subsets
+        drawn as indices into their parent data) would then show all of their
+        points, so their selected points are sent to the frontend again.
+        Plotly only sends values that changed on the Python side, so these
+        are first reset there as well.
+        """
+        self.figure.plotly_relayout({"selections": [], "dragmode": False})
+        selected = {}
+        for index, trace in enumerate(self.figure.data):
+            if "selectedpoints" in trace and trace.selectedpoints is not None:
+                selected[index] = trace.selectedpoints
+        if not selected:
+            return
+        self.figure.plotly_restyle({"selectedpoints": [None] * len(selected)},
+                                   trace_indexes=list(selected))
+        with self._batch_update():
+            for index, points in selected.items():
+                self.figure.data[index].selectedpoints = points
+
     def _x_axis_range_from_state(self):
         x_range = [self.state.x_min, self.state.x_max]
         if self.state.x_log:
@@ -140,18 +377,18 @@ class PlotlyBaseView(IPyWidgetView):
 
     @avoid_circular
     def _update_plotly_x_limits(self, *args):
-        with self.figure.batch_update():
+        with self._batch_update():
             if self.state.x_min is not None and self.state.x_max is not None:
                 self.axis_x["range"] = self._x_axis_range_from_state()
 
     @avoid_circular
     def _update_plotly_y_limits(self, *args):
-        with self.figure.batch_update():
+        with self._batch_update():
             if self.state.y_min is not None and self.state.y_max is not None:
                 self.axis_y["range"] = self._y_axis_range_from_state()
 
     def _update_axes_visible(self, *args):
-        with self.figure.batch_update():
+        with self._batch_update():
             self.axis_x.visible = self.state.show_axes
             self.axis_y.visible = self.state.show_axes
 
@@ -0,0 +1,84 @@
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from glue.core.data import categorical_ndarray
+
+__all__ = ["BinIndexCache"]
+
+
+class BinIndexCache:
+    """
+    A cache of the index of the histogram bin that each value of a dataset
+    falls in, shared by all of the layers of a histogram viewer.
+
+    The bin indices of a dataset are computed once for the current bins, and
+    the histogram of the dataset or of any of its subsets is then just a count
+    of the indices (restricted to the subset). This means that a change to a
+    subset costs one ``np.bincount`` rather than binning the data again. The
+    indices of a dataset need to be invalidated when its values change.
+
+    The binning matches that of `glue.utils.compute_histogram`. Values that
+    aren't in any bin are given the index ``bins``.
+    """
+
+    def __init__(self):
+        self._indices = WeakKeyDictionary()
+
+    def invalidate(self, data=None):
+        """
+        Forget the bin indices of ``data``, or of all datasets if not given.
+        """
+        if data is None:
+            self._indices.clear()
+        else:
+            self._indices.pop(data, None)
+
+    def bin_indices(self, data, x_att, range, bins, *, log=False):
+        """
+        Return the bin index of each value of ``x_att`` in ``data``, or None
+        if the values can't be binned here (e.g. dates or dask arrays), in
+        which case the histogram should be computed by the data instead.
+        """
+        key = (id(x_att), data.shape, tuple(range), bins, log)
+        cached = self._indices.get(data)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        x = data.get_data(x_att)
+        if isinstance(x, categorical_ndarray):
+            x = x.codes
+        xmin, xmax = sorted(range)
+        if not isinstance(x, np.ndarray) or x.dtype.kind not in "biuf" or \
+                xmin == xmax or (log and xmin <= 0):
+            return None
+
+        x = x.ravel()
+        keep = (x >= xmin) & (x <= xmax) & ~np.isnan(x)
+        if log:
+            x = np.log10(x[keep])
+            xmin, xmax = np.log10(xmin), np.log10(xmax)
+        else:
+            x = x[keep]
+
+        # As in compute_histogram, values that are exactly xmax go in the last bin
+        xmax += 10 * np.spacing(xmax)
+        indices = np.full(keep.shape, bins, dtype=np.min_scalar_type(bins))
+        indices[keep] = np.minimum(((x - xmin) * (bins / (xmax - xmin))).astype(int),
+                                   bins - 1)
+
+        self._indices[data] = (key, indices)
+        return indices
+
+    def histogram(self, data, x_att, range, bins, *, log=False, subset_state=None):
+        """
+        Return the counts in each bin of the values of ``x_att`` in ``data``,
+        restricted to ``subset_state`` if given, or None if the values can't
+        be binned here.
+        """
+        indices = self.bin_indices(data, x_att, range, bins, log=log)
+        if indices is None:
+            return None
+        if subset_state is not None:
+            indices = indices[data.get_mask(subset_state).ravel()]
+        return np.bincount(indices, minlength=bins + 1)[:bins].astype(float)
@@ -0,0 +1,152 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from math import prod
+
+import numpy as np
+
+from glue.config import settings
+from glue.core.data import categorical_ndarray
+from glue.utils import compute_histogram
+
+try:
+    import dask.array as da
+    DASK_INSTALLED = True
+except ImportError:
+    DASK_INSTALLED = False
+
+__all__ = ["chunk_histogram", "chunk_views", "chunked_histogram",
+           "stream_histogram", "uses_chunks"]
+
+# The number of values binned at a time for datasets that aren't held in
+# memory (dask or memory-mapped arrays). Larger datasets of this kind are
+# binned chunk by chunk, so that only one chunk needs to be read at a time.
+HISTOGRAM_CHUNK_SIZE = "PLOTLY_HISTOGRAM_CHUNK_SIZE"
+settings.add(HISTOGRAM_CHUNK_SIZE, 10_000_000, validator=int)
+
+# The number of threads used to bin the chunks of a dataset. If zero, the
+# chunks are binned one after the other.
+HISTOGRAM_THREADS = "PLOTLY_HISTOGRAM_THREADS"
+settings.add(HISTOGRAM_THREADS, 0, validator=int)
+
+
+def _memory_mapped(x):
+    # Glue can hold views of a memory-mapped array rather than the array itself
+    while isinstance(x, np.ndarray):
+        if isinstance(x, np.memmap):
+            return True
+        x = x.base
+    return False
+
+
+def uses_chunks(data, x_att):
+    """
+    Whether the values of ``x_att`` in ``data`` should be binned chunk by
+    chunk, i.e. whether they are out of memory and larger than a chunk.
+    """
+    if data.size <= getattr(settings, HISTOGRAM_CHUNK_SIZE):
+        return False
+    x = data.get_data(x_att)
+    return _memory_mapped(x) or (DASK_INSTALLED and isinstance(x, da.Array))
+
+
+def chunk_views(shape, chunk_size=None):
+    """
+    Split an array of the given shape into views along its first axis, each
+    of which has at most ``chunk_size`` values (or a single row if the rows
+    are larger than that).
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, HISTOGRAM_CHUNK_SIZE)
+    rows = max(1, chunk_size // max(1, prod(shape[1:])))
+    rest = tuple(slice(None) for _ in shape[1:])
+    return [(slice(start, min(start + rows, shape[0])),) + rest
+            for start in range(0, shape[0], rows)]
+
+
+def chunk_histogram(data, x_att, view, range, bins, *, log=False, subset_state=None):
+    """
+    Return the counts in each bin of the values of ``x_att`` in ``view`` of
+    ``data``, restricted to ``subset_state`` if given.
+    """
+    x = data.get_data(x_att, view=view)
+    if isinstance(x, categorical_ndarray):
+        x = x.codes
+    x = np.asarray(x)
+    if subset_state is not None:
+        x = x[data.get_mask(subset_state, view=view)]
+    return compute_histogram([x.ravel()], range=[range], bins=[bins], log=[log])
+
+
+def chunked_histogram(data, x_att, range, bins, *, log=False, subset_state=None):
+    """
+    Return the counts in each bin of the values of ``x_att`` in ``data``,
+    restricted to ``subset_state`` if given, binning the values chunk by
+    chunk (on a thread pool if `HISTOGRAM_THREADS` is set).
+    """
+    views = chunk_views(data.shape)
+
+    def counts(view):
+        return chunk_histogram(data, x_att, view, range, bins,
+                               log=log, subset_state=subset_state)
+
+    threads = getattr(settings, HISTOGRAM_THREADS)
+    if threads > 0:
+        with ThreadPoolExecutor(threads) as executor:
+            return sum(executor.map(counts, views), np.zeros(bins))
+    return sum(map(counts, views), np.zeros(bins))
+
+
+def stream_histogram(layer_state, callback):
+    """
+    Bin the values of a histogram layer chunk by chunk in the background,
+    so that the histogram can be drawn while it is being computed.
+
+    The counts of the layer state start out empty, and after each chunk is
+    binned, they are set to the counts so far and ``callback`` is called with
+    no arguments. This needs a running event loop (as in a Jupyter kernel),
+    and raises a `RuntimeError` otherwise. The chunks are binned in the event
+    loop, one per iteration, or on a thread pool if `HISTOGRAM_THREADS` is set.
+
+    Returns the `asyncio.Task` that bins the values, which can be cancelled if
+    the histogram is no longer needed. The task also stops once the layer
+    state caches a histogram for other settings.
+    """
+    loop = asyncio.get_running_loop()
+    data, x_att, range, bins, log, subset_state = layer_state.histogram_arguments()
+    settings_key = layer_state.set_partial_histogram(np.zeros(bins))
+
+    def counts(view):
+        return chunk_histogram(data, x_att, view, range, bins,
+                               log=log, subset_state=subset_state)
+
+    def update(total):
+        cached = layer_state._histogram_cache
+        if cached is None or cached[0] != settings_key:
+            return False
+        layer_state.set_partial_histogram(total)
+        callback()
+        return True
+
+    async def run():
+        total = np.zeros(bins)
+        views = chunk_views(data.shape)
+        threads = getattr(settings, HISTOGRAM_THREADS)
+        if threads == 0:
+            for view in views:
+                await asyncio.sleep(0)
+                total = total + counts(view)
+                if not update(total):
+                    return
+            return
+
+        executor = ThreadPoolExecutor(threads)
+        try:
+            futures = [loop.run_in_executor(executor, counts, view) for view in views]
+            for future in asyncio.as_completed(futures):
+                total = total + await future
+                if not update(total):
+                    return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return loop.create_task(run())
@@ -1,21 +1,27 @@
 # NB: This dot plot layer artist shouldn't be used together with the
 # normalized mode, as a dotplot only makes sense when the heights are integral.
 
+from contextlib import suppress
 from uuid import uuid4
 
 import numpy as np
 
 from glue.core.exceptions import IncompatibleAttribute
 from glue.viewers.common.layer_artist import LayerArtist
-from glue.viewers.histogram.state import HistogramLayerState
 from glue_plotly.common.common import fixed_color
 from glue_plotly.common.dotplot import dot_positions, dot_size, dots_for_layer
+from glue_plotly.viewers.histogram.chunked import stream_histogram
+from glue_plotly.viewers.histogram.state import PlotlyHistogramLayerState
 
 __all__ = ["PlotlyDotplotLayerArtist"]
 
 SCALE_PROPERTIES = {"y_log", "normalize", "cumulative"}
-HISTOGRAM_PROPERTIES = SCALE_PROPERTIES | {"layer", "x_att", "hist_x_min",
-                                           "hist_x_max", "hist_n_bin", "x_log"}
+HISTOGRAM_PROPERTIES = {"layer", "x_att", "hist_x_min",
+                        "hist_x_max", "hist_n_bin", "x_log"}
+
+# The scale properties that change the heights of the bins. The layer state
+# caches the unscaled counts, so these don't need the data to be binned again.
+TRANSFORM_PROPERTIES = {"normalize", "cumulative"}
 
 # Note that, because we need to scale the dots based on pixel space
 # due to how Plotly sizes scatters, we need to update the dot sizing
@@ -27,7 +33,7 @@ DATA_PROPERTIES = {"layer", "x_att", "y_att"}
 
 class PlotlyDotplotLayerArtist(LayerArtist):
 
-    _layer_state_cls = HistogramLayerState
+    _layer_state_cls = PlotlyHistogramLayerState
 
     def __init__(self, view, viewer_state, layer_state=None, layer=None):
         super().__init__(
@@ -38,21 +44,19 @@ class PlotlyDotplotLayerArtist(LayerArtist):
 
         self.view = view
         self.bins = None
+        self._stream = None
         self._dots_id = uuid4().hex
-        dots = self._create_dots()
-        self.view.figure.add_trace(dots)
+        self.view._add_trace(self._create_dots())
 
-        self._viewer_state.add_global_callback(self._update_dotplot)
-        self.state.add_global_callback(self._update_dotplot)
+        self._viewer_state.add_global_callback(self._schedule_dotplot)
+        self.state.add_global_callback(self._schedule_dotplot)
         self.state.add_callback("zorder", self._update_zorder)
 
     def _get_dots(self):
-        try:
-            return next(self.view.figure.select_traces(dict(meta=self._dots_id)))
-        except StopIteration:
-            dots = self._create_dots()
-            self.view.figure.add_trace(dots)
-            return dots
+        dots = self.view._traces_with_meta(self._dots_id)
+        if dots:
+            return dots[0]
+        return self.view._add_trace(self._create_dots())
 
     def traces(self):
         dots = self._get_dots()
@@ -68,11 +72,35 @@ class PlotlyDotplotLayerArtist(LayerArtist):
     def _calculate_histogram(self):
         try:
             self.state.reset_cache()
+            self._stream_histogram()
             self.bins, self.hist_unscaled = self.state.histogram
         except (IncompatibleAttribute, ValueError):
             self.disable("Could not compute histogram")
             self.bins = self.hist_unscaled = None
 
+    def _stream_histogram(self):
+        # Values that aren't held in memory are binned chunk by chunk in the
+        # background, and the figure is updated as the counts come in. The
+        # histogram starts out empty. Without an event loop, the values are
+        # instead all binned when the histogram is first accessed.
+        if self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+        if self.state.chunked:
+            with suppress(RuntimeError):
+                self._stream = stream_histogram(self.state, self._histogram_progress)
+
+    def _histogram_progress(self):
+        self.bins, self.hist_unscaled = self.state.histogram
+        self._update_data()
+        self._scale_histogram()
+
+    def remove(self):
+        if self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+        return super().remove()
+
     def _scale_histogram(self):
 
         if self.bins is None:
@@ -81,7 +109,7 @@ class PlotlyDotplotLayerArtist(LayerArtist):
         if self.bins.size == 0:
             return
 
-        with self.view.figure.batch_update():
+        with self.view._batch_update():
 
             # We have to do the following to make sure that we reset the y_max as
             # needed. We can't simply reset based on the maximum for this layer
@@ -124,9 +152,9 @@ class PlotlyDotplotLayerArtist(LayerArtist):
         if not self.enabled:
             return
 
-        with self.view.figure.batch_update():
-            self.view.figure.for_each_trace(self._update_visual_attrs_for_trace,
-                                            dict(meta=self._dots_id))
+        with self.view._batch_update():
+            for trace in self.view._traces_with_meta(self._dots_id):
+                self._update_visual_attrs_for_trace(trace)
 
     def _update_visual_attrs_for_trace(self, trace):
         marker = trace.marker
@@ -144,17 +172,15 @@ class PlotlyDotplotLayerArtist(LayerArtist):
                 x, y = dot_positions(self.state)
                 dots.update(x=x, y=y)
             else:
-                dots = self._create_dots()
-                self.view.figure.add_traces(dots)
+                self.view._add_trace(self._create_dots())
         except (IncompatibleAttribute, ValueError):
             pass
 
     def _update_zorder(self, *args):
-        current_traces = self.view.figure.data
-        traces = [self.view.selection_layer]
-        for layer in self.view.layers:
-            traces += list(layer.traces())
-        self.view.figure.data = traces + [t for t in current_traces if t not in traces]
+        self.view._update_trace_order()
+
+    def _schedule_dotplot(self, **kwargs):
+        self.view._schedule_update(self._update_dotplot, **kwargs)
 
     def _update_dotplot(self, force=False, **kwargs):
         if (self._viewer_state.hist_x_min is None or
@@ -173,6 +199,8 @@ class PlotlyDotplotLayerArtist(LayerArtist):
         if force or len(changed & DATA_PROPERTIES) > 0:
             self._update_data()
             force = True
+        elif len(changed & TRANSFORM_PROPERTIES) > 0:
+            self._update_data()
 
         if force or len(changed & SCALE_PROPERTIES) > 0:
             self._scale_histogram()
@@ -182,4 +210,4 @@ class PlotlyDotplotLayerArtist(LayerArtist):
 
     def update(self):
         self.state.reset_cache()
-        self._update_dotplot(force=True)
+        self.view._schedule_update(self._update_dotplot, force=True)
@@ -1,25 +1,35 @@
+from contextlib import suppress
 from uuid import uuid4
 
 import numpy as np
+from plotly.graph_objs import Bar
 
 from glue.core.exceptions import IncompatibleAttribute
 from glue.viewers.common.layer_artist import LayerArtist
-from glue.viewers.histogram.state import HistogramLayerState
 from glue_plotly.common.common import fixed_color
 from glue_plotly.common.histogram import traces_for_layer
+from glue_plotly.viewers.histogram.chunked import stream_histogram
+from glue_plotly.viewers.histogram.state import PlotlyHistogramLayerState
 
 __all__ = ["PlotlyHistogramLayerArtist"]
 
 SCALE_PROPERTIES = {"y_log", "normalize", "cumulative"}
-HISTOGRAM_PROPERTIES = SCALE_PROPERTIES | {"layer", "x_att", "hist_x_min",
-                                           "hist_x_max", "hist_n_bin", "x_log"}
+HISTOGRAM_PROPERTIES = {"layer", "x_att", "hist_x_min",
+                        "hist_x_max", "hist_n_bin", "x_log"}
+
+# The scale properties that change the heights of the bins. The layer state
+# caches the unscaled counts, so these don't need the data to be binned again.
+TRANSFORM_PROPERTIES = {"normalize", "cumulative"}
 VISUAL_PROPERTIES = {"alpha", "color", "zorder", "visible"}
 DATA_PROPERTIES = {"layer", "x_att", "y_att"}
 
+# The properties of the bar traces that change with the histogram values
+BAR_PROPERTIES = ("x", "y", "width", "name")
+
 
 class PlotlyHistogramLayerArtist(LayerArtist):
 
-    _layer_state_cls = HistogramLayerState
+    _layer_state_cls = PlotlyHistogramLayerState
 
     def __init__(self, view, viewer_state, layer_state=None, layer=None):
 
@@ -31,14 +41,15 @@ class PlotlyHistogramLayerArtist(LayerArtist):
 
         self.view = view
         self.bins = None
+        self._stream = None
         self._bars_id = uuid4().hex
 
-        self._viewer_state.add_global_callback(self._update_histogram)
-        self.state.add_global_callback(self._update_histogram)
+        self._viewer_state.add_global_callback(self._schedule_histogram)
+        self.state.add_global_callback(self._schedule_histogram)
         self.state.add_callback("zorder", self._update_zorder)
 
     def _get_bars(self):
-        return self.view.figure.select_traces(dict(meta=self._bars_id))
+        return self.view._traces_with_meta(self._bars_id)
 
     def traces(self):
         return self._get_bars()
@@ -46,11 +57,35 @@ class PlotlyHistogramLayerArtist(LayerArtist):
     def _calculate_histogram(self):
         try:
             self.state.reset_cache()
+            self._stream_histogram()
             self.bins, self.hist_unscaled = self.state.histogram
         except IncompatibleAttribute:
             self.disable("Could not compute histogram")
             self.bins = self.hist_unscaled = None
 
+    def _stream_histogram(self):
+        # Values that aren't held in memory are binned chunk by chunk in the
+        # background, and the figure is updated as the counts come in. The
+        # histogram starts out empty. Without an event loop, the values are
+        # instead all binned when the histogram is first accessed.
+        if self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+        if self.state.chunked:
+            with suppress(RuntimeError):
+                self._stream = stream_histogram(self.state, self._histogram_progress)
+
+    def _histogram_progress(self):
+        self.bins, self.hist_unscaled = self.state.histogram
+        self._update_data()
+        self._scale_histogram()
+
+    def remove(self):
+        if self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+        return super().remove()
+
     def _scale_histogram(self):
 
         if self.bins is None:
@@ -59,7 +94,7 @@ class PlotlyHistogramLayerArtist(LayerArtist):
         if self.bins.size == 0:
             return
 
-        with self.view.figure.batch_update():
+        with self.view._batch_update():
 
             # We have to do the following to make sure that we reset the y_max as
             # needed. We can't simply reset based on the maximum for this layer
@@ -102,9 +137,9 @@ class PlotlyHistogramLayerArtist(LayerArtist):
         if not self.enabled:
             return
 
-        with self.view.figure.batch_update():
-            self.view.figure.for_each_trace(self._update_visual_attrs_for_trace,
-                                            dict(meta=self._bars_id))
+        with self.view._batch_update():
+            for trace in self._get_bars():
+                self._update_visual_attrs_for_trace(trace)
 
     def _update_visual_attrs_for_trace(self, trace):
         marker = trace.marker
@@ -114,25 +149,32 @@ class PlotlyHistogramLayerArtist(LayerArtist):
                      unselected=dict(marker=dict(opacity=self.state.alpha)))
 
     def _update_data(self):
-        old_bars = self._get_bars()
-        if old_bars:
-            with self.view.figure.batch_update():
-                for bar in old_bars:
-                    self.view._remove_trace_index(bar)
-
-        bars = traces_for_layer(self.view.state, self.state, add_data_label=True)
-        for bar in bars:
-            bar.update(hoverinfo="all",
-                       unselected=dict(marker=dict(opacity=self.state.alpha)))
+        bars = traces_for_layer(self.view.state, self.state,
+                                add_data_label=True, plain=True)
+
+        # If the layer already has as many bar traces, only the values of the
+        # bars have changed, so we update the existing traces in place. This
+        # only sends the new arrays to the frontend, rather than replacing
+        # the figure data.
+        current = self._get_bars()
+        if current and len(current) == len(bars):
+            with self.view._batch_update():
+                for trace, bar in zip(current, bars, strict=True):
+                    trace.update({key: bar.get(key) for key in BAR_PROPERTIES})
+            return
+
+        self.view._remove_traces(current)
+        bars = [Bar(bar, hoverinfo="all",
+                    unselected=dict(marker=dict(opacity=self.state.alpha)))
+                for bar in bars]
         self._bars_id = bars[0].meta if bars else None
-        self.view.figure.add_traces(bars)
+        self.view._add_traces(bars)
 
     def _update_zorder(self, *args):
-        current_traces = self.view.figure.data
-        traces = [self.view.selection_layer]
-        for layer in self.view.layers:
-            traces += list(layer.traces())
-        self.view.figure.data = traces + [t for t in current_traces if t not in traces]
+        self.view._update_trace_order()
+
+    def _schedule_histogram(self, **kwargs):
+        self.view._schedule_update(self._update_histogram, **kwargs)
 
     def _update_histogram(self, force=False, **kwargs):
         if (self._viewer_state.hist_x_min is None or
@@ -151,6 +193,8 @@ class PlotlyHistogramLayerArtist(LayerArtist):
         if force or len(changed & DATA_PROPERTIES) > 0:
             self._update_data()
             force = True
+        elif len(changed & TRANSFORM_PROPERTIES) > 0:
+            self._update_data()
 
         if force or len(changed & SCALE_PROPERTIES) > 0:
             self._scale_histogram()
@@ -160,4 +204,4 @@ class PlotlyHistogramLayerArtist(LayerArtist):
 
     def update(self):
         self.state.reset_cache()
-        self._update_histogram(force=True)
+        self.view._schedule_update(self._update_histogram, force=True)
@@ -1,6 +1,16 @@
-from glue.viewers.histogram.state import DDCProperty, HistogramViewerState
+import numpy as np
 
-__all__ = ["PlotlyHistogramViewerState"]
+from glue.core import Subset
+from glue.core.exceptions import IncompatibleDataException
+from glue.viewers.histogram.state import (
+    DDCProperty,
+    HistogramLayerState,
+    HistogramViewerState,
+)
+from glue_plotly.viewers.histogram.bin_index import BinIndexCache
+from glue_plotly.viewers.histogram.chunked import chunked_histogram, uses_chunks
+
+__all__ = ["PlotlyHistogramLayerState", "PlotlyHistogramViewerState"]
 
 
 class PlotlyHistogramViewerState(HistogramViewerState):
@@ -16,3 +26,101 @@ class PlotlyHistogramViewerState(HistogramViewerState):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+
+        # The bin indices of the values of each dataset, shared by the layers
+        self.bin_index_cache = BinIndexCache()
+
+
+class PlotlyHistogramLayerState(HistogramLayerState):
+    """
+    A histogram layer state that bins its values with the bin index cache of
+    the viewer state, if there is one, so that the data and all of its
+    subsets share one binning pass. Values that aren't held in memory (dask
+    or memory-mapped arrays) are instead binned chunk by chunk.
+    """
+
+    def _histogram_settings(self):
+        viewer_state = self.viewer_state
+        return (id(viewer_state.x_att),
+                viewer_state.x_log,
+                viewer_state.hist_x_min,
+                viewer_state.hist_x_max,
+                viewer_state.hist_n_bin)
+
+    def histogram_arguments(self):
+        """
+        Return the data, attribute, range, number of bins, log setting and
+        subset state that the histogram of the layer is computed from.
+        """
+        viewer_state = self.viewer_state
+        if (viewer_state.x_att is None or
+                viewer_state.hist_x_min is None or viewer_state.hist_x_max is None or
+                viewer_state.hist_n_bin is None or viewer_state.x_log is None):
+            raise IncompatibleDataException
+
+        if isinstance(self.layer, Subset):
+            data = self.layer.data
+            subset_state = self.layer.subset_state
+        else:
+            data = self.layer
+            subset_state = None
+
+        range = sorted((viewer_state.hist_x_min, viewer_state.hist_x_max))
+        return (data, viewer_state.x_att, range, viewer_state.hist_n_bin,
+                viewer_state.x_log, subset_state)
+
+    @property
+    def chunked(self):
+        """
+        Whether the values of the layer are binned chunk by chunk.
+        """
+        if getattr(self.viewer_state, "bin_index_cache", None) is None or \
+                self.viewer_state.random_subset:
+            return False
+        try:
+            data, x_att, *_ = self.histogram_arguments()
+        except IncompatibleDataException:
+            return False
+        return uses_chunks(data, x_att)
+
+    def _histogram_edges(self, range, bins, log):
+        if log:
+            return np.logspace(np.log10(range[0]), np.log10(range[1]), bins + 1)
+        return np.linspace(range[0], range[1], bins + 1)
+
+    def set_partial_histogram(self, counts):
+        """
+        Cache ``counts`` as the histogram for the current settings while the
+        values are still being binned (see `stream_histogram`), and return
+        the key of these settings.
+        """
+        _, _, range, bins, log, _ = self.histogram_arguments()
+        current_settings = self._histogram_settings()
+        self._histogram_cache = (current_settings,
+                                 (self._histogram_edges(range, bins, log), counts))
+        return current_settings
+
+    def update_histogram(self):
+
+        cache = getattr(self.viewer_state, "bin_index_cache", None)
+        if cache is None or self.viewer_state.random_subset:
+            return super().update_histogram()
+
+        current_settings = self._histogram_settings()
+        if self._histogram_cache is not None and \
+                self._histogram_cache[0] == current_settings:
+            return self._histogram_cache[1]
+
+        data, x_att, range, bins, log, subset_state = self.histogram_arguments()
+        if uses_chunks(data, x_att):
+            hist_values = chunked_histogram(data, x_att, range, bins,
+                                            log=log, subset_state=subset_state)
+        else:
+            hist_values = cache.histogram(data, x_att, range=range, bins=bins,
+                                          log=log, subset_state=subset_state)
+            if hist_values is None:
+                return super().update_histogram()
+
+        hist_edges = self._histogram_edges(range, bins, log)
+        self._histogram_cache = current_settings, (hist_edges, hist_values)
+        return self._histogram_cache[1]
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from glue.core import Data
+from glue_plotly.viewers.histogram.bin_index import BinIndexCache
+
+
+class TestBinIndexCache:
+
+    def setup_method(self, method):
+        rng = np.random.default_rng(12345)
+        x = rng.uniform(0, 100, 10000)
+        x[:10] = np.nan
+        x[10:20] = 100
+        self.data = Data(x=x, label="data")
+        self.cache = BinIndexCache()
+
+    @pytest.mark.parametrize("log", [False, True])
+    def test_histogram(self, log):
+        range, bins = (1, 100), 37
+        expected = self.data.compute_histogram([self.data.id["x"]], range=[range],
+                                               bins=[bins], log=[log])
+        counts = self.cache.histogram(self.data, self.data.id["x"],
+                                      range=range, bins=bins, log=log)
+        assert_equal(counts, expected)
+
+    def test_subset_histogram(self):
+        subset_state = self.data.id["x"] > 50
+        expected = self.data.compute_histogram([self.data.id["x"]], range=[(0, 100)],
+                                               bins=[10], subset_state=subset_state)
+        counts = self.cache.histogram(self.data, self.data.id["x"],
+                                      range=(0, 100), bins=10,
+                                      subset_state=subset_state)
+        assert_equal(counts, expected)
+
+    def test_cached(self):
+        x_att = self.data.id["x"]
+        with patch.object(Data, "get_data", wraps=self.data.get_data) as get_data:
+            first = self.cache.bin_indices(self.data, x_att, range=(0, 100), bins=10)
+            assert self.cache.bin_indices(self.data, x_att, (0, 100), 10) is first
+            assert get_data.call_count == 1
+
+            # New bins, or invalidating the data, mean binning the values again
+            self.cache.bin_indices(self.data, x_att, range=(0, 50), bins=10)
+            assert get_data.call_count == 2
+            self.cache.invalidate(self.data)
+            self.cache.bin_indices(self.data, x_att, range=(0, 50), bins=10)
+            assert get_data.call_count == 3
+
+    def test_unsupported(self):
+        data = Data(t=np.array(["2020-01-01", "2021-01-01"], dtype="datetime64[D]"))
+        assert self.cache.histogram(data, data.id["t"],
+                                    range=(0, 1), bins=2) is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from glue.config import settings
+from glue.core import Data
+from glue_plotly.viewers.histogram.chunked import (
+    chunk_views,
+    chunked_histogram,
+    uses_chunks,
+)
+
+da = pytest.importorskip("dask.array")
+
+
+class TestChunkedHistogram:
+
+    def setup_method(self, method):
+        rng = np.random.default_rng(12345)
+        x = rng.uniform(0, 100, 1000)
+        x[:10] = np.nan
+        x[10:20] = 100
+        self.x = x
+        self.data = Data(x=da.from_array(x, chunks=250), label="data")
+        settings.PLOTLY_HISTOGRAM_CHUNK_SIZE = 300
+
+    def teardown_method(self, method):
+        settings.reset_defaults()
+
+    def test_chunk_views(self):
+        views = chunk_views((10, 3), chunk_size=7)
+        assert views == [(slice(start, start + 2), slice(None))
+                         for start in range(0, 10, 2)]
+        assert chunk_views((5,), chunk_size=7) == [(slice(0, 5),)]
+        assert chunk_views((5, 10), chunk_size=7) == [(slice(i, i + 1), slice(None))
+                                                      for i in range(5)]
+
+    def test_uses_chunks(self):
+        assert uses_chunks(self.data, self.data.id["x"])
+        in_memory = Data(x=self.x, label="in memory")
+        assert not uses_chunks(in_memory, in_memory.id["x"])
+        settings.PLOTLY_HISTOGRAM_CHUNK_SIZE = 1000
+        assert not uses_chunks(self.data, self.data.id["x"])
+
+    @pytest.mark.parametrize("threads", [0, 2])
+    @pytest.mark.parametrize("log", [False, True])
+    def test_histogram(self, threads, log):
+        settings.PLOTLY_HISTOGRAM_THREADS = threads
+        range, bins = (1, 100), 37
+        subset_state = self.data.id["x"] > 50
+        for state in (None, subset_state):
+            expected = self.data.compute_histogram([self.data.id["x"]], range=[range],
+                                                   bins=[bins], log=[log],
+                                                   subset_state=state)
+            counts = chunked_histogram(self.data, self.data.id["x"], range, bins,
+                                       log=log, subset_state=state)
+            assert_equal(counts, expected)
+
+    def test_memmap(self, tmp_path):
+        x = np.memmap(tmp_path / "x.dat", dtype=float, mode="w+", shape=(20, 50))
+        x[:] = self.x.reshape((20, 50))
+        data = Data(x=x, label="memmap")
+        assert uses_chunks(data, data.id["x"])
+        expected = data.compute_histogram([data.id["x"]], range=[(0, 100)], bins=[10])
+        counts = chunked_histogram(data, data.id["x"], (0, 100), 10)
+        assert_equal(counts, expected)
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from numpy import unique
 from plotly.graph_objs import Scatter
@@ -101,6 +103,16 @@ class TestDotplot:
 
         assert dot_size(self.viewer, self.layer.state) == 0.95
 
+    def test_cumulative_without_rebinning(self):
+        dots = self.layer.traces()[0]
+        count = len(dots.y)
+        with patch.object(Data, "compute_histogram") as compute_histogram:
+            self.viewer.state.cumulative = True
+            assert len(dots.y) > count
+            self.viewer.state.cumulative = False
+            assert len(dots.y) == count
+        compute_histogram.assert_not_called()
+
 
 class TestDotsHistogram:
 
@@ -1,6 +1,12 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
 import pytest
+from numpy.testing import assert_array_equal
 from plotly.graph_objects import Bar
 
+from glue.config import settings
 from glue.core import Data
 from glue_plotly.common import DEFAULT_FONT
 
@@ -49,7 +55,7 @@ class TestHistogramViewer(BasePlotlyViewTests):
         assert isinstance(bars, Bar)
         assert bars.marker.color == "#abcdef"
         assert bars.marker.opacity == 0.75
-        assert bars.x == tuple(range(1, 7))
+        assert_array_equal(bars.x, range(1, 7))
         expected_y = [3, 2, 3, 1, 0, 2]
         assert all(a == b for a, b in zip(bars.y, expected_y))
 
@@ -83,3 +89,91 @@ class TestHistogramViewer(BasePlotlyViewTests):
         assert self.viewer.figure.layout.bargap == 0.36
         self.viewer.state.gaps = False
         assert self.viewer.figure.layout.bargap == 0
+
+    def test_log_x(self):
+        self.viewer.state.x_log = True
+        traces = list(self.layer.traces())
+        assert len(traces) == 1
+        edges, _ = self.layer.state.histogram
+        assert_array_equal(traces[0].width, edges[1:] - edges[:-1])
+
+    def test_update_bars_in_place(self):
+        bars = self.layer.traces()[0]
+        self.viewer.state.hist_n_bin = 3
+        assert self.layer.traces() == [bars]
+        assert_array_equal(bars.x, [1.5, 3.5, 5.5])
+        assert_array_equal(bars.y, [5, 4, 2])
+
+        self.viewer.state.x_log = True
+        assert self.layer.traces() == [bars]
+        assert bars.width is not None
+        self.viewer.state.x_log = False
+        assert bars.width is None
+
+    def test_scale_without_rebinning(self):
+        bars = self.layer.traces()[0]
+        with patch.object(Data, "compute_histogram") as compute_histogram:
+            self.viewer.state.cumulative = True
+            assert_array_equal(bars.y, [3, 5, 8, 9, 9, 11])
+            self.viewer.state.normalize = True
+            assert_array_equal(bars.y, np.array([3, 5, 8, 9, 9, 11]) / 11)
+            self.viewer.state.cumulative = False
+            self.viewer.state.normalize = False
+            assert_array_equal(bars.y, [3, 2, 3, 1, 0, 2])
+            self.viewer.state.y_log = True
+        compute_histogram.assert_not_called()
+
+        self.viewer.state.hist_n_bin = 3
+        assert_array_equal(bars.y, [5, 4, 2])
+
+    def test_shared_bin_indices(self):
+        for threshold in (1, 2, 3):
+            self.app.data_collection.new_subset_group(
+                subset_state=self.data.id["x"] > threshold, label=f"x > {threshold}")
+        subset_layer = self.viewer.layers[1]
+        assert_array_equal(subset_layer.traces()[0].y, [0, 2, 3, 1, 0, 2])
+
+        # The subsets are counted from the bin indices of the data
+        with patch.object(Data, "compute_histogram") as compute_histogram:
+            subset_group = self.app.data_collection.subset_groups[0]
+            subset_group.subset_state = self.data.id["x"] > 4
+        compute_histogram.assert_not_called()
+        assert_array_equal(subset_layer.traces()[0].y, [0, 0, 0, 0, 0, 2])
+
+        # Changing the data invalidates its bin indices
+        self.data.update_components({self.data.id["x"]: np.ones(11)})
+        assert_array_equal(self.layer.traces()[0].y, [11, 0, 0, 0, 0, 0])
+
+    def test_progressive_histogram(self):
+        da = pytest.importorskip("dask.array")
+        data = Data(label="dask", x=da.from_array(np.arange(1000) % 10, chunks=100))
+        self.app.data_collection.append(data)
+        settings.PLOTLY_HISTOGRAM_CHUNK_SIZE = 300
+
+        async def stream():
+            viewer = self.app.new_data_viewer(PlotlyHistogramView,
+                                              data=data, show=False)
+            layer = viewer.layers[0]
+            await asyncio.sleep(0)
+            bars = layer.traces()[0]
+
+            # The bars are drawn right away and filled in one chunk at a time
+            totals = [bars.y.sum()]
+            while not layer._stream.done():
+                await asyncio.sleep(0)
+                totals.append(bars.y.sum())
+            assert list(dict.fromkeys(totals)) == [0, 300, 600, 900, 1000]
+
+            # Changing the bins stops binning for the previous ones
+            previous = layer._stream
+            viewer.state.hist_n_bin = 5
+            await asyncio.sleep(0)
+            assert previous.cancelled() or previous.done()
+            await layer._stream
+            return layer.traces()[0]
+
+        try:
+            bars = asyncio.run(stream())
+        finally:
+            settings.reset_defaults()
+        assert_array_equal(bars.y, [200] * 5)
@@ -62,6 +62,11 @@ class PlotlyHistogramView(PlotlyBaseView):
     def _gaps_changed(self, *args):
         self.figure.layout.update(bargap=self._gap_from_state())
 
+    def _update_data(self, message):
+        # The values of the data have changed, so their bin indices are stale
+        self.state.bin_index_cache.invalidate(message.data)
+        super()._update_data(message)
+
     def _roi_to_subset_state(self, roi):
         return roi_to_subset_state(roi, x_att=self.state.x_att)
 
@@ -0,0 +1,98 @@
+import numpy as np
+
+__all__ = ["GridIndex"]
+
+
+class GridIndex:
+    """
+    A uniform grid over a set of 2D points, used to quickly find a bounded
+    number of points that fall inside a rectangular region.
+
+    The points are sorted by grid cell once, when the index is created, and
+    are in random order within each cell. A query then only needs to look at
+    the cells overlapping the region and, if there are too many points there,
+    can take the same fraction of the points of each cell. This keeps the
+    sample spatially representative of the full set of points.
+
+    Parameters
+    ----------
+    x, y : `numpy.ndarray`
+        The coordinates of the points. Points with non-finite coordinates are
+        never returned by a query.
+    cells : int, optional
+        The number of grid cells along each axis.
+    seed : int, optional
+        The seed used to shuffle the points within each cell.
+    """
+
+    def __init__(self, x, y, cells=256, seed=0):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.cells = cells
+        self._seed = seed
+
+        finite = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        if finite.size == 0:
+            self._xlim = self._ylim = (0., 1.)
+        else:
+            self._xlim = (self.x[finite].min(), self.x[finite].max())
+            self._ylim = (self.y[finite].min(), self.y[finite].max())
+
+        # Shuffle before the (stable) sort so that the points of each cell
+        # end up in random order, and any prefix of a cell is a random sample
+        rng = np.random.default_rng(seed)
+        finite = rng.permutation(finite)
+        cell = self._cell_index(self.x[finite], self._xlim) * cells + \
+            self._cell_index(self.y[finite], self._ylim)
+        order = np.argsort(cell, kind="stable")
+        self._indices = finite[order]
+        counts = np.bincount(cell, minlength=cells * cells)
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def _cell_index(self, values, limits):
+        lower, upper = limits
+        scale = self.cells / (upper - lower) if upper > lower else 0
+        index = np.floor((values - lower) * scale).astype(int)
+        return np.clip(index, 0, self.cells - 1)
+
+    def _cell_range(self, lower, upper, limits):
+        lower, upper = sorted((lower, upper))
+        if upper < limits[0] or lower > limits[1]:
+            return None
+        start, stop = self._cell_index(np.array([lower, upper]), limits)
+        return start, stop + 1
+
+    def query(self, x_range, y_range, max_points=None):
+        """
+        Return the sorted indices of (at most ``max_points``) points in the
+        region given by ``x_range`` and ``y_range``.
+        """
+        x_cells = self._cell_range(*x_range, self._xlim)
+        y_cells = self._cell_range(*y_range, self._ylim)
+        if x_cells is None or y_cells is None:
+            return np.array([], dtype=int)
+
+        cells = (np.arange(*x_cells)[:, None] * self.cells +
+                 np.arange(*y_cells)[None, :]).ravel()
+        starts = self._starts[cells]
+        counts = self._starts[cells + 1] - starts
+
+        # If there are too many candidates, take the same fraction of each
+        # cell (rounding up, so that sparse cells aren't left out)
+        total = counts.sum()
+        if max_points is not None and total > max_points:
+            counts = np.ceil(counts * (max_points / total)).astype(int)
+
+        # Gather the first ``counts[i]`` indices of each cell in one step
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        candidates = self._indices[offsets + np.arange(counts.sum())]
+
+        xmin, xmax = sorted(x_range)
+        ymin, ymax = sorted(y_range)
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+        indices = candidates[inside]
+        if max_points is not None and indices.size > max_points:
+            rng = np.random.default_rng(self._seed)
+            indices = rng.choice(indices, max_points, replace=False)
+        return np.sort(indices)
@@ -1,24 +1,48 @@
 from itertools import chain
 from uuid import uuid4
 
-from numpy import repeat
-from plotly.graph_objs import Scatter, Scatterpolar
+import numpy as np
+from plotly.graph_objs import Heatmap
 
-from glue.core import BaseData
+from glue.config import settings
+from glue.core import BaseData, Subset
 from glue.core.exceptions import IncompatibleAttribute
 from glue.utils import ensure_numerical
 from glue.viewers.common.layer_artist import LayerArtist
-from glue_plotly.common import color_info
+from glue_plotly.common import marker_color_info
 from glue_plotly.common.scatter2d import (
     LINESTYLES,
+    base_marker,
+    density_bins,
+    density_map_info,
     rectilinear_lines,
     scatter_mode,
+    scatter_trace_class,
     size_info,
+    use_webgl,
 )
+from glue_plotly.viewers.scatter.grid_index import GridIndex
 from glue_plotly.viewers.scatter.state import PlotlyScatterLayerState
 
 __all__ = ["PlotlyScatterLayerArtist"]
 
+# If set, layers with more points than this only send a sample of (at most)
+# this many points in the current view to the browser, which is refreshed
+# whenever the view changes. This is disabled by default
+LOD_MAX_POINTS = "PLOTLY_LOD_MAX_POINTS"
+settings.add(LOD_MAX_POINTS, None,
+             validator=lambda value: None if value is None else int(value))
+
+# If set, subset layers with a fixed color and size are drawn as a copy of
+# the parent data trace where only the points in the subset are selected
+# (through ``selectedpoints``), and the others are hidden and can't be
+# hovered. The coordinates then only need to be sent once, and updating the
+# subset only sends which points are selected. Plotly.js changes the selected points of
+# all traces when a selection is drawn, so the view sends them again once the
+# selection is cleared (see ``PlotlyBaseView.clear_selection``). This is
+# disabled by default
+SUBSETS_AS_INDICES = "PLOTLY_SUBSETS_AS_INDICES"
+settings.add(SUBSETS_AS_INDICES, False, validator=bool)
 
 CMAP_PROPERTIES = {"cmap_mode", "cmap_att", "cmap_vmin", "cmap_vmax", "cmap"}
 BORDER_PROPERTIES = {
@@ -36,7 +60,7 @@ MARKER_PROPERTIES = {
     "size",
     "fill",
 }
-DENSITY_PROPERTIES = {"dpi", "stretch", "density_contrast"}
+DENSITY_PROPERTIES = {"dpi", "stretch", "stretch_parameters", "density_contrast"}
 VISUAL_PROPERTIES = (
     CMAP_PROPERTIES
     | MARKER_PROPERTIES
@@ -63,7 +87,21 @@ DATA_PROPERTIES = {
     "markers_visible",
     "vector_scaling",
 }
-LINE_PROPERTIES = {"line_visible", "cmap_mode", "linestyle", "linewidth", "color"}
+# Density maps are binned over the current view, so need to be re-computed
+# whenever the limits change
+DENSITY_MAP_PROPERTIES = (
+    LIMIT_PROPERTIES
+    | DENSITY_PROPERTIES
+    | CMAP_PROPERTIES
+    | {"color", "alpha", "x_log", "y_log"}
+)
+# The properties that change the colors of the line traces of colormapped layers
+LINE_COLOR_PROPERTIES = CMAP_PROPERTIES | BORDER_PROPERTIES | {"color", "fill"}
+LINE_PROPERTIES = {"line_visible", "linestyle", "linewidth"} | LINE_COLOR_PROPERTIES
+
+# The marker properties of numeric colors (see NUMERIC_COLORS), which need to
+# be cleared when the colors are set another way
+NO_COLORSCALE = dict(cmin=None, cmax=None, colorscale=None)
 
 
 class PlotlyScatterLayerArtist(LayerArtist):
@@ -89,8 +127,11 @@ class PlotlyScatterLayerArtist(LayerArtist):
         # constructor or after) doesn't seem to work - it gets
         # overridden by Plotly
         self._scatter_id = uuid4().hex
-        scatter = self._create_scatter()
-        self.view.figure.add_trace(scatter)
+
+        # Whether the scatter trace is drawn with WebGL. This is updated
+        # based on the number of points whenever the data changes
+        self._webgl = False
+        self.view._add_trace(self._create_scatter())
 
         # We want to initialize these to some dummy UUIDs so that
         # _get_lines, _get_error_bars, _get_vectors, etc. don't pick up
@@ -99,9 +140,28 @@ class PlotlyScatterLayerArtist(LayerArtist):
         self._lines_id = uuid4().hex
         self._error_id = uuid4().hex
         self._vector_id = uuid4().hex
-
-        self._viewer_state.add_global_callback(self._update_display)
-        self.state.add_global_callback(self._update_display)
+        self._density_id = uuid4().hex
+
+        # The spatial index used to sample the points in the current view for
+        # large layers (see LOD_MAX_POINTS), and the indices of the points
+        # currently in the scatter trace. These are None if all points are sent.
+        # The index is only built again if the layer or the attributes that it
+        # was built for change, or if the data is updated (see ``update``)
+        self._grid_index = None
+        self._grid_index_key = None
+        self._lod_indices = None
+
+        # The x and y coordinates of the points in the (rectilinear) scatter
+        # trace. These are kept here since the trace only holds new values
+        # once the current batch update is done
+        self._x = self._y = np.array([])
+
+        # Whether the scatter trace holds the points of the parent data, with
+        # the points of this subset selected (see SUBSETS_AS_INDICES)
+        self._as_indices = False
+
+        self._viewer_state.add_global_callback(self._schedule_display)
+        self.state.add_global_callback(self._schedule_display)
         self.state.add_callback("zorder", self._update_zorder)
 
     def remove(self):
@@ -109,10 +169,11 @@ class PlotlyScatterLayerArtist(LayerArtist):
         self.view._remove_traces(self._get_lines())
         self.view._remove_traces(self._get_error_bars())
         self.view._remove_traces(self._get_vectors())
+        self.view._remove_traces(self._get_density_map())
         return super().remove()
 
     def _get_traces_with_id(self, id):
-        return self.view.figure.select_traces(dict(meta=id))
+        return iter(self.view._traces_with_meta(id))
 
     def _get_scatter(self):
         # The scatter trace should always exist
@@ -120,9 +181,7 @@ class PlotlyScatterLayerArtist(LayerArtist):
         try:
             return next(self._get_traces_with_id(self._scatter_id))
         except StopIteration:
-            scatter = self._create_scatter()
-            self.view.figure.add_trace(scatter)
-            return scatter
+            return self.view._add_trace(self._create_scatter())
 
     def _get_lines(self):
         return self._get_traces_with_id(self._lines_id)
@@ -133,16 +192,58 @@ class PlotlyScatterLayerArtist(LayerArtist):
     def _get_vectors(self):
         return self._get_traces_with_id(self._vector_id)
 
+    def _get_density_map(self):
+        return self._get_traces_with_id(self._density_id)
+
     def traces(self):
         return chain([self._get_scatter()],
                      self._get_lines(),
                      self._get_error_bars(),
-                     self._get_vectors())
+                     self._get_vectors(),
+                     self._get_density_map())
+
+    def _update_density_map(self):
+        try:
+            info = density_map_info(self._viewer_state, self.state,
+                                    density_bins(self.view))
+        except IncompatibleAttribute:
+            self.disable_invalid_attributes(self._viewer_state.x_att,
+                                            self._viewer_state.y_att)
+            return
+        else:
+            self.enable()
+
+        density_map = next(self._get_density_map(), None)
+        with self.view._batch_update():
+            if density_map is None:
+                self.view._add_trace(Heatmap(meta=self._density_id,
+                                             visible=self.state.visible,
+                                             **info))
+                self._update_zorder()
+            else:
+                density_map.update(**info)
 
     def _update_data(self):
 
+        self._as_indices = self._use_subset_indices()
+
+        if self.state.density_map and self.state.markers_visible:
+            # The points are shown as a density map, so the scatter trace
+            # doesn't need any data
+            scatter = self._get_scatter()
+            self._x = self._y = np.array([])
+            with self.view._batch_update():
+                scatter.update(x=[], y=[])
+                scatter.marker.update(color=None, size=None)
+            self._update_density_map()
+            return
+
+        self.view._remove_traces(list(self._get_density_map()))
+
+        source = self.layer.data if self._as_indices else self.layer
+
         try:
-            x = ensure_numerical(self.layer[self._viewer_state.x_att].ravel())
+            x = ensure_numerical(source[self._viewer_state.x_att].ravel())
         except (IncompatibleAttribute, IndexError):
             if self._viewer_state.x_att is not None:
                 self.disable_invalid_attributes(self._viewer_state.x_att)
@@ -151,7 +252,7 @@ class PlotlyScatterLayerArtist(LayerArtist):
             self.enable()
 
         try:
-            y = ensure_numerical(self.layer[self._viewer_state.y_att].ravel())
+            y = ensure_numerical(source[self._viewer_state.y_att].ravel())
         except (IncompatibleAttribute, IndexError):
             if self._viewer_state.y_att is not None:
                 self.disable_invalid_attributes(self._viewer_state.y_att)
@@ -159,11 +260,82 @@ class PlotlyScatterLayerArtist(LayerArtist):
         else:
             self.enable()
 
+        # The hidden points outside the subset can't be hovered
+        selectedpoints, hoverinfo = None, "all"
+        if self._as_indices:
+            try:
+                mask = self.layer.to_mask().ravel()
+            except IncompatibleAttribute:
+                self.disable_incompatible_subset()
+                return
+            selectedpoints = np.flatnonzero(mask)
+            hoverinfo = np.where(mask, "all", "skip")
+
+        if not self._as_indices and self._use_lod(x, y):
+            key = (self.state.layer, self._viewer_state.x_att, self._viewer_state.y_att)
+            if self._grid_index is None or key != self._grid_index_key:
+                self._grid_index = GridIndex(x, y)
+                self._grid_index_key = key
+            x, y = self._resample()
+        else:
+            self._grid_index = self._grid_index_key = None
+            self._lod_indices = None
+
+        webgl = use_webgl(x.size)
+        if webgl != self._webgl:
+            self._webgl = webgl
+            self.view._remove_traces([self._get_scatter()])
+            self.view._add_trace(self._create_scatter())
+            self._update_zorder()
+
+        # Plotly doesn't send properties that are set to an equal value, so
+        # when drawing the subset as indices, only the selected points and
+        # whether they can be hovered are sent once the coordinates are in
+        # the figure
         scatter = self._get_scatter()
         if self._viewer_state.using_rectilinear:
-            scatter.update(x=x, y=y)
+            self._x, self._y = x, y
+            scatter.update(x=x, y=y, selectedpoints=selectedpoints,
+                           hoverinfo=hoverinfo)
         else:
-            scatter.update(theta=x, r=y)
+            self._x = self._y = np.array([])
+            scatter.update(theta=x, r=y, selectedpoints=selectedpoints,
+                           hoverinfo=hoverinfo)
+
+    def _use_subset_indices(self):
+        return settings.PLOTLY_SUBSETS_AS_INDICES and \
+            isinstance(self.layer, Subset) and \
+            self.state.cmap_mode == "Fixed" and \
+            self.state.size_mode == "Fixed" and \
+            not self.state.line_visible and \
+            not (self.state.density_map and self.state.markers_visible)
+
+    def _use_lod(self, x, y):
+        max_points = settings.PLOTLY_LOD_MAX_POINTS
+        return max_points is not None and x.size > max_points and \
+            self._viewer_state.using_rectilinear and \
+            all(np.issubdtype(values.dtype, np.number) for values in (x, y))
+
+    def _resample(self):
+        state = self._viewer_state
+        self._lod_indices = self._grid_index.query((state.x_min, state.x_max),
+                                                   (state.y_min, state.y_max),
+                                                   settings.PLOTLY_LOD_MAX_POINTS)
+        return (self._grid_index.x[self._lod_indices],
+                self._grid_index.y[self._lod_indices])
+
+    def _update_resampled_points(self):
+        self._x, self._y = self._resample()
+        with self.view._batch_update():
+            self._get_scatter().update(x=self._x, y=self._y)
+            self._update_visual_attributes(set(), force=True)
+
+            # Colormapped lines are drawn as separate traces, which need
+            # to be re-created for the new points
+            lines = list(self._get_lines())
+            if lines:
+                self.view._remove_traces(lines)
+                self._update_lines(set(), force=True)
 
     def _create_scatter(self):
         if isinstance(self.layer, BaseData):
@@ -176,26 +348,33 @@ class PlotlyScatterLayerArtist(LayerArtist):
                             hoverinfo="all",
                             unselected=dict(marker=dict(opacity=self.state.alpha)),
                             meta=self._scatter_id)
-        if self._viewer_state.using_rectilinear:
-            scatter = Scatter(**scatter_info)
-        else:
+        polar = not self._viewer_state.using_rectilinear
+        if polar:
             theta_unit = "degrees" if self.view.state.using_degrees else "radians"
             scatter_info.update(thetaunit=theta_unit)
-            scatter = Scatterpolar(**scatter_info)
-        return scatter
+        return scatter_trace_class(polar=polar, webgl=self._webgl)(**scatter_info)
+
+    def _schedule_display(self, **kwargs):
+        self.view._schedule_update(self._update_display, **kwargs)
 
     def _update_display(self, force=False, **kwargs):
         changed = self.pop_changed_properties()
 
         if "layout_update" in kwargs:
             self.view._clear_traces()
-            scatter = self._create_scatter()
-            self.view.figure.add_trace(scatter)
+            self.view._add_trace(self._create_scatter())
+            force = True
+
+        if self._as_indices != self._use_subset_indices():
             force = True
 
         if force or len(changed & DATA_PROPERTIES) > 0:
             self._update_data()
             force = True
+        elif self.state.density_map and len(changed & DENSITY_MAP_PROPERTIES) > 0:
+            self._update_density_map()
+        elif self._grid_index is not None and len(changed & LIMIT_PROPERTIES) > 0:
+            self._update_resampled_points()
 
         if force or len(changed & VISUAL_PROPERTIES) > 0:
             self._update_visual_attributes(changed, force=force)
@@ -204,103 +383,109 @@ class PlotlyScatterLayerArtist(LayerArtist):
             self._update_lines(changed, force=force)
 
     def _update_zorder(self, *args):
-        current_traces = self.view.figure.data
-        traces = [self.view.selection_layer]
-        for layer in self.view.layers:
-            traces += list(layer.traces())
-        self.view.figure.data = traces + [t for t in current_traces if t not in traces]
+        self.view._update_trace_order()
 
     def _update_lines(self, changed, force=False):
         scatter = self._get_scatter()
         fixed_color = self.state.cmap_mode == "Fixed"
         lines = list(self._get_lines())
 
-        with self.view.figure.batch_update():
+        with self.view._batch_update():
             scatter.update(mode=scatter_mode(self.state))
 
-            line_traces_visible = True
-            if force or "cmap_mode" in changed:
-                if not (fixed_color or lines):
-                    line, lines = rectilinear_lines(self.state,
-                                                    marker=scatter.marker,
-                                                    x=scatter.x,
-                                                    y=scatter.y)
-                    if lines:
-                        self._lines_id = lines[0].meta
-                    self.view.figure.add_traces(lines)
-
-                    # The newly-created line traces already have the
-                    # correct properties, so we can return
-                    return
-
-                if fixed_color and lines:
-                    line_traces_visible = False
-
-            if (force or "line_visible" in changed) or not line_traces_visible:
-                visible = False if not line_traces_visible else self.state.line_visible
-                self.view.figure.for_each_trace(lambda t: t.update(visible=visible),
-                                                dict(meta=self._lines_id))
-
-            if force or len(changed & {"linestyle", "linewidth", "color"}) > 0:
+            # Colormapped lines are drawn with one trace per color, so the
+            # traces need to be re-created whenever the colors change
+            if lines and (fixed_color or force or
+                          len(changed & LINE_COLOR_PROPERTIES) > 0):
+                self.view._remove_traces(lines)
+                lines = []
+
+            if not (fixed_color or lines):
+                marker = base_marker(self.state, self._lod_indices)
+                _, lines = rectilinear_lines(self.state,
+                                             marker=marker,
+                                             x=self._x,
+                                             y=self._y)
+                # Keep the same ID for the traces of each set of lines, so
+                # that the view doesn't register a new ID every time
+                for trace in lines:
+                    trace.meta = self._lines_id
+                self.view._add_traces(lines)
+
+                # The newly-created line traces already have the
+                # correct properties, so we can return
+                return
+
+            if force or "line_visible" in changed:
+                for trace in lines:
+                    trace.update(visible=self.state.line_visible)
+
+            if force or len(changed & {"linestyle", "linewidth"}) > 0:
                 linestyle = LINESTYLES[self.state.linestyle]
                 if fixed_color:
                     line = scatter.line.update(dash=linestyle,
                                                width=self.state.linewidth)
                     scatter.update(line=line)
                 else:
-                    rgba_strs = scatter.marker.color
-                    count = len(scatter.x)
-                    indices = repeat(range(count), 2)
-                    indices = indices[1:count * 2 - 1]
-                    for i, line in enumerate(lines):
-                        line_data = line.line
-                        line_data.update(dash=linestyle,
-                                         width=self.state.linewidth,
-                                         color=rgba_strs[indices[i]])
-                        line.update(line=line_data)
+                    for line in lines:
+                        line.line.update(dash=linestyle, width=self.state.linewidth)
 
     def _update_visual_attributes(self, changed, force=False):
 
         if not self.enabled:
             return
 
-        # Only run select_traces once
+        # Only look up the scatter trace once
         scatter = self._get_scatter()
 
-        if self.state.markers_visible:
+        if self.state.markers_visible and not self.state.density_map:
             if force or \
                     any(prop in changed for prop in CMAP_PROPERTIES) or \
                     any(prop in changed for prop in BORDER_PROPERTIES) or \
                     any(prop in changed for prop in ["color", "fill"]):
 
-                layer_color = color_info(self.state)
-                marker_color = layer_color if self.state.fill else "rgba(0, 0, 0, 0)"
+                # Colormapped markers can be sent as the numeric attribute
+                # values plus a colorscale, and the mapping is then done by
+                # Plotly (see NUMERIC_COLORS). The colorscale properties are
+                # cleared whenever they aren't used, so that they don't apply
+                # to a later fixed color.
+                layer_color = marker_color_info(self.state, mask=self._lod_indices,
+                                                numeric=settings.PLOTLY_NUMERIC_COLORS)
+                marker_color = {**NO_COLORSCALE, **layer_color} if self.state.fill \
+                    else dict(NO_COLORSCALE, color="rgba(0, 0, 0, 0)")
                 if self.state.border_visible:
                     border_color = layer_color \
                                     if self.state.border_color_match_layer \
-                                    else self.state.border_color
-                    line = dict(width=self.state.border_size, color=border_color)
+                                    else dict(color=self.state.border_color)
+                    line = {**NO_COLORSCALE, "width": self.state.border_size,
+                            **border_color}
                 else:
-                    line = dict(width=0)
+                    line = dict(NO_COLORSCALE, width=0)
 
                 scatter.marker.update(
-                    color=marker_color,
+                    **marker_color,
                     line=line,
                     opacity=self.state.alpha
                 )
 
             if force or any(prop in changed for prop in MARKER_PROPERTIES):
-                scatter.marker["size"] = size_info(self.state)
+                scatter.marker["size"] = size_info(self.state, self._lod_indices)
 
         if force or "alpha" in changed:
             marker = scatter.marker
             opacity_dict = dict(opacity=self.state.alpha)
             marker.update(**opacity_dict)
+            unselected = dict(opacity=0) if self._as_indices else opacity_dict
             scatter.update(marker=marker,
-                           unselected=dict(marker=opacity_dict))
+                           unselected=dict(marker=unselected))
 
         if force or "visible" in changed:
             scatter.visible = self.state.visible
+            for density_map in self._get_density_map():
+                density_map.visible = self.state.visible
 
     def update(self, **kwargs):
-        self._update_display(force=True, **kwargs)
+        # Unless only the layout changed, the values of the layer may have
+        if "layout_update" not in kwargs:
+            self._grid_index = self._grid_index_key = None
+        self.view._schedule_update(self._update_display, force=True, **kwargs)
@@ -0,0 +1,39 @@
+import numpy as np
+from numpy.testing import assert_equal
+
+from glue_plotly.viewers.scatter.grid_index import GridIndex
+
+
+class TestGridIndex:
+
+    def setup_method(self, method):
+        rng = np.random.default_rng(12345)
+        self.x = rng.uniform(0, 10, 10000)
+        self.y = rng.uniform(-5, 5, 10000)
+        self.x[:10] = np.nan
+        self.index = GridIndex(self.x, self.y, cells=16)
+
+    def _inside(self, x_range, y_range):
+        return np.flatnonzero((self.x >= x_range[0]) & (self.x <= x_range[1]) &
+                              (self.y >= y_range[0]) & (self.y <= y_range[1]))
+
+    def test_query_all(self):
+        indices = self.index.query((2, 4), (-1, 3))
+        assert_equal(indices, self._inside((2, 4), (-1, 3)))
+
+    def test_query_flipped_range(self):
+        indices = self.index.query((4, 2), (3, -1))
+        assert_equal(indices, self._inside((2, 4), (-1, 3)))
+
+    def test_query_max_points(self):
+        indices = self.index.query((0, 10), (-5, 5), max_points=500)
+        assert len(indices) == 500
+        assert np.all(np.diff(indices) > 0)
+        assert np.isin(indices, self._inside((0, 10), (-5, 5))).all()
+
+        # The sample should cover the whole region
+        assert np.all(np.histogram(self.x[indices], bins=4, range=(0, 10))[0] > 75)
+
+    def test_query_outside(self):
+        assert len(self.index.query((11, 12), (-5, 5))) == 0
+        assert len(self.index.query((0, 10), (-20, -10))) == 0
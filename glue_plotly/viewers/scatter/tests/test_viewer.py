@@ -1,7 +1,14 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import matplotlib.pyplot as plt
 import pytest
-from numpy import array_equal
-from plotly.graph_objects import Scatter
+from echo import delay_callback
+from numpy import array_equal, isfinite, nansum
+from plotly.graph_objects import Heatmap, Scatter, Scattergl
 
+from glue.config import settings
 from glue.core import Data
 from glue_plotly.common import DEFAULT_FONT
 
@@ -10,6 +17,7 @@ pytest.importorskip("glue_jupyter")
 from glue_jupyter import JupyterApplication  # noqa: E402
 
 from glue_plotly.viewers.common.tests import BasePlotlyViewTests  # noqa: E402
+from glue_plotly.viewers.scatter.grid_index import GridIndex  # noqa: E402
 from glue_plotly.viewers.scatter.viewer import PlotlyScatterView  # noqa: E402
 
 
@@ -75,3 +83,313 @@ class TestScatterView(BasePlotlyViewTests):
                             showspikes=False, showticklabels=True)
         for axis in x_axis, y_axis:
             assert all(axis[key] == value for key, value in common_items.items())
+
+    def test_cmap_numeric_color(self):
+        settings.PLOTLY_NUMERIC_COLORS = True
+        layer_state = self.layer.state
+        try:
+            layer_state.cmap_mode = "Linear"
+            layer_state.cmap_att = self.data.id["y"]
+            layer_state.cmap_vmin = 2
+            layer_state.cmap_vmax = 10
+
+            scatter = next(self.layer.traces())
+            assert array_equal(scatter.marker.color, self.data["y"])
+            assert scatter.marker.cmin == 2
+            assert scatter.marker.cmax == 10
+            assert scatter.marker.colorscale[0][0] == 0
+            assert scatter.marker.colorscale[-1][0] == 1
+
+            # Switching to a fixed color clears the colorscale
+            layer_state.cmap_mode = "Fixed"
+            scatter = next(self.layer.traces())
+            assert scatter.marker.color == self.default_color
+            assert scatter.marker.cmin is None
+            assert scatter.marker.cmax is None
+            assert scatter.marker.colorscale is None
+        finally:
+            settings.reset_defaults()
+
+    def test_cmap_color_strings(self):
+        layer_state = self.layer.state
+        layer_state.cmap_mode = "Linear"
+        layer_state.cmap_att = self.data.id["y"]
+        scatter = next(self.layer.traces())
+        assert all(color.startswith("rgba(") for color in scatter.marker.color)
+        assert scatter.marker.colorscale is None
+
+    def test_zorder(self):
+        self.app.data_collection.new_subset_group(subset_state=self.data.id["x"] > 4,
+                                                  label="subset")
+        subset_layer = self.viewer.layers[1]
+        data_scatter = next(self.layer.traces())
+        subset_scatter = next(subset_layer.traces())
+        assert self.viewer.figure.data[1:] == (data_scatter, subset_scatter)
+
+        self.layer.state.zorder = subset_layer.state.zorder + 1
+        assert self.viewer.figure.data[1:] == (subset_scatter, data_scatter)
+
+    def test_line_colors(self):
+        self.layer.state.line_visible = True
+        self.layer.state.cmap_att = self.data.id["y"]
+        self.layer.state.cmap_mode = "Linear"
+        lines = list(self.layer.traces())[1:]
+        colors = {line.line.color for line in lines}
+        assert len(colors) == 5
+
+        # Changing the colormap redraws the lines with the new colors
+        self.layer.state.cmap = plt.cm.magma
+        lines = list(self.layer.traces())[1:]
+        new_colors = {line.line.color for line in lines}
+        assert len(new_colors) == 5
+        assert new_colors.isdisjoint(colors)
+
+        self.layer.state.cmap_mode = "Fixed"
+        assert len(list(self.layer.traces())) == 1
+
+    def test_line_traces_registry(self):
+        self.layer.state.line_visible = True
+        self.layer.state.cmap_att = self.data.id["y"]
+        registered = dict(self.viewer._traces_by_meta)
+        self.layer.state.cmap_mode = "Linear"
+        for _ in range(5):
+            self.layer.state.cmap = plt.cm.magma
+            self.layer.state.cmap = plt.cm.viridis
+
+        # The line traces are registered under the same ID every time, and
+        # the traces that were removed aren't kept
+        lines = list(self.layer.traces())[1:]
+        assert len(lines) == 5
+        assert self.viewer._traces_by_meta.keys() == \
+            {*registered, self.layer._lines_id}
+        assert sum(map(len, self.viewer._traces_by_meta.values())) == \
+            len(self.viewer.figure.data)
+
+    def test_subsets_as_indices(self):
+        settings.PLOTLY_SUBSETS_AS_INDICES = True
+        try:
+            subset_group = self.app.data_collection.new_subset_group(
+                subset_state=self.data.id["x"] > 4, label="subset")
+            subset_layer = self.viewer.layers[1]
+            scatter = next(subset_layer.traces())
+            assert array_equal(scatter.x, self.data["x"])
+            assert array_equal(scatter.y, self.data["y"])
+            assert array_equal(scatter.selectedpoints, [2, 3, 4])
+            assert array_equal(scatter.hoverinfo, ["skip"] * 2 + ["all"] * 3)
+            assert scatter.unselected.marker.opacity == 0
+
+            subset_group.subset_state = self.data.id["x"] < 4
+            scatter = next(subset_layer.traces())
+            assert array_equal(scatter.x, self.data["x"])
+            assert array_equal(scatter.selectedpoints, [0, 1])
+            assert array_equal(scatter.hoverinfo, ["all"] * 2 + ["skip"] * 3)
+
+            # Colormapped subsets are drawn with their own points
+            subset_layer.state.cmap_mode = "Linear"
+            scatter = next(subset_layer.traces())
+            assert array_equal(scatter.x, [1, 3])
+            assert scatter.selectedpoints is None
+            assert scatter.hoverinfo == "all"
+            assert scatter.unselected.marker.opacity == subset_layer.state.alpha
+        finally:
+            settings.reset_defaults()
+
+    def test_subsets_as_indices_messages(self):
+        settings.PLOTLY_SUBSETS_AS_INDICES = True
+        figure_class = type(self.viewer.figure)
+        try:
+            subset_group = self.app.data_collection.new_subset_group(
+                subset_state=self.data.id["x"] > 4, label="subset")
+            subset_layer = self.viewer.layers[1]
+            scatter = next(subset_layer.traces())
+            index = self.viewer.figure.data.index(scatter)
+
+            # Updating the subset only sends which of its points are selected
+            with patch.object(figure_class, "_send_update_msg") as send_update:
+                subset_group.subset_state = self.data.id["x"] < 4
+            restyle_data = send_update.call_args.kwargs["restyle_data"]
+            assert set(restyle_data) == {"selectedpoints", "hoverinfo"}
+            assert array_equal(restyle_data["selectedpoints"][0], [0, 1])
+
+            # Plotly.js resets the selected points of every trace when a selection
+            # is cleared, so these are sent again after using a selection tool
+            self.app.session.edit_subset_mode.edit_subset = [subset_group]
+            tool = self.viewer.toolbar.tools["plotly:rectangle"]
+            self.viewer.toolbar.active_tool = tool
+            selector = SimpleNamespace(xrange=(6, 10), yrange=(0, 20))
+            with patch.object(figure_class, "_send_update_msg") as send_update, \
+                 patch.object(figure_class, "_send_restyle_msg") as send_restyle:
+                tool.on_selection(None, None, selector)
+            send_restyle.assert_called_with({"selectedpoints": [None]},
+                                            trace_indexes=[index])
+            restyle_data = send_update.call_args.kwargs["restyle_data"]
+            assert send_update.call_args.kwargs["trace_indexes"] == [index]
+            assert array_equal(restyle_data["selectedpoints"][0], [3, 4])
+            assert array_equal(next(subset_layer.traces()).selectedpoints, [3, 4])
+        finally:
+            settings.reset_defaults()
+
+    def test_coalesced_updates(self):
+        layer_state = self.layer.state
+
+        async def change_state():
+            with patch.object(self.layer, "pop_changed_properties",
+                              wraps=self.layer.pop_changed_properties) as update:
+                layer_state.color = "#ff0000"
+                layer_state.alpha = 0.5
+                layer_state.size = 20
+                assert update.call_count == 0
+                await asyncio.sleep(0)
+                assert update.call_count == 1
+                return next(self.layer.traces())
+
+        scatter = asyncio.run(change_state())
+        assert scatter.marker.color == "#ff0000"
+        assert scatter.marker.opacity == 0.5
+        assert scatter.marker.size == 20
+
+    def test_single_message_per_flush(self):
+        self.app.data_collection.new_subset_group(subset_state=self.data.id["x"] > 4,
+                                                  label="subset")
+        subset_layer = self.viewer.layers[1]
+        figure_class = type(self.viewer.figure)
+
+        async def change_state():
+            with patch.object(figure_class, "_send_update_msg") as send_update, \
+                 patch.object(figure_class, "_send_restyle_msg") as send_restyle:
+                for layer in (self.layer, subset_layer):
+                    layer.state.color = "#00ff00"
+                    layer.state.size = 12
+                await asyncio.sleep(0)
+            return send_update, send_restyle
+
+        send_update, send_restyle = asyncio.run(change_state())
+        send_restyle.assert_not_called()
+        send_update.assert_called_once()
+        trace_indexes = send_update.call_args.kwargs["trace_indexes"]
+        assert sorted(trace_indexes) == [1, 2]
+        for trace in self.viewer.figure.data[1:]:
+            assert trace.marker.color == "#00ff00"
+            assert trace.marker.size == 12
+
+    def test_flush_with_removed_traces(self):
+        self.app.data_collection.new_subset_group(subset_state=self.data.id["x"] > 4,
+                                                  label="subset")
+        subset_layer = self.viewer.layers[1]
+        subset_layer.state.line_visible = True
+        subset_layer.state.cmap_att = self.data.id["y"]
+        subset_layer.state.cmap_mode = "Linear"
+        subset_layer.state.zorder = self.layer.state.zorder - 1
+        assert len(self.viewer.figure.data) == 6
+        assert self.viewer.figure.data[-1] is next(self.layer.traces())
+
+        async def change_state():
+            # The line traces of the subset are removed after the data trace
+            # is edited, which changes the index of the data trace
+            self.layer.state.color = "#00ff00"
+            subset_layer.state.cmap_mode = "Fixed"
+            await asyncio.sleep(0)
+
+        asyncio.run(change_state())
+        assert len(self.viewer.figure.data) == 3
+        assert next(self.layer.traces()).marker.color == "#00ff00"
+        assert next(subset_layer.traces()).marker.color != "#00ff00"
+
+    def test_webgl(self):
+        settings.PLOTLY_WEBGL_THRESHOLD = 3
+        try:
+            self.viewer.state.x_att = self.data.id["y"]
+            traces = list(self.layer.traces())
+            assert len(traces) == 1
+            scatter = traces[0]
+            assert isinstance(scatter, Scattergl)
+            assert scatter.marker.color == self.default_color
+            assert scatter.marker.opacity == self.default_opacity
+            assert array_equal(scatter.x, self.data["y"])
+            assert array_equal(scatter.y, self.data["y"])
+
+            settings.PLOTLY_WEBGL_THRESHOLD = 10
+            self.viewer.state.x_att = self.data.id["x"]
+            scatter = next(self.layer.traces())
+            assert isinstance(scatter, Scatter)
+            assert array_equal(scatter.x, self.data["x"])
+            assert scatter.marker.color == self.default_color
+        finally:
+            settings.reset_defaults()
+
+    def test_density_map(self):
+        self.layer.state.points_mode = "density"
+        assert self.layer.state.density_map
+
+        scatter, density_map = self.layer.traces()
+        assert isinstance(density_map, Heatmap)
+        assert len(scatter.x) == 0
+        assert density_map.opacity == self.default_opacity
+        assert density_map.zmin == 0
+        assert density_map.zmax == 1
+        assert density_map.colorscale[0][1] == "rgba(171,205,239,0)"
+        assert density_map.colorscale[1][1] == "rgba(171,205,239,1)"
+        assert nansum(isfinite(density_map.z)) == 5
+        assert density_map.x[0] > 0
+        assert density_map.x[-1] < 10
+
+        # The density map should be re-binned when zooming in
+        self.viewer.state.x_max = 4
+        density_map = next(self.layer._get_density_map())
+        assert density_map.x[-1] < 4
+        assert nansum(isfinite(density_map.z)) == 2
+
+        self.layer.state.points_mode = "markers"
+        traces = list(self.layer.traces())
+        assert len(traces) == 1
+        assert array_equal(traces[0].x, self.data["x"])
+        assert traces[0].marker.color == self.default_color
+
+    def test_level_of_detail(self):
+        settings.PLOTLY_LOD_MAX_POINTS = 3
+        settings.PLOTLY_NUMERIC_COLORS = True
+        self.layer.state.cmap_mode = "Linear"
+        self.layer.state.cmap_att = self.data.id["y"]
+        try:
+            self.viewer.state.x_att = self.data.id["y"]
+            self.viewer.state.x_att = self.data.id["x"]
+            scatter = next(self.layer.traces())
+            assert len(scatter.x) == 3
+            assert array_equal(scatter.marker.color, scatter.y)
+
+            # Zooming in should refresh the points
+            with delay_callback(self.viewer.state, "x_min", "x_max"):
+                self.viewer.state.x_min = 4
+                self.viewer.state.x_max = 10
+            scatter = next(self.layer.traces())
+            assert array_equal(scatter.x, [5, 7, 9])
+            assert array_equal(scatter.y, [6, 8, 10])
+            assert array_equal(scatter.marker.color, [6, 8, 10])
+        finally:
+            settings.reset_defaults()
+
+    def test_level_of_detail_index(self):
+        settings.PLOTLY_LOD_MAX_POINTS = 3
+        try:
+            with patch("glue_plotly.viewers.scatter.layer_artist.GridIndex",
+                       wraps=GridIndex) as grid_index:
+                self.viewer.state.x_att = self.data.id["y"]
+                assert grid_index.call_count == 1
+
+                # Changes that don't move the points keep the index
+                self.layer.state.cmap_mode = "Linear"
+                self.layer.state.cmap_att = self.data.id["y"]
+                self.layer.state.line_visible = False
+                self.layer.state.cmap_mode = "Fixed"
+                assert grid_index.call_count == 1
+
+                self.viewer.state.x_att = self.data.id["x"]
+                assert grid_index.call_count == 2
+
+                self.data.update_components({self.data.id["x"]: self.data["x"] + 1})
+                assert grid_index.call_count == 3
+                scatter = next(self.layer.traces())
+                assert array_equal(sorted(scatter.x),
+                                   sorted(self.data["x"][self.layer._lod_indices]))
+        finally:
+            settings.reset_defaults()
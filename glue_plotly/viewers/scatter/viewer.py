@@ -65,6 +65,7 @@ class PlotlyScatterView(PlotlyBaseView):
         else:
             self.figure.update_layout(xaxis=dict(visible=False),
                                       yaxis=dict(visible=False))
+        self._apply_batch_edits()
         self.figure.data = traces
         for layer in self.layers:
             layer.update(layout_update=True)